@@ -0,0 +1,83 @@
+"""
+Event loop lag under concurrent quiz and translate traffic, with SQLiteRepository
+called directly from coroutines and through AsyncSQLiteRepository.
+
+Usage: python -m benchmarks.async_repository_lag [chats] [rounds]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.common import LAG_TICK, lag_summary, report, stop_lag_monitor
+from benchmarks.sqlite_repository_stress import (
+    USERS, UserTableEntry, open_repositories, seed)
+from metrics.loop_lag import LoopLagMonitor
+from repository.async_sqlite_repository import AsyncSQLiteRepository
+
+
+class BlockingAdapter:
+    """Awaitable facade that still runs SQLite calls on the loop, as handlers did."""
+
+    def __init__(self, repository):
+        self.sync = repository
+
+    def __getattr__(self, name):
+        method = getattr(self.sync, name)
+
+        async def call(*args):
+            return method(*args)
+        return call
+
+
+async def chat(chat_id: int, rounds: int, word_book, scoreboard, latencies: list):
+    rng = random.Random(chat_id)
+    user_id = chat_id % USERS
+    for _ in range(rounds):
+        started = time.perf_counter()
+        if rng.random() < 0.5:
+            # text_for_translate
+            await word_book.add(UserTableEntry(user_id, 'en', f'phrase {rng.random()}'))
+        else:
+            # start_quiz + quiz_exit + show_scoreboard
+            await word_book.get_all({'user_id': user_id, 'target_lang': 'en'})
+            entry = await scoreboard.get_all({'user_id': user_id, 'lang': 'en'})
+            if entry:
+                entry[0].score = rng.randrange(100)
+                await scoreboard.update(entry[0])
+            await scoreboard.get_first_ordered('score', 10, True, {'lang': 'en'})
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(title: str, word_book, scoreboard, chats: int, rounds: int):
+    latencies = []
+    lags = []
+    monitor = LoopLagMonitor(lags.append, LAG_TICK)
+    monitor.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(chat(i, rounds, word_book, scoreboard, latencies) for i in range(chats)))
+    elapsed = time.perf_counter() - started
+    await stop_lag_monitor(monitor)
+    report(title, latencies, ops_per_s=f'{len(latencies) / elapsed:.0f}', lag=lag_summary(lags))
+
+
+async def main():
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    with tempfile.TemporaryDirectory() as directory:
+        seed(directory)
+        word_book, scoreboard = open_repositories(directory, 4)
+        await run('sync repository on loop', BlockingAdapter(word_book), BlockingAdapter(scoreboard),
+                  chats, rounds)
+        word_book, scoreboard = AsyncSQLiteRepository(word_book), AsyncSQLiteRepository(scoreboard)
+        await run('AsyncSQLiteRepository', word_book, scoreboard, chats, rounds)
+        word_book.close()
+        scoreboard.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""
+Handler matching cost per update as the number of state commands grows:
+one CommandHandler per command against a single CommandRouter.
+
+Usage: python -m benchmarks.command_matching [updates]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import sys
+import time
+
+from telegram import Bot, Update
+from telegram.ext import CommandHandler
+
+from runtime.command_router import CommandRouter
+from runtime.fake_updates import LocalBotRequest, synthetic_update
+
+
+async def noop(*args):
+    pass
+
+
+def local_bot() -> Bot:
+    """Initialized bot, CommandHandler needs its username to match commands."""
+    bot = Bot('1:local', request=LocalBotRequest())
+    asyncio.run(bot.initialize())
+    return bot
+
+
+def command_update(bot: Bot, update_id: int, text: str) -> Update:
+    return Update.de_json(synthetic_update(update_id, 1, text), bot)
+
+
+def match(handlers, updates) -> float:
+    """Seconds per update to find the first matching handler, as ConversationHandler does."""
+    started = time.perf_counter()
+    for update in updates:
+        for handler in handlers:
+            if handler.check_update(update) not in (None, False):
+                break
+    return (time.perf_counter() - started) / len(updates)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = random.Random(0)
+    bot = local_bot()
+    for commands in (5, 10, 50, 200):
+        names = [f'command_{i}' for i in range(commands)]
+        updates = [command_update(bot, i, '/' + rng.choice(names) + ' arg') for i in range(count)]
+        per_command = match([CommandHandler(name, noop) for name in names], updates)
+        router = match([CommandRouter(set(names), noop)], updates)
+        print(f'commands={commands:<4} CommandHandler per command={per_command * 1e6:.2f}us '
+              f'CommandRouter={router * 1e6:.2f}us')
+
+
+if __name__ == '__main__':
+    main()
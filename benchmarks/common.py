@@ -0,0 +1,78 @@
+"""Helpers shared by benchmark scripts."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from typing import List, Sequence
+
+from metrics.loop_lag import LoopLagMonitor
+
+# event loop lag sampling period of benchmarks
+LAG_TICK = 0.005
+
+
+def percentile(samples: Sequence[float], p: float) -> float:
+    """Nearest-rank percentile, p in [0, 100]."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def zipf_workload(vocabulary: Sequence[str], n: int, s: float = 1.1, seed: int = 0) -> List[str]:
+    """Phrases drawn with zipf-like popularity, as real users repeat common words."""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** s for rank in range(len(vocabulary))]
+    return rng.choices(vocabulary, weights, k=n)
+
+
+def fake_detector(text: str):
+    """langid.classify replacement: ascii text is english, the rest is russian."""
+    return ('en' if text.isascii() else 'ru', 1.0)
+
+
+class FakeProvider:
+    """
+    translators.translate_text replacement with fixed latency and a call counter.
+    error_rate of calls raise ConnectionError after the latency, as a throttled upstream does.
+    """
+
+    def __init__(self, latency: float = 0.01, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, text: str, from_language: str = 'auto', to_language: str = 'en', **kwargs) -> str:
+        with self._lock:
+            self.calls += 1
+            failing = self.error_rate and self._rng.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if failing:
+            raise ConnectionError('fake provider failure')
+        return '\n'.join(f'[{to_language}] {line}' for line in text.split('\n'))
+
+
+def report(title: str, latencies: Sequence[float], **extra) -> None:
+    fields = ' '.join(f'{name}={value}' for name, value in extra.items())
+    print(f'{title:<28} n={len(latencies)} '
+          f'p50={percentile(latencies, 50) * 1000:.2f}ms '
+          f'p95={percentile(latencies, 95) * 1000:.2f}ms {fields}')
+
+
+async def stop_lag_monitor(monitor: LoopLagMonitor) -> None:
+    # let the ticker record the lag of the last blocking stretch
+    await asyncio.sleep(monitor.interval * 2)
+    monitor.stop()
+
+
+def lag_summary(lags: Sequence[float]) -> str:
+    """Report fields of event loop lag samples collected by LoopLagMonitor."""
+    return (f'loop_lag_p95={percentile(lags, 95) * 1000:.1f}ms '
+            f'max_loop_lag={max(lags, default=0) * 1000:.1f}ms')
@@ -0,0 +1,86 @@
+"""
+Loading 1M word_book rows: the old SELECT * with a dict built per row,
+keyword and positional hydration through the repository, a __slots__
+entity, a projection and a count.
+
+Usage: python -m benchmarks.hydration [rows]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.schema_lookup import UserTableEntry
+from repository.sqlite_repository import SQLiteRepository
+
+COLUMNS = {'id': 'INTEGER PRIMARY KEY', 'user_id': 'INTEGER NOT NULL',
+           'target_lang': 'TEXT NOT NULL', 'phrase': 'TEXT NOT NULL',
+           'hits': 'INTEGER NOT NULL DEFAULT 1', 'last_seen': 'INTEGER NOT NULL DEFAULT 0'}
+
+
+class KeywordEntry(UserTableEntry):
+    """Same entity with a constructor that can't take rows positionally."""
+
+    def __init__(self, phrase, **kwargs):
+        super().__init__(kwargs.pop('user_id'), kwargs.pop('target_lang'), phrase, **kwargs)
+
+
+class SlotsEntry:
+    __slots__ = ('id', 'user_id', 'target_lang', 'phrase', 'hits', 'last_seen')
+
+    def __init__(self, user_id, target_lang, phrase, id=None, hits=1, last_seen=0):
+        self.id = id
+        self.user_id = user_id
+        self.target_lang = target_lang
+        self.phrase = phrase
+        self.hits = hits
+        self.last_seen = last_seen
+
+
+def legacy_get_all(repository: SQLiteRepository):
+    rows = repository.connection.execute(f'SELECT * FROM {repository.table_name}').fetchall()
+    objs = []
+    for row in rows:
+        obj_dict = {}
+        for i, col_name in enumerate(repository.columns):
+            obj_dict[col_name] = row[i]
+        objs.append(repository.entity_type(**obj_dict))
+    return objs
+
+
+def measure(title: str, load) -> None:
+    started = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - started
+    size = result if isinstance(result, int) else len(result)
+    print(f'{title:<28} {elapsed:.2f}s rows={size}')
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'words.db')
+        positional = SQLiteRepository(path, 'word_book', COLUMNS, UserTableEntry, 'id')
+        with positional._writer() as connection:
+            connection.executemany('INSERT INTO word_book VALUES (?, ?, ?, ?, ?, ?)',
+                                   ((i, i % 1000, 'en', f'phrase {i}', 1, i) for i in range(1, rows + 1)))
+        keyword = SQLiteRepository(path, 'word_book', COLUMNS, KeywordEntry, 'id')
+        slots = SQLiteRepository(path, 'word_book', COLUMNS, SlotsEntry, 'id')
+        assert positional.positional and not keyword.positional
+
+        measure('SELECT *, dict per row', lambda: legacy_get_all(positional))
+        measure('get_all, keyword', keyword.get_all)
+        measure('get_all, positional', positional.get_all)
+        measure('get_all, __slots__ entity', slots.get_all)
+        measure("get_values(('id',))", lambda: positional.get_values(('id',)))
+        measure('count', positional.count)
+        positional.close()
+        keyword.close()
+        slots.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Import time of the bot modules in a fresh interpreter, from python -X importtime.
+Heavy packages (translators, langid, telegram) are listed separately, the
+translation modules should not import the first two until warm-up.
+
+Usage: python -m benchmarks.import_time [module ...]
+"""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+from typing import Dict
+
+HEAVY = ('translators', 'langid', 'telegram')
+
+
+def import_times(module: str) -> Dict[str, int] | None:
+    """Cumulative microseconds of every module imported by module, None if it failed."""
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                             capture_output=True, text=True)
+    if process.returncode:
+        return None
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    modules = sys.argv[1:] or ['translation.translator', 'translation.providers', 'translation.detector',
+                               'storage', 'main']
+    for module in modules:
+        times = import_times(module)
+        if times is None:
+            print(f'{module:<24} import failed')
+            continue
+        heavy = ', '.join(f'{name}={times[name] / 1000:.0f}ms' for name in HEAVY if name in times)
+        print(f'{module:<24} {times.get(module, 0) / 1000:8.1f}ms  heavy: {heavy or "none"}')
+
+
+if __name__ == '__main__':
+    main()
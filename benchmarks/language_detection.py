@@ -0,0 +1,58 @@
+"""
+Per-call cost of language detection: langid.classify over all languages,
+LanguageDetector restricted to ru/en/es/de, and memoized repeats.
+
+Usage: python -m benchmarks.language_detection [calls]
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+
+import langid
+
+from benchmarks.common import report, zipf_workload
+from translation.detector import LanguageDetector
+
+SAMPLES = [
+    'good morning', 'where is the train station', 'I would like a cup of coffee',
+    'buenos días', 'dónde está la estación', 'me gustaría un café',
+    'guten Morgen', 'wo ist der Bahnhof', 'ich möchte einen Kaffee',
+    'доброе утро', 'где находится вокзал', 'я бы хотел чашку кофе',
+]
+
+
+def measure(title: str, classify, workload):
+    latencies = []
+    for text in workload:
+        started = time.perf_counter()
+        classify(text)
+        latencies.append(time.perf_counter() - started)
+    report(title, latencies, mean=f'{sum(latencies) / len(latencies) * 1e6:.0f}us')
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    vocabulary = [f'{text} {i}' for i in range(200) for text in SAMPLES]
+    workload = zipf_workload(vocabulary, calls)
+
+    started = time.perf_counter()
+    langid.classify('warm up')
+    print(f'langid model load: {(time.perf_counter() - started) * 1000:.0f}ms')
+    measure('langid.classify, all langs', langid.classify, workload)
+
+    detector = LanguageDetector(['ru', 'en', 'es', 'de'], cache_size=0)
+    started = time.perf_counter()
+    detector.warm()
+    print(f'LanguageDetector warm: {(time.perf_counter() - started) * 1000:.0f}ms')
+    measure('restricted, no memo', detector.classify, workload)
+
+    detector = LanguageDetector(['ru', 'en', 'es', 'de'])
+    detector.warm()
+    measure('restricted + memo', detector.classify, workload)
+    print('memo', detector.stats())
+
+
+if __name__ == '__main__':
+    main()
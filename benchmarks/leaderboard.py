@@ -0,0 +1,69 @@
+"""
+show_scoreboard latency with 1M quiz_score rows: ORDER BY on the original
+unindexed table, on the (lang, score) index and through the cached
+Leaderboard, plus "my rank" lookups and recording new results.
+
+Usage: python -m benchmarks.leaderboard [rows]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.common import report
+from benchmarks.schema_lookup import LANGS, QuizScoreTableEntry, open_keyed, open_legacy
+from quiz.leaderboard import Leaderboard
+from repository.async_sqlite_repository import AsyncSQLiteRepository
+
+REQUESTS = 50
+
+
+def fill(scoreboard, rows: int):
+    rng = random.Random(0)
+    with scoreboard._writer() as connection:
+        connection.executemany(
+            'INSERT INTO quiz_score VALUES (?, ?, ?, ?)',
+            ((i // 3, f'user{i // 3}', LANGS[i % 3], rng.randrange(100000)) for i in range(rows)))
+
+
+async def timed(coroutine_factory, n: int = REQUESTS):
+    latencies = []
+    for i in range(n):
+        started = time.perf_counter()
+        await coroutine_factory(i)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    users = rows // 3
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as directory:
+        scoreboard = None
+        for title, opener in (('unindexed ORDER BY', open_legacy), ('indexed ORDER BY', open_keyed)):
+            if scoreboard is not None:
+                scoreboard.close()
+            word_book, scoreboard = opener(directory)
+            word_book.close()
+            fill(scoreboard, rows)
+            scoreboard = AsyncSQLiteRepository(scoreboard)
+            report(title, await timed(lambda i: scoreboard.get_first_ordered(
+                'score', 10, True, {'lang': LANGS[i % 3]})))
+        leaderboard = Leaderboard(scoreboard, LANGS)
+        started = time.perf_counter()
+        await leaderboard.load()
+        print(f'leaderboard load: {(time.perf_counter() - started) * 1000:.1f}ms')
+        report('cached Leaderboard.top', await timed(lambda i: leaderboard.top(LANGS[i % 3])))
+        report('Leaderboard.rank', await timed(lambda i: leaderboard.rank(rng.randrange(users), LANGS[i % 3])))
+        report('Leaderboard.record', await timed(lambda i: leaderboard.record(
+            QuizScoreTableEntry(rng.randrange(users), 'user', LANGS[i % 3], rng.randrange(110000)))))
+        scoreboard.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""
+Cost of the built-in instrumentation: a bare timer, and word_book lookups
+with and without the repository timing wrapper.
+
+Usage: python -m benchmarks.metrics_overhead [calls]
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.schema_lookup import UserTableEntry
+from metrics.exporters import render_prometheus
+from metrics.registry import REGISTRY, MetricsRegistry, Timer
+from repository.sqlite_repository import SQLiteRepository
+
+
+def per_call(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    registry = MetricsRegistry()
+
+    def timed_block():
+        with registry.timer('bench_seconds', 'bench_errors_total', handler='noop', state=0):
+            pass
+
+    histogram = registry.histogram('bench_seconds', handler='noop', state=0)
+    errors = registry.counter('bench_errors_total', handler='noop', state=0)
+
+    def resolved_block():
+        with Timer(histogram, errors):
+            pass
+
+    print(f'{"timer, looked up":<28} {per_call(timed_block, calls) * 1e6:.2f}us/call')
+    print(f'{"timer, resolved":<28} {per_call(resolved_block, calls) * 1e6:.2f}us/call')
+
+    with tempfile.TemporaryDirectory() as directory:
+        word_book = SQLiteRepository(os.path.join(directory, 'words.db'), 'word_book',
+                                     {'id': 'INTEGER PRIMARY KEY', 'user_id': 'INTEGER NOT NULL',
+                                      'target_lang': 'TEXT NOT NULL', 'phrase': 'TEXT NOT NULL',
+                                      'hits': 'INTEGER NOT NULL DEFAULT 1',
+                                      'last_seen': 'INTEGER NOT NULL DEFAULT 0'},
+                                     UserTableEntry, 'id')
+        for i in range(1000):
+            word_book.add(UserTableEntry(1, 'en', f'phrase {i}'))
+        rng = random.Random(0)
+        bare_get = SQLiteRepository.get.__wrapped__
+        instrumented = per_call(lambda: word_book.get(rng.randint(1, 1000)), calls)
+        bare = per_call(lambda: bare_get(word_book, rng.randint(1, 1000)), calls)
+        print(f'{"get, instrumented":<28} {instrumented * 1e6:.2f}us/call')
+        print(f'{"get, bare":<28} {bare * 1e6:.2f}us/call overhead={(instrumented - bare) / bare:.1%}')
+        word_book.close()
+
+    started = time.perf_counter()
+    text = render_prometheus(REGISTRY)
+    print(f'{"prometheus render":<28} {(time.perf_counter() - started) * 1000:.2f}ms lines={text.count(chr(10))}')
+
+
+if __name__ == '__main__':
+    main()
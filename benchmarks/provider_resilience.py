@@ -0,0 +1,73 @@
+"""
+Translation success rate and latency with a failing upstream, bare provider
+against ResilientProvider, and the effect of request coalescing.
+
+Usage: python -m benchmarks.provider_resilience [requests] [threads]
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import FakeProvider, report
+from translation.providers import ResilientProvider
+
+
+def run(title: str, provider, texts, threads: int, backends=()):
+    latencies = []
+    failures = 0
+
+    def call(text):
+        nonlocal failures
+        started = time.perf_counter()
+        try:
+            provider(text, to_language='en')
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - started)
+
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(call, texts))
+    report(title, latencies, success=f'{1 - failures / len(texts):.1%}',
+           calls='/'.join(str(backend.calls) for backend in backends))
+
+
+def resilient(*backends: FakeProvider, **kwargs) -> ResilientProvider:
+    return ResilientProvider([(f'fake{i}', backend) for i, backend in enumerate(backends)],
+                             rate=1000, burst=100, backoff=0.01, max_backoff=0.05, **kwargs)
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    texts = [f'phrase {i}' for i in range(requests)]
+
+    primary = FakeProvider(0.005, error_rate=0.3)
+    run('throttled, bare', primary, texts, threads, [primary])
+    primary, secondary = FakeProvider(0.005, error_rate=0.3), FakeProvider(0.01)
+    run('throttled, resilient', resilient(primary, secondary), texts, threads, [primary, secondary])
+
+    primary = FakeProvider(0.05, error_rate=1.0)
+    run('primary down, bare', primary, texts, threads, [primary])
+    primary, secondary = FakeProvider(0.05, error_rate=1.0), FakeProvider(0.01)
+    run('primary down, resilient', resilient(primary, secondary), texts, threads, [primary, secondary])
+
+    # popular phrases are requested by many chats at once
+    popular = [f'phrase {i % 5}' for i in range(requests)]
+    backend = FakeProvider(0.05)
+    run('same phrases, bare', backend, popular, threads, [backend])
+    backend = FakeProvider(0.05)
+    provider = resilient(backend)
+    run('same phrases, coalesced', provider, popular, threads, [backend])
+
+    backend = FakeProvider(0.0)
+    provider = ResilientProvider([('fake', backend)], rate=200, burst=20)
+    started = time.perf_counter()
+    run('rate limited to 200/s', provider, texts[:400], threads, [backend])
+    print(f'{"":<28} achieved={400 / (time.perf_counter() - started):.0f}/s')
+
+
+if __name__ == '__main__':
+    main()
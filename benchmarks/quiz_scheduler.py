@@ -0,0 +1,109 @@
+"""
+Question selection cost as the vocabulary of one user grows: the old uniform
+sample over all word ids loaded at quiz start, against QuizScheduler picking
+the next due phrase and three random distractors, each found by its seq
+number on the (user_id, target_lang, seq) index.
+Translation is left out, both sides would pay the same for it.
+
+Every answer reschedules the phrase, so later questions walk through the
+schedule as a real quiz does. The user adds half of the vocabulary before and
+half after other users' phrases, so its rows are not contiguous in the shared
+table; full= is the share of questions that got all their distractors. Enrolling an existing vocabulary into the
+schedule happens once per user and language and is reported separately.
+
+Usage: python -m benchmarks.quiz_scheduler [sizes] [questions]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random as rd
+import sys
+import tempfile
+import time
+
+from benchmarks.common import report
+from quiz.scheduler import QuizScheduler
+from repository.async_sqlite_repository import AsyncSQLiteRepository
+from storage import open_quiz_schedule, open_word_book
+
+USER_ID = 42
+OPTIONS = 4
+
+
+async def uniform(word_book, questions):
+    """start_quiz + quiz_next_quest as they were: every id in memory, rd.sample per question."""
+    where = {'user_id': USER_ID, 'target_lang': 'en'}
+    started = time.perf_counter()
+    word_ids = [word_id for word_id, in await word_book.get_values(('id',), where)]
+    start_time = time.perf_counter() - started
+    latencies = []
+    for _ in range(questions):
+        started = time.perf_counter()
+        option_ids = rd.sample(word_ids, OPTIONS)
+        [await word_book.get(word_id) for word_id in option_ids]
+        latencies.append(time.perf_counter() - started)
+    return start_time, latencies
+
+
+async def scheduled(scheduler, questions):
+    started = time.perf_counter()
+    pool = await scheduler.open_pool(USER_ID, 'en')
+    start_time = time.perf_counter() - started
+    latencies = []
+    full = 0
+    for i in range(questions):
+        started = time.perf_counter()
+        entry = await scheduler.next_due(USER_ID, 'en', (), 1)
+        distractors = await scheduler.random_phrases(USER_ID, 'en', pool, OPTIONS - 1, {entry.phrase})
+        await scheduler.answer(USER_ID, 'en', entry.phrase, i % 5 != 0)
+        latencies.append(time.perf_counter() - started)
+        full += len(distractors) == OPTIONS - 1
+    return start_time, latencies, full / questions
+
+
+async def run(size: int, questions: int):
+    sync_word_book = open_word_book(write_behind=0)
+    insert = 'INSERT INTO word_book (user_id, target_lang, phrase) VALUES (?, ?, ?)'
+    with sync_word_book._writer() as connection:
+        connection.executemany(insert, ((USER_ID, 'en', f'phrase {i}') for i in range(size // 2)))
+        # other users share the table and its index, and write in between
+        connection.executemany(insert, ((user_id, 'en', f'phrase {i}') for user_id in range(3) for i in range(size)))
+        connection.executemany(insert, ((USER_ID, 'en', f'phrase {i}') for i in range(size // 2, size)))
+    word_book = AsyncSQLiteRepository(sync_word_book)
+    schedule = AsyncSQLiteRepository(open_quiz_schedule(write_behind=500))
+    scheduler = QuizScheduler(schedule, word_book, rng=rd.Random(0))
+
+    start_time, latencies = await uniform(word_book, questions)
+    report(f'uniform sample {size}', latencies, quiz_start=f'{start_time * 1000:.1f}ms')
+
+    started = time.perf_counter()
+    await scheduler.open_pool(USER_ID, 'en')
+    print(f'{"enroll vocabulary":<28} {time.perf_counter() - started:.2f}s once per user and language')
+
+    start_time, latencies, full = await scheduled(scheduler, questions)
+    report(f'scheduler {size}', latencies, quiz_start=f'{start_time * 1000:.1f}ms', full=f'{full:.0%}')
+
+    word_book.close()
+    schedule.close()
+
+
+def main():
+    sizes = [int(size) for size in (sys.argv[1] if len(sys.argv) > 1 else '1000,10000,100000').split(',')]
+    questions = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    rd.seed(0)
+    cwd = os.getcwd()
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as directory:
+                # storage opens databases relative to the working directory
+                os.chdir(directory)
+                asyncio.run(run(size, questions))
+                os.chdir(cwd)
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Time from /next_question to a ready question: live translation of four
+random phrases against QuizEngine with prefetched questions of the
+spaced-repetition schedule.
+
+Usage: python -m benchmarks.quiz_time_to_question [vocabulary] [questions] [latency_ms]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import random as rd
+import sys
+import tempfile
+import time
+
+from benchmarks.common import FakeProvider, fake_detector, report
+from benchmarks.word_book_dedup import USER_ID, open_deduplicated
+from quiz.engine import QuizEngine
+from quiz.scheduler import QuizScheduler
+from repository.async_sqlite_repository import AsyncSQLiteRepository
+from storage import open_quiz_schedule
+from translation.service import AsyncTranslationService
+from translation.translator import Language, Translator
+
+# time the user needs to read a question and answer it
+THINK_TIME = 0.05
+
+
+async def live(word_book, service, translator, questions):
+    """start_quiz + quiz_next_quest as they were: whole pool in memory, translate on demand."""
+    started = time.perf_counter()
+    pool = await word_book.get_all({'user_id': USER_ID, 'target_lang': 'en'})
+    start_time = time.perf_counter() - started
+    latencies = []
+    for _ in range(questions):
+        started = time.perf_counter()
+        phrase_ids = rd.sample(range(len(pool)), k=4)
+        await service.translate_batch(translator, [pool[i].phrase for i in phrase_ids])
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(THINK_TIME)
+    return start_time, latencies
+
+
+async def engine(word_book, service, translator, questions, schedule):
+    quiz_engine = QuizEngine(QuizScheduler(schedule, word_book), service)
+    started = time.perf_counter()
+    quiz_engine.start(1, USER_ID, translator)
+    start_time = time.perf_counter() - started
+    latencies = []
+    for _ in range(questions):
+        started = time.perf_counter()
+        question = await quiz_engine.next_question(1, USER_ID, translator)
+        latencies.append(time.perf_counter() - started)
+        await quiz_engine.answer(1, USER_ID, translator, question.phrase, True)
+        await asyncio.sleep(THINK_TIME)
+    quiz_engine.stop(1)
+    return start_time, latencies
+
+
+async def main():
+    vocabulary = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    questions = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    latency = (float(sys.argv[3]) if len(sys.argv) > 3 else 30.0) / 1000
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        # storage opens the schedule relative to the working directory
+        os.chdir(directory)
+        sync_word_book = open_deduplicated(os.path.join(directory, 'words.db'))
+        with sync_word_book._writer() as connection:
+            connection.executemany('INSERT INTO word_book (user_id, target_lang, phrase) VALUES (?, ?, ?)',
+                                   ((USER_ID, 'en', f'phrase {i}') for i in range(vocabulary)))
+        word_book = AsyncSQLiteRepository(sync_word_book)
+        sync_schedule = open_quiz_schedule(write_behind=0)
+        with sync_schedule._writer() as connection:
+            connection.executemany('INSERT INTO quiz_schedule (user_id, target_lang, phrase) VALUES (?, ?, ?)',
+                                   ((USER_ID, 'en', f'phrase {i}') for i in range(vocabulary)))
+        schedule = AsyncSQLiteRepository(sync_schedule)
+        service = AsyncTranslationService()
+        # joined requests would hide the difference, translate phrases one by one
+        translator = Translator(Language('Английский', 0, 'en'), None, FakeProvider(latency), fake_detector,
+                                joinable=False)
+        for title, run in (('live translation', live),
+                           ('QuizEngine prefetch', functools.partial(engine, schedule=schedule))):
+            start_time, latencies = await run(word_book, service, translator, questions)
+            report(title, latencies, quiz_start=f'{start_time * 1000:.1f}ms')
+        service.shutdown()
+        word_book.close()
+        schedule.close()
+        os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""
+word_book lookup and quiz_score leaderboard latency on the original schema
+(no keys, no indexes) and on the current one.
+
+Usage: python -m benchmarks.schema_lookup [rows]   (10000000 for the full run)
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.common import report
+from repository.sqlite_repository import SQLiteRepository
+
+LANGS = ('en', 'es', 'de')
+PHRASES_PER_USER = 1000
+
+
+class UserTableEntry:
+    def __init__(self, user_id, target_lang, phrase, id=None, hits=1, last_seen=0):
+        self.id = id
+        self.user_id = user_id
+        self.target_lang = target_lang
+        self.phrase = phrase
+        self.hits = hits
+        self.last_seen = last_seen
+
+
+class QuizScoreTableEntry:
+    def __init__(self, user_id, user_name, lang, score):
+        self.user_id = user_id
+        self.user_name = user_name
+        self.lang = lang
+        self.score = score
+
+
+def open_legacy(directory: str):
+    word_book = SQLiteRepository(os.path.join(directory, 'legacy_words.db'), 'word_book',
+                                 {'id': 'INTEGER', 'user_id': 'INTEGER', 'target_lang': 'TEXT', 'phrase': 'TEXT'},
+                                 UserTableEntry, 'user_id')
+    scoreboard = SQLiteRepository(os.path.join(directory, 'legacy_scores.db'), 'quiz_score',
+                                  {'user_id': 'INTEGER', 'user_name': 'TEXT', 'lang': 'TEXT', 'score': 'INTEGER'},
+                                  QuizScoreTableEntry, 'user_id')
+    return word_book, scoreboard
+
+
+def open_keyed(directory: str):
+    word_book = SQLiteRepository(os.path.join(directory, 'words.db'), 'word_book',
+                                 {'id': 'INTEGER PRIMARY KEY', 'user_id': 'INTEGER NOT NULL',
+                                  'target_lang': 'TEXT NOT NULL', 'phrase': 'TEXT NOT NULL'},
+                                 UserTableEntry, 'id', unique=[('user_id', 'target_lang', 'phrase')])
+    scoreboard = SQLiteRepository(os.path.join(directory, 'scores.db'), 'quiz_score',
+                                  {'user_id': 'INTEGER', 'user_name': 'TEXT', 'lang': 'TEXT', 'score': 'INTEGER'},
+                                  QuizScoreTableEntry, 'user_id', indexes=[('lang', 'score')],
+                                  primary_key=('user_id', 'lang'))
+    return word_book, scoreboard
+
+
+def fill(word_book: SQLiteRepository, scoreboard: SQLiteRepository, rows: int):
+    rng = random.Random(0)
+    with word_book._writer() as connection:
+        connection.executemany(
+            'INSERT INTO word_book (user_id, target_lang, phrase) VALUES (?, ?, ?)',
+            ((i // PHRASES_PER_USER, LANGS[i % 3], f'phrase {i}') for i in range(rows)))
+    with scoreboard._writer() as connection:
+        connection.executemany(
+            'INSERT INTO quiz_score VALUES (?, ?, ?, ?)',
+            ((i // 3, f'user{i // 3}', LANGS[i % 3], rng.randrange(10000)) for i in range(rows)))
+
+
+def measure(title: str, word_book: SQLiteRepository, scoreboard: SQLiteRepository, rows: int):
+    rng = random.Random(1)
+    users = max(1, rows // PHRASES_PER_USER)
+    lookups, leaderboards = [], []
+    for _ in range(20):
+        started = time.perf_counter()
+        word_book.get_all({'user_id': rng.randrange(users), 'target_lang': rng.choice(LANGS)})
+        lookups.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        scoreboard.get_first_ordered('score', 10, True, {'lang': rng.choice(LANGS)})
+        leaderboards.append(time.perf_counter() - started)
+    report(f'{title}: word_book lookup', lookups)
+    report(f'{title}: leaderboard', leaderboards)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as directory:
+        for title, opener in (('before', open_legacy), ('after', open_keyed)):
+            word_book, scoreboard = opener(directory)
+            started = time.perf_counter()
+            fill(word_book, scoreboard, rows)
+            print(f'{title}: loaded {rows} rows per table in {time.perf_counter() - started:.1f}s')
+            measure(title, word_book, scoreboard, rows)
+            word_book.close()
+            scoreboard.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Concurrent quiz results: read-modify-write update_scoreboard against the
+atomic max-merge upsert. Checks that every (user, lang) ends with its best
+score and reports throughput.
+
+Usage: python -m benchmarks.scoreboard_upsert [threads] [results_per_thread] [users]
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from benchmarks.schema_lookup import LANGS, QuizScoreTableEntry
+from repository.sqlite_repository import SQLiteRepository
+
+
+def open_scoreboard(path: str) -> SQLiteRepository:
+    return SQLiteRepository(path, 'quiz_score',
+                            {'user_id': 'INTEGER', 'user_name': 'TEXT', 'lang': 'TEXT', 'score': 'INTEGER'},
+                            QuizScoreTableEntry, 'user_id', indexes=[('lang', 'score')],
+                            primary_key=('user_id', 'lang'))
+
+
+def read_modify_write(scoreboard: SQLiteRepository, entry: QuizScoreTableEntry):
+    """update_scoreboard as it was before upsert."""
+    stored = scoreboard.get_all({'user_id': entry.user_id, 'lang': entry.lang})
+    if stored:
+        if stored[0].score > entry.score:
+            return
+        stored[0].score = entry.score
+        scoreboard.update(stored[0])
+    else:
+        scoreboard.add(entry)
+
+
+def upsert(scoreboard: SQLiteRepository, entry: QuizScoreTableEntry):
+    scoreboard.upsert(entry, {'score': 'max'})
+
+
+def run(title: str, record, threads: int, results: int, users: int):
+    with tempfile.TemporaryDirectory() as directory:
+        scoreboard = open_scoreboard(os.path.join(directory, 'scores.db'))
+        best = defaultdict(int)
+        lock = threading.Lock()
+        start = threading.Barrier(threads)
+
+        def worker(seed):
+            rng = random.Random(seed)
+            start.wait()
+            for _ in range(results):
+                entry = QuizScoreTableEntry(rng.randrange(users), 'user', rng.choice(LANGS), rng.randrange(1000))
+                with lock:
+                    key = (entry.user_id, entry.lang)
+                    best[key] = max(best[key], entry.score)
+                record(scoreboard, entry)
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        stored = {(e.user_id, e.lang): e.score for e in scoreboard.get_all()}
+        lost = sum(1 for key, score in best.items() if stored.get(key) != score)
+        scoreboard.close()
+    print(f'{title:<20} results/s={threads * results / elapsed:.0f} lost_best_scores={lost}')
+    return lost
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    results = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    users = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    run('read-modify-write', read_modify_write, threads, results, users)
+    lost = run('upsert max-merge', upsert, threads, results, users)
+    assert lost == 0, 'upsert lost a best score'
+
+
+if __name__ == '__main__':
+    main()
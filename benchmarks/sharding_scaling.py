@@ -0,0 +1,106 @@
+"""
+Throughput of the multi-process mode with 1..N shards on translation traffic.
+ShardedDispatcher starts main.run_worker processes, each one builds the whole
+bot (storage, language detection, translation service, handlers) and serves
+its chats with serve_updates, as `main.py --shards N` does.
+
+Bot API calls are answered by LocalBotRequest, which passes every reply
+back to this process, and translation backends are FakeProvider. Phrases come
+from a small vocabulary, so the rate limit of the provider is not what is
+measured. Every chat enters the translator first, then the timed text
+updates are dispatched; latency is from dispatch to the reply.
+
+Usage: python -m benchmarks.sharding_scaling [updates] [max_shards] [chats] [latency_ms]
+"""
+
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+import queue
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict
+
+import main as bot
+from benchmarks.common import FakeProvider, percentile
+from runtime.fake_updates import LocalBotRequest, synthetic_update
+from runtime.sharding import ShardedDispatcher
+
+# distinct phrases, within the provider burst of every worker
+VOCABULARY = 10
+# /start answers with a greeting and the menu, /translate with one message
+SETUP_REPLIES = 3
+# workers load the language model before their first update
+STARTUP_TIMEOUT = 120.0
+
+
+def wait_replies(replies: mp.Queue, count: int, timeout: float) -> None:
+    """Drain count replies, raise TimeoutError if they don't come within timeout seconds."""
+    deadline = time.monotonic() + timeout
+    for received in range(count):
+        try:
+            replies.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            raise TimeoutError(f'{received} of {count} setup replies in {timeout:.0f}s') from None
+
+
+def measure(shards: int, updates: int, chats: int):
+    replies = mp.Queue()
+    dispatcher = ShardedDispatcher(shards, bot.run_worker, bot.parse_args(['--shards', str(shards)]),
+                                   '1:local', LocalBotRequest(on_message=replies.put))
+    dispatcher.start()
+    try:
+        for update_id, command in enumerate(('/start', '/translate')):
+            for chat_id in range(1, chats + 1):
+                dispatcher.dispatch(synthetic_update(update_id * chats + chat_id, chat_id, command))
+        # workers start up meanwhile, the timed replies must not mix with these
+        wait_replies(replies, SETUP_REPLIES * chats, STARTUP_TIMEOUT)
+
+        sent: Dict[int, Deque[float]] = defaultdict(deque)
+        latencies = []
+        started = time.monotonic()
+        for update_id in range(2 * chats + 1, 2 * chats + updates + 1):
+            chat_id = update_id % chats + 1
+            sent[chat_id].append(time.monotonic())
+            dispatcher.dispatch(synthetic_update(update_id, chat_id, f'phrase {update_id % VOCABULARY}'))
+        for _ in range(updates):
+            # every text message gets one reply, in the order of its chat
+            replied, chat_id, _text = replies.get(timeout=60.0)
+            latencies.append(replied - sent[chat_id].popleft())
+        elapsed = time.monotonic() - started
+    finally:
+        dispatcher.stop()
+    return updates / elapsed, latencies
+
+
+def main():
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    max_shards = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    chats = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    latency = (float(sys.argv[4]) if len(sys.argv) > 4 else 20.0) / 1000
+    # workers are forked with the fake backends in place
+    bot.TranslatorsBackend = lambda name, timeout: FakeProvider(latency)
+    print(f'cpus={os.cpu_count()}')
+    cwd = os.getcwd()
+    baseline = None
+    shards = 1
+    try:
+        while shards <= max_shards:
+            with tempfile.TemporaryDirectory() as directory:
+                # storage opens databases relative to the working directory
+                os.chdir(directory)
+                throughput, latencies = measure(shards, updates, chats)
+                os.chdir(cwd)
+            baseline = baseline or throughput
+            print(f'shards={shards:<3} updates/s={throughput:.0f} speedup={throughput / baseline:.2f} '
+                  f'p50={percentile(latencies, 50) * 1000:.1f}ms p99={percentile(latencies, 99) * 1000:.1f}ms')
+            shards *= 2
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    main()
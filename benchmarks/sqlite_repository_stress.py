@@ -0,0 +1,127 @@
+"""
+Concurrent readers and writers on word_book and quiz_score.
+
+Compares a single serialized connection (readers=0) with the WAL read pool
+and reports throughput, read latency and "database is locked" errors.
+
+Usage: python -m benchmarks.sqlite_repository_stress [seconds] [reader_threads] [writer_threads]
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.common import percentile
+from repository.sqlite_repository import SQLiteRepository
+
+
+class UserTableEntry:
+    def __init__(self, user_id, target_lang, phrase):
+        self.user_id = user_id
+        self.target_lang = target_lang
+        self.phrase = phrase
+
+
+class QuizScoreTableEntry:
+    def __init__(self, user_id, user_name, lang, score):
+        self.user_id = user_id
+        self.user_name = user_name
+        self.lang = lang
+        self.score = score
+
+
+USERS = 200
+
+
+def open_repositories(directory: str, readers: int):
+    word_book = SQLiteRepository(os.path.join(directory, 'user_phrase_base.db'), 'word_book',
+                                 {'user_id': 'INTEGER', 'target_lang': 'TEXT', 'phrase': 'TEXT'},
+                                 UserTableEntry, 'user_id', [('user_id', 'target_lang')], readers=readers)
+    scoreboard = SQLiteRepository(os.path.join(directory, 'quiz_scoreboard.db'), 'quiz_score',
+                                  {'user_id': 'INTEGER', 'user_name': 'TEXT', 'lang': 'TEXT', 'score': 'INTEGER'},
+                                  QuizScoreTableEntry, 'user_id', [('lang', 'score')], readers=readers)
+    return word_book, scoreboard
+
+
+def seed(directory: str):
+    word_book, scoreboard = open_repositories(directory, 0)
+    with word_book._writer() as connection:
+        connection.executemany('INSERT INTO word_book VALUES (?, ?, ?)',
+                               ((i % USERS, 'en', f'phrase {i}') for i in range(20000)))
+    with scoreboard._writer() as connection:
+        connection.executemany('INSERT INTO quiz_score VALUES (?, ?, ?, ?)',
+                               ((i, f'user{i}', 'en', i % 50) for i in range(USERS)))
+    word_book.close()
+    scoreboard.close()
+
+
+def run(title: str, directory: str, readers: int, seconds: float, reader_threads: int, writer_threads: int):
+    word_book, scoreboard = open_repositories(directory, readers)
+    stop = threading.Event()
+    counters = {'reads': 0, 'writes': 0, 'locked': 0, 'errors': 0}
+    read_latencies = []
+    lock = threading.Lock()
+
+    def count(name):
+        with lock:
+            counters[name] += 1
+
+    def reader(seed_value):
+        rng = random.Random(seed_value)
+        while not stop.is_set():
+            try:
+                started = time.perf_counter()
+                word_book.get_all({'user_id': rng.randrange(USERS), 'target_lang': 'en'})
+                scoreboard.get_first_ordered('score', 10, True, {'lang': 'en'})
+                read_latencies.append(time.perf_counter() - started)
+                count('reads')
+            except sqlite3.OperationalError as error:
+                count('locked' if 'locked' in str(error) else 'errors')
+
+    def writer(seed_value):
+        rng = random.Random(seed_value)
+        while not stop.is_set():
+            try:
+                user_id = rng.randrange(USERS)
+                word_book.add(UserTableEntry(user_id, 'en', f'new phrase {rng.random()}'))
+                scoreboard.update(QuizScoreTableEntry(user_id, f'user{user_id}', 'en', rng.randrange(100)))
+                count('writes')
+            except sqlite3.OperationalError as error:
+                count('locked' if 'locked' in str(error) else 'errors')
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(reader_threads)]
+    threads += [threading.Thread(target=writer, args=(-i,)) for i in range(writer_threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    word_book.close()
+    scoreboard.close()
+    print(f'{title:<24} reads/s={counters["reads"] / seconds:.0f} writes/s={counters["writes"] / seconds:.0f} '
+          f'read_p50={percentile(read_latencies, 50) * 1000:.2f}ms '
+          f'read_p99={percentile(read_latencies, 99) * 1000:.2f}ms '
+          f'locked={counters["locked"]} other_errors={counters["errors"]}')
+    return counters
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    reader_threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    writer_threads = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    with tempfile.TemporaryDirectory() as directory:
+        seed(directory)
+        serialized = run('single connection', directory, 0, seconds, reader_threads, writer_threads)
+        pooled = run('WAL + read pool', directory, 4, seconds, reader_threads, writer_threads)
+    assert pooled['locked'] == 0, 'readers or writers hit "database is locked"'
+
+
+if __name__ == '__main__':
+    main()
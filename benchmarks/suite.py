@@ -0,0 +1,292 @@
+"""
+Reproducible benchmark suite with machine-readable results.
+
+Repository: add, get_all, get_first_ordered and update of the production
+word_book and quiz_score schemas at growing table sizes.
+Handlers: text_for_translate, show_words, quiz_next_quest and show_scoreboard
+of main.py driven by fake Update/Context objects, translations come from
+FakeProvider.
+
+Every result has throughput, latency percentiles and the peak memory
+allocated by one operation. Results are written as JSON; --compare prints
+the change against an earlier run and exits with status 1 on regressions.
+
+Usage: python -m benchmarks.suite [--sizes 1000,10000,100000] [--updates 500]
+                                  [--output results.json] [--compare old.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, List
+
+from benchmarks.common import FakeProvider, fake_detector, percentile, zipf_workload
+from storage import QuizScoreTableEntry, UserTableEntry, open_quiz_scoreboard, open_word_book
+
+LANGS = ('en', 'es', 'de')
+WORDS_PER_USER = 100
+
+
+def summarize(name: str, size: int, latencies: List[float], elapsed: float, peak: int) -> Dict[str, Any]:
+    result = {
+        'name': name,
+        'size': size,
+        'ops': len(latencies),
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'peak_kib': peak / 1024,
+    }
+    print(f"{name:<28} size={size:<8} ops/s={result['throughput']:<10.0f} p50={result['p50_ms']:.3f}ms "
+          f"p95={result['p95_ms']:.3f}ms p99={result['p99_ms']:.3f}ms peak={result['peak_kib']:.0f}KiB")
+    return result
+
+
+def peak_allocated(operation: Callable[[], Any]) -> int:
+    """Peak bytes allocated while running operation once."""
+    tracemalloc.start()
+    try:
+        operation()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_sync(name: str, size: int, operations: List[Callable[[], Any]]) -> Dict[str, Any]:
+    latencies = []
+    started = time.perf_counter()
+    for operation in operations:
+        op_started = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - op_started)
+    elapsed = time.perf_counter() - started
+    return summarize(name, size, latencies, elapsed, peak_allocated(operations[-1]))
+
+
+def repository_benchmarks(size: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Runs in a fresh directory, storage opens databases relative to it."""
+    results = []
+    word_book = open_word_book(write_behind=0)
+    scoreboard = open_quiz_scoreboard()
+    users = max(1, size // WORDS_PER_USER)
+
+    results.append(run_sync('repository.add', size, [
+        lambda i=i: word_book.add(UserTableEntry(i // WORDS_PER_USER, LANGS[i % 3], f'phrase {i}'))
+        for i in range(size)]))
+    with scoreboard._writer() as connection:
+        connection.executemany('INSERT INTO quiz_score VALUES (?, ?, ?, ?)',
+                               ((i // 3, f'user{i // 3}', LANGS[i % 3], rng.randrange(10000))
+                                for i in range(size)))
+
+    results.append(run_sync('repository.get_all', size, [
+        lambda user=rng.randrange(users), lang=rng.choice(LANGS):
+        word_book.get_all({'user_id': user, 'target_lang': lang})
+        for _ in range(200)]))
+    results.append(run_sync('repository.get_first_ordered', size, [
+        lambda lang=rng.choice(LANGS): scoreboard.get_first_ordered('score', 10, True, {'lang': lang})
+        for _ in range(200)]))
+
+    words = [word_book.get(rng.randint(1, size)) for _ in range(1000)]
+
+    def bump(word):
+        word.hits += 1
+        word_book.update(word)
+    results.append(run_sync('repository.update', size, [lambda word=word: bump(word) for word in words]))
+
+    word_book.close()
+    scoreboard.close()
+    return results
+
+
+class FakeMessage:
+    def __init__(self, chat_id: int, user_id: int, text: str = ''):
+        self.text = text
+        self.chat_id = chat_id
+        self.from_user = {'id': user_id, 'username': f'user{user_id}'}
+        self.replies: List[str] = []
+
+    async def reply_text(self, text: str, **kwargs) -> None:
+        self.replies.append(text)
+
+
+class FakeUpdate:
+    def __init__(self, chat_id: int, user_id: int, text: str = ''):
+        self.message = FakeMessage(chat_id, user_id, text)
+        self.effective_message = self.message
+        self.effective_chat = SimpleNamespace(id=chat_id)
+        self.callback_query = None
+
+
+class FakeContext:
+    def __init__(self, chat_data: Dict[str, Any]):
+        self.chat_data = chat_data
+        self.args: List[str] = []
+
+
+async def run_async(name: str, size: int, calls: List[Callable[[], Awaitable[Any]]],
+                    concurrency: int) -> Dict[str, Any]:
+    latencies = []
+    pending = iter(calls)
+
+    async def worker():
+        for call in pending:
+            started = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    try:
+        await calls[-1]()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return summarize(name, size, latencies, elapsed, peak)
+
+
+async def handler_benchmarks(updates: int, chats: int, concurrency: int,
+                             latency: float) -> List[Dict[str, Any]]:
+    import main
+    from translation.translator import Translator
+
+    main.build_application(main.parse_args([]), token='123456:benchmark')
+    provider = FakeProvider(latency)
+    main.translators = {lang.id: Translator(lang, main.translation_cache, provider=provider,
+                                            detector=fake_detector)
+                        for lang in main.languages.values()}
+    english = main.languages[0]
+    contexts = {chat_id: FakeContext({'state': main.main_state.id, 'lang': english.id})
+                for chat_id in range(1, chats + 1)}
+
+    # every chat starts with a vocabulary and a score
+    for chat_id in contexts:
+        for i in range(WORDS_PER_USER):
+            await main.word_book.upsert(UserTableEntry(chat_id, english.glang_shorty, f'word {chat_id} {i}'))
+        await main.leaderboard.record(QuizScoreTableEntry(chat_id, f'user{chat_id}', english.glang_shorty,
+                                                          chat_id % 50))
+    await main.word_book.flush()
+
+    rng = random.Random(0)
+    vocabulary = [f'phrase {i}' for i in range(2000)]
+    phrases = zipf_workload(vocabulary, updates)
+    chat_ids = [rng.randint(1, chats) for _ in range(updates)]
+
+    def call(handler, chat_id: int, text: str = ''):
+        return lambda: handler(FakeUpdate(chat_id, chat_id, text), contexts[chat_id])
+
+    results = [await run_async('handler.text_for_translate', chats,
+                               [call(main.text_for_translate, chat_id, phrase)
+                                for chat_id, phrase in zip(chat_ids, phrases)], concurrency)]
+    await main.word_book.flush()
+    results.append(await run_async('handler.show_words', chats,
+                                   [call(main.show_words, chat_id) for chat_id in chat_ids], concurrency))
+
+    for chat_id in contexts:
+        await main.start_quiz(FakeUpdate(chat_id, chat_id), contexts[chat_id])
+    results.append(await run_async('handler.quiz_next_quest', chats,
+                                   [call(main.quiz_next_quest, chat_id) for chat_id in chat_ids], concurrency))
+    results.append(await run_async('handler.show_scoreboard', chats,
+                                   [call(main.show_scoreboard, chat_id) for chat_id in chat_ids], concurrency))
+
+    for chat_id in contexts:
+        main.quiz_engine.stop(chat_id)
+    main.translation_service.shutdown()
+    main.word_book.close()
+    main.quiz_scoreboard.close()
+    return results
+
+
+def metadata() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare(results: List[Dict[str, Any]], previous_path: str, threshold: float) -> bool:
+    """Print changes against an earlier run, True if anything regressed by more than threshold."""
+    with open(previous_path, 'r') as file:
+        previous = {(result['name'], result['size']): result for result in json.load(file)['results']}
+    regressed = False
+    print(f'\ncompared to {previous_path}:')
+    for result in results:
+        old = previous.get((result['name'], result['size']))
+        if old is None or not old['throughput'] or not old['p95_ms']:
+            continue
+        throughput = result['throughput'] / old['throughput'] - 1
+        p95 = result['p95_ms'] / old['p95_ms'] - 1
+        flag = throughput < -threshold or p95 > threshold
+        regressed = regressed or flag
+        print(f"{result['name']:<28} size={result['size']:<8} ops/s {throughput:+.1%} p95 {p95:+.1%}"
+              + ('  REGRESSION' if flag else ''))
+    return regressed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Repository and handler benchmarks')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='table sizes, comma separated')
+    parser.add_argument('--updates', type=int, default=500, help='calls per handler')
+    parser.add_argument('--chats', type=int, default=50, help='chats sending the updates')
+    parser.add_argument('--concurrency', type=int, default=16, help='handler calls in flight')
+    parser.add_argument('--latency', type=float, default=0.005, help='fake translation latency, seconds')
+    parser.add_argument('--skip-handlers', action='store_true', help='repository benchmarks only')
+    parser.add_argument('--output', default='benchmark_results.json', help='results file')
+    parser.add_argument('--compare', help='results file of an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative change counted as regression')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    output = os.path.abspath(args.output)
+    previous = os.path.abspath(args.compare) if args.compare else None
+    rng = random.Random(0)
+    results = []
+    cwd = os.getcwd()
+    try:
+        for size in (int(size) for size in args.sizes.split(',')):
+            with tempfile.TemporaryDirectory() as directory:
+                os.chdir(directory)
+                results += repository_benchmarks(size, rng)
+                os.chdir(cwd)
+        if not args.skip_handlers:
+            with tempfile.TemporaryDirectory() as directory:
+                os.chdir(directory)
+                results += asyncio.run(handler_benchmarks(args.updates, args.chats, args.concurrency,
+                                                          args.latency))
+                os.chdir(cwd)
+    finally:
+        os.chdir(cwd)
+
+    with open(output, 'w') as file:
+        json.dump({'meta': metadata(), 'results': results}, file, indent=2)
+    print(f'\nresults written to {output}')
+    if previous and compare(results, previous, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
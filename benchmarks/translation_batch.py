@@ -0,0 +1,49 @@
+"""
+Serial do_translate loop against do_translate_batch, as used by show_words.
+
+Usage: python -m benchmarks.translation_batch [phrases] [latency_ms]
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+
+from benchmarks.common import FakeProvider, fake_detector
+from translation.translator import Language, Translator
+
+
+def measure(title: str, translate, phrases, provider: FakeProvider):
+    started = time.perf_counter()
+    translations = translate(phrases)
+    elapsed = time.perf_counter() - started
+    assert len(translations) == len(phrases)
+    print(f'{title:<28} phrases={len(phrases)} wall={elapsed * 1000:.0f}ms provider_calls={provider.calls}')
+    return translations
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 5.0) / 1000
+    # every tenth phrase is russian, a quarter are repeated
+    phrases = [f'фраза {i}' if i % 10 == 0 else f'phrase {i}' for i in range(count)]
+    phrases += phrases[:count // 4]
+    english = Language('Английский', 0, 'en')
+
+    provider = FakeProvider(latency)
+    translator = Translator(english, None, provider, fake_detector)
+    serial = measure('serial', lambda texts: [translator.do_translate(t) for t in texts], phrases, provider)
+
+    provider = FakeProvider(latency)
+    translator = Translator(english, None, provider, fake_detector, joinable=False)
+    concurrent = measure('batch, concurrent', translator.do_translate_batch, phrases, provider)
+
+    provider = FakeProvider(latency)
+    translator = Translator(english, None, provider, fake_detector, joinable=True)
+    joined = measure('batch, joined requests', translator.do_translate_batch, phrases, provider)
+
+    assert serial == concurrent == joined
+
+
+if __name__ == '__main__':
+    main()
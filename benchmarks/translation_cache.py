@@ -0,0 +1,61 @@
+"""
+Effect of TranslationCache on provider calls and reply latency.
+
+Usage: python -m benchmarks.translation_cache [requests] [vocabulary] [latency_ms]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.common import FakeProvider, fake_detector, report, zipf_workload
+from repository.sqlite_repository import SQLiteRepository
+from translation.cache import TranslationCache, TranslationEntry, TRANSLATION_COLUMNS, TRANSLATION_KEY
+from translation.translator import Language, Translator
+
+
+def run(title: str, translator: Translator, workload, provider: FakeProvider) -> None:
+    latencies = []
+    for phrase in workload:
+        started = time.perf_counter()
+        translator.do_translate(phrase)
+        latencies.append(time.perf_counter() - started)
+    extra = {'provider_calls': provider.calls}
+    if translator.cache is not None:
+        extra['hit_ratio'] = f"{translator.cache.stats()['hit_ratio']:.3f}"
+    report(title, latencies, **extra)
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    vocabulary_size = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    latency = (float(sys.argv[3]) if len(sys.argv) > 3 else 5.0) / 1000
+    vocabulary = [f'phrase number {i}' for i in range(vocabulary_size)]
+    workload = zipf_workload(vocabulary, requests)
+    english = Language('Английский', 0, 'en')
+
+    provider = FakeProvider(latency)
+    run('no cache', Translator(english, None, provider, fake_detector), workload, provider)
+
+    provider = FakeProvider(latency)
+    cache = TranslationCache(max_size=vocabulary_size // 4)
+    run('memory LRU (25% of vocab)', Translator(english, cache, provider, fake_detector), workload, provider)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteRepository(os.path.join(tmp, 'cache.db'), 'translation', TRANSLATION_COLUMNS,
+                                 TranslationEntry, 'source_text', unique=[TRANSLATION_KEY])
+        provider = FakeProvider(latency)
+        cache = TranslationCache(store, max_size=vocabulary_size // 4)
+        run('two-tier, cold', Translator(english, cache, provider, fake_detector), workload, provider)
+
+        # simulate restart: memory tier is empty, persistent tier is warm
+        provider = FakeProvider(latency)
+        cache = TranslationCache(store, max_size=vocabulary_size // 4)
+        run('two-tier, after restart', Translator(english, cache, provider, fake_detector), workload, provider)
+
+
+if __name__ == '__main__':
+    main()
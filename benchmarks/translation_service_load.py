@@ -0,0 +1,72 @@
+"""
+Many chats translating at once, with blocking calls on the loop and through
+AsyncTranslationService. Event loop lag is sampled by a ticker task.
+
+Usage: python -m benchmarks.translation_service_load [chats] [latency_ms] [workers]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+
+from benchmarks.common import LAG_TICK, FakeProvider, fake_detector, lag_summary, report, stop_lag_monitor
+from metrics.loop_lag import LoopLagMonitor
+from translation.service import AsyncTranslationService, TranslationCancelled
+from translation.translator import Language, Translator
+
+async def run(title: str, chats: int, translate):
+    latencies = []
+    lags = []
+    monitor = LoopLagMonitor(lags.append, LAG_TICK)
+    monitor.start()
+
+    async def chat(chat_id: int):
+        started = time.perf_counter()
+        await translate(f'message from chat {chat_id}', chat_id)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(chat(i) for i in range(chats)))
+    elapsed = time.perf_counter() - started
+    await stop_lag_monitor(monitor)
+    report(title, latencies, wall=f'{elapsed:.2f}s', chats_per_s=f'{chats / elapsed:.0f}',
+           lag=lag_summary(lags))
+
+
+async def main():
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 20.0) / 1000
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+    translator = Translator(Language('Английский', 0, 'en'), None, FakeProvider(latency), fake_detector)
+
+    async def blocking(text, chat_id):
+        return translator.do_translate(text)
+
+    await run('blocking on the loop', chats, blocking)
+
+    service = AsyncTranslationService(max_workers=workers, max_in_flight=workers * 2)
+
+    async def pooled(text, chat_id):
+        return await service.translate(translator, text, chat_id)
+
+    await run(f'thread pool ({workers} workers)', chats, pooled)
+
+    # half of the chats abandon their request right away
+    async def abandoned(text, chat_id):
+        task = asyncio.ensure_future(service.translate(translator, text, chat_id))
+        await asyncio.sleep(0)
+        if chat_id % 2:
+            service.cancel(chat_id)
+        try:
+            return await task
+        except TranslationCancelled:
+            return None
+
+    await run('half abandoned', chats, abandoned)
+    service.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
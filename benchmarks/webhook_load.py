@@ -0,0 +1,123 @@
+"""
+Load generator for webhook mode: runs the bot of main.py in-process with its
+webhook server, posts synthetic text message updates from many chats and
+reports update processing latency (from the POST to the bot's reply) and
+updates per second.
+
+Bot API calls are answered by LocalBotRequest and translations come from
+FakeProvider, so no token or network is needed. Every chat sends /start
+and /translate first, then its messages are posted one after another
+without waiting for replies.
+
+Usage: python -m benchmarks.webhook_load [updates] [chats] [max_concurrent_updates] [latency_ms]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+
+import main as bot
+from benchmarks.common import FakeProvider, fake_detector, percentile, report
+from runtime.fake_updates import LocalBotRequest, synthetic_update
+from translation.translator import Translator
+
+URL_PATH = 'telegram'
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def wait_replies(replies: Dict[int, List[float]], expected: int, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while sum(map(len, replies.values())) < expected and time.monotonic() < deadline:
+        await asyncio.sleep(0.005)
+
+
+async def wait_quiet(replies: Dict[int, List[float]], quiet: float = 0.5) -> None:
+    """Wait until no reply has come for quiet seconds."""
+    count = -1
+    while sum(map(len, replies.values())) != count:
+        count = sum(map(len, replies.values()))
+        await asyncio.sleep(quiet)
+
+
+async def run(updates: int, chats: int, workers: int, latency: float) -> None:
+    replies: Dict[int, List[float]] = defaultdict(list)
+    request = LocalBotRequest(on_message=lambda message: replies[message[1]].append(message[0]))
+    application = bot.build_application(bot.parse_args(['--max-concurrent-updates', str(workers)]),
+                                         '1:local', request=request)
+    provider = FakeProvider(latency)
+    bot.translators = {lang.id: Translator(lang, bot.translation_cache, provider=provider, detector=fake_detector)
+                        for lang in bot.languages.values()}
+
+    port = free_port()
+    url = f'http://127.0.0.1:{port}/{URL_PATH}'
+    # the startup sequence of run_webhook
+    await application.initialize()
+    await application.post_init(application)
+    await application.updater.start_webhook(listen='127.0.0.1', port=port, url_path=URL_PATH, webhook_url=url)
+    await application.start()
+
+    posted: Dict[int, List[float]] = defaultdict(list)
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=chats), timeout=30.0) as client:
+        async def enter_translator(chat_id: int):
+            for update_id, command in enumerate(('/start', '/translate')):
+                await client.post(url, json=synthetic_update(update_id * chats + chat_id, chat_id, command))
+
+        await asyncio.gather(*(enter_translator(chat_id) for chat_id in range(1, chats + 1)))
+        await wait_quiet(replies)
+        replies.clear()
+
+        async def chat(chat_id: int):
+            # one poster per chat keeps its updates in order
+            for update_id in range(2 * chats + chat_id, 2 * chats + updates + 1, chats):
+                posted[chat_id].append(time.monotonic())
+                await client.post(url, json=synthetic_update(update_id, chat_id, f'phrase {update_id % 200}'))
+
+        started = time.monotonic()
+        await asyncio.gather(*(chat(chat_id) for chat_id in range(1, chats + 1)))
+        await wait_replies(replies, updates)
+        elapsed = time.monotonic() - started
+
+    # every text message gets exactly one reply, in the order of its chat
+    latencies = [replied - sent for chat_id in posted for sent, replied in zip(posted[chat_id], replies[chat_id])]
+    report(f'max_concurrent_updates={workers}', latencies,
+           p99=f'{percentile(latencies, 99) * 1000:.2f}ms',
+           updates_per_s=f'{len(latencies) / elapsed:.0f}',
+           missing=updates - len(latencies))
+
+    await application.updater.stop()
+    await application.stop()
+    await application.shutdown()
+    await application.post_shutdown(application)
+
+
+def main():
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    chats = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 64
+    latency = (float(sys.argv[4]) if len(sys.argv) > 4 else 20.0) / 1000
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        # storage opens databases relative to the working directory
+        os.chdir(directory)
+        try:
+            asyncio.run(run(updates, chats, workers, latency))
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Storage size and show_words latency for a heavy user who repeats phrases,
+with the append-only word_book and with deduplicated rows and hit counts.
+
+Usage: python -m benchmarks.word_book_dedup [distinct_phrases] [repeats]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.common import FakeProvider, fake_detector, report
+from benchmarks.schema_lookup import UserTableEntry
+from repository.sqlite_repository import SQLiteRepository
+from translation.translator import Language, Translator
+
+USER_ID = 42
+
+
+def open_append_only(path: str) -> SQLiteRepository:
+    return SQLiteRepository(path, 'word_book',
+                            {'id': 'INTEGER PRIMARY KEY', 'user_id': 'INTEGER', 'target_lang': 'TEXT',
+                             'phrase': 'TEXT'},
+                            UserTableEntry, 'id', indexes=[('user_id', 'target_lang')])
+
+
+def open_deduplicated(path: str) -> SQLiteRepository:
+    return SQLiteRepository(path, 'word_book',
+                            {'id': 'INTEGER PRIMARY KEY', 'user_id': 'INTEGER NOT NULL',
+                             'target_lang': 'TEXT NOT NULL', 'phrase': 'TEXT NOT NULL',
+                             'hits': 'INTEGER NOT NULL DEFAULT 1', 'last_seen': 'INTEGER NOT NULL DEFAULT 0'},
+                            UserTableEntry, 'id', unique=[('user_id', 'target_lang', 'phrase')])
+
+
+def show_words(word_book: SQLiteRepository, translator: Translator) -> str:
+    words = word_book.get_all({'user_id': USER_ID, 'target_lang': 'en'})
+    phrases = [word.phrase for word in words]
+    translations = translator.do_translate_batch(phrases)
+    return ''.join(f'{phrase} : {translation}\n' for phrase, translation in zip(phrases, translations))
+
+
+def run(title: str, word_book: SQLiteRepository, record, path: str, distinct: int, repeats: int):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for i in range(distinct):
+            record(word_book, UserTableEntry(USER_ID, 'en', f'phrase {i}', last_seen=int(time.time())))
+    writes = distinct * repeats / (time.perf_counter() - started)
+    with word_book._writer() as connection:
+        connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    size = os.path.getsize(path)
+
+    translator = Translator(Language('Английский', 0, 'en'), None, FakeProvider(0), fake_detector)
+    latencies = []
+    for _ in range(10):
+        started = time.perf_counter()
+        text = show_words(word_book, translator)
+        latencies.append(time.perf_counter() - started)
+    report(title, latencies, rows=len(word_book.get_all()), db_kb=size // 1024,
+           writes_per_s=f'{writes:.0f}', message_chars=len(text))
+    word_book.close()
+
+
+def main():
+    distinct = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'append.db')
+        run('append-only', open_append_only(path), SQLiteRepository.add, path, distinct, repeats)
+        path = os.path.join(directory, 'dedup.db')
+        run('deduplicated', open_deduplicated(path),
+            lambda repository, entry: repository.upsert(entry, {'hits': 'sum'}), path, distinct, repeats)
+
+
+if __name__ == '__main__':
+    main()
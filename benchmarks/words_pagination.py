@@ -0,0 +1,72 @@
+"""
+show_words cost as the vocabulary grows: loading everything with get_all
+against keyset pages from get_page. Reports latency and peak memory.
+
+Usage: python -m benchmarks.words_pagination [max_vocabulary]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.common import FakeProvider, fake_detector
+from benchmarks.word_book_dedup import USER_ID, open_deduplicated
+from translation.translator import Language, Translator
+
+PAGE_SIZE = 20
+
+
+def measure(action):
+    tracemalloc.start()
+    started = time.perf_counter()
+    action()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    max_vocabulary = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    translator = Translator(Language('Английский', 0, 'en'), None, FakeProvider(0), fake_detector)
+    where = {'user_id': USER_ID, 'target_lang': 'en'}
+    with tempfile.TemporaryDirectory() as directory:
+        word_book = open_deduplicated(os.path.join(directory, 'words.db'))
+        with word_book._writer() as connection:
+            connection.execute('CREATE INDEX idx_word_book_user_id_target_lang ON word_book (user_id, target_lang)')
+            plan = connection.execute(
+                'EXPLAIN QUERY PLAN SELECT * FROM word_book WHERE user_id = ? AND target_lang = ? AND id > ? '
+                'ORDER BY id LIMIT ?', (USER_ID, 'en', 0, PAGE_SIZE)).fetchall()
+        print('page query plan:', '; '.join(row[-1] for row in plan))
+        size = 0
+        vocabulary = 1000
+        while vocabulary <= max_vocabulary:
+            with word_book._writer() as connection:
+                connection.executemany(
+                    'INSERT INTO word_book (user_id, target_lang, phrase) VALUES (?, ?, ?)',
+                    ((USER_ID, 'en', f'phrase {i}') for i in range(size, vocabulary)))
+            size = vocabulary
+
+            def full():
+                phrases = [word.phrase for word in word_book.get_all(where)]
+                ''.join(f'{p} : {t}\n' for p, t in zip(phrases, translator.do_translate_batch(phrases)))
+
+            def page():
+                words = word_book.get_page(where, after=size // 2, limit=PAGE_SIZE + 1)[:PAGE_SIZE]
+                phrases = [word.phrase for word in words]
+                ''.join(f'{p} : {t}\n' for p, t in zip(phrases, translator.do_translate_batch(phrases)))
+
+            full_time, full_peak = measure(full)
+            page_time, page_peak = measure(page)
+            print(f'vocabulary={vocabulary:<8} get_all: {full_time * 1000:8.1f}ms {full_peak // 1024:7}KiB   '
+                  f'get_page: {page_time * 1000:6.2f}ms {page_peak // 1024:5}KiB')
+            vocabulary *= 10
+        word_book.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+word_book inserts per second with a transaction per message and with
+write-behind batching.
+
+Usage: python -m benchmarks.write_behind [messages] [batch_size]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.schema_lookup import UserTableEntry
+from repository.sqlite_repository import SQLiteRepository
+
+
+def open_word_book(path: str, write_behind: int, synchronous: str) -> SQLiteRepository:
+    word_book = SQLiteRepository(path, 'word_book',
+                                 {'id': 'INTEGER PRIMARY KEY', 'user_id': 'INTEGER NOT NULL',
+                                  'target_lang': 'TEXT NOT NULL', 'phrase': 'TEXT NOT NULL',
+                                  'hits': 'INTEGER NOT NULL DEFAULT 1', 'last_seen': 'INTEGER NOT NULL DEFAULT 0'},
+                                 UserTableEntry, 'id', unique=[('user_id', 'target_lang', 'phrase')],
+                                 write_behind=write_behind)
+    word_book.connection.execute(f'PRAGMA synchronous={synchronous}')
+    return word_book
+
+
+def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    with tempfile.TemporaryDirectory() as directory:
+        for synchronous in ('NORMAL', 'FULL'):
+            for write_behind in (0, batch_size):
+                path = os.path.join(directory, f'words_{synchronous}_{write_behind}.db')
+                word_book = open_word_book(path, write_behind, synchronous)
+                started = time.perf_counter()
+                for i in range(messages):
+                    word_book.upsert(UserTableEntry(i % 100, 'en', f'phrase {i % 5000}', last_seen=i),
+                                     {'hits': 'sum'})
+                word_book.close()
+                elapsed = time.perf_counter() - started
+                title = f'synchronous={synchronous}, ' + (f'batch={write_behind}' if write_behind else 'no batching')
+                print(f'{title:<36} inserts/s={messages / elapsed:.0f}')
+
+
+if __name__ == '__main__':
+    main()
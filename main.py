@@ -1,30 +1,54 @@
-from telegram.ext import *
-from telegram import ReplyKeyboardMarkup, InlineKeyboardMarkup, constants, InlineKeyboardButton, User, Update
+import time
 
-import random as rd
-import langid
-import translators as ts
-from repository.sqlite_repository import SQLiteRepository
-
-with open('token.txt', 'r') as file:
-    tn = file.read().replace('\n', '')
+IMPORT_STARTED = time.perf_counter()
 
+from telegram.ext import Application, ContextTypes, ConversationHandler, CommandHandler, MessageHandler, \
+    CallbackQueryHandler, filters
+from telegram.request import BaseRequest
+from telegram import ReplyKeyboardMarkup, InlineKeyboardMarkup, constants, InlineKeyboardButton, User, Update, Bot
 
-class Language:
-    def __init__(self, full_name: str, lang_id: int, glang_shorty: str):
-        self.full_name = full_name
-        self.id = lang_id
-        self.glang_shorty = glang_shorty
-
+import argparse
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from repository.sqlite_repository import SQLiteRepository
+from repository.async_sqlite_repository import AsyncSQLiteRepository
+from repository.migrations import rebuild_table
+from translation.cache import TranslationCache
+from translation.translator import BOT_LANGUAGES, Translator
+from translation.service import AsyncTranslationService, TranslationCancelled
+from translation.detector import LanguageDetector
+from translation.providers import ResilientProvider, TranslatorsBackend, ProviderUnavailable
+from quiz.engine import QuizEngine
+from quiz.scheduler import QuizScheduler
+from quiz.leaderboard import Leaderboard
+from session.chat_session import ChatSession, ConversationEntry, CHAT_SESSION_COLUMNS, CONVERSATION_COLUMNS
+from session.persistence import RepositoryPersistence
+from runtime.ordered_processor import ChatOrderedUpdateProcessor
+from runtime.sharding import ShardedDispatcher
+from runtime.bot_worker import serve_updates, poll_updates
+from runtime.command_router import CommandRouter, parse_command
+from runtime.startup import StartupProfile
+from metrics.registry import REGISTRY, Timer
+from metrics.exporters import PrometheusExporter, LogExporter
+from metrics.loop_lag import LoopLagMonitor
+from storage import UserTableEntry, QuizScoreTableEntry, open_word_book, open_quiz_schedule, \
+    open_quiz_scoreboard, open_translation_store
+
+# translators and langid are imported on warm-up, not here
+startup_profile = StartupProfile(IMPORT_STARTED)
+startup_profile.mark('imports')
 
 languages = dict()
 language_buttons = []
+# seconds a handler waits for a translation
+TRANSLATION_TIMEOUT = 10.0
 
 
 def init_languages():
-    languages[0] = Language("Английский", 0, 'en')
-    languages[1] = Language("Испанский", 1, 'es')
-    languages[2] = Language("Немецкий", 2, 'de')
+    for lang in BOT_LANGUAGES:
+        languages[lang.id] = lang
 
     for lang in languages.values():
         language_buttons.append([InlineKeyboardButton(
@@ -45,48 +69,20 @@ def init_command_reply_board(coms: list[Command]):
     return ReplyKeyboardMarkup(reply_board_names, one_time_keyboard=False)
 
 
-class Translator:
-    def __init__(self, current_lang: Language):
-        self.lang = current_lang
-
-    def switch_language(self, language: Language):
-        self.lang = language
-
-    def do_translate(self, text: str):
-        text_lang = langid.classify(text)
-        if text_lang[0] == self.lang.glang_shorty:
-            return ts.translate_text(
-                text,
-                from_language=self.lang.glang_shorty,
-                to_language='ru')
-        else:
-            return ts.translate_text(text, to_language=self.lang.glang_shorty)
-
-
-class UserTableEntry:
-    def __init__(self, user_id, target_lang, phrase):
-        self.user_id = user_id
-        self.target_lang = target_lang
-        self.phrase = phrase
-
-
-class QuizScoreTableEntry:
-    def __init__(self, user_id, user_name: str, lang: str, score: int):
-        self.user_id = user_id
-        self.user_name = user_name
-        self.lang = lang
-        self.score = score
-
-
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Bot entry command"""
     await update.message.reply_text('Добро пожаловать в PolyGlotBot!\n Список доступных команд:', reply_markup=main_state.reply_keyboard)
     await main_state.execute_command('help', update, context)
-    context.chat_data['state'] = main_state
-    context.chat_data['lang'] = Translator(languages[0])
+    context.chat_data['state'] = main_state.id
+    context.chat_data['lang'] = languages[0].id
     return MAIN_STATE
 
 
+def chat_translator(context: ContextTypes.DEFAULT_TYPE) -> Translator:
+    """Translator for the language chosen in chat."""
+    return translators[context.chat_data['lang']]
+
+
 async def choose_lang(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Language switch option."""
     await update.message.reply_text("Выбери язык:", reply_markup=reply_markup)
@@ -102,71 +98,68 @@ async def button(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if variant.startswith('lang: '):
         lang = languages[int(variant[len('lang: '):])]
         await query.edit_message_text(text=f"Выбранный язык: *{lang.full_name}*", parse_mode=constants.ParseMode.MARKDOWN_V2)
-        context.chat_data['lang'].switch_language(lang)
+        context.chat_data['lang'] = lang.id
+    elif variant.startswith('words: '):
+        key = int(variant[len('words: ') + 1:])
+        direction = {'after': key} if variant[len('words: ')] == '>' else {'before': key}
+        text, markup = await render_words_page(
+            query.from_user['id'], chat_translator(context), update.effective_chat.id, **direction)
+        await query.edit_message_text(text=text, reply_markup=markup)
 
 
 async def start_quiz(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    cur_lang = context.chat_data['lang'].lang.glang_shorty
-    user_id = update.message.from_user['id']
-    words = word_book.get_all({'user_id': user_id, 'target_lang': cur_lang})
+    # questions come from the schedule, the vocabulary is never loaded whole
     context.chat_data['quiz_score'] = 0
-    context.chat_data['quiz_word_pool'] = words
+    quiz_engine.start(update.effective_chat.id, update.message.from_user['id'], chat_translator(context))
 
 
 async def quiz_next_quest(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    cur_lang = context.chat_data['lang'].lang.glang_shorty
-    trans = context.chat_data['lang']
-    user_id = update.message.from_user['id']
-
-    pool = context.chat_data['quiz_word_pool']
-    phrase_ids = rd.sample(range(len(pool)), k=4)
-    correct_ans_idx = rd.randrange(4)
-    phrase = pool[phrase_ids[correct_ans_idx]].phrase
-    context.chat_data['quiz_correct_ans'] = str(correct_ans_idx)
+    question = await quiz_engine.next_question(
+        update.effective_chat.id, update.message.from_user['id'], chat_translator(context))
+    if question is None:
+        await update.message.reply_text('Для квиза нужно хотя бы два изученных слова.')
+        return
+
+    context.chat_data['quiz_correct_ans'] = str(question.correct)
+    context.chat_data['quiz_phrase'] = question.phrase
     answers_buttons = []
 
-    for i in range(4):
-        answers_buttons.append([InlineKeyboardButton(trans.do_translate(
-            pool[phrase_ids[i]].phrase), callback_data=str(i))])
+    for i, option in enumerate(question.options):
+        answers_buttons.append([InlineKeyboardButton(option, callback_data=str(i))])
     reply_quiz = InlineKeyboardMarkup(answers_buttons)
-    await update.message.reply_text('Выберите правильный перевод фразы:\n *' + phrase + '*', reply_markup=reply_quiz, parse_mode=constants.ParseMode.MARKDOWN_V2)
+    await update.message.reply_text('Выберите правильный перевод фразы:\n *' + question.phrase + '*', reply_markup=reply_quiz, parse_mode=constants.ParseMode.MARKDOWN_V2)
 
 
-def update_scoreboard(user: User, lang: str, score: int):
-    user_id = user['id']
-    entry = quiz_scoreboard.get_all({'user_id': user_id, 'lang': lang})
-    if len(entry) != 0:
-        if entry[0].score > score:
-            return
-        else:
-            entry[0].score = score
-            quiz_scoreboard.update(entry[0])
-    else:
-        quiz_scoreboard.add(
-            QuizScoreTableEntry(
-                user_id,
-                user['username'],
-                lang,
-                score))
+async def update_scoreboard(user: User, lang: str, score: int):
+    """Keep the best score of user for lang."""
+    await leaderboard.record(
+        QuizScoreTableEntry(
+            user['id'],
+            user['username'],
+            lang,
+            score))
 
 
 async def show_scoreboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    cur_lang = context.chat_data['lang'].lang
-    top_n = quiz_scoreboard.get_first_ordered(
-        'score', 10, True, {'lang': cur_lang.glang_shorty})
+    cur_lang = chat_translator(context).lang
+    top_n = await leaderboard.top(cur_lang.glang_shorty)
     text_board = ''
     i = 1
     for entry in top_n:
         text_board += f'#{i}: @{entry.user_name} : {entry.score}\n'
         i += 1
+    rank = await leaderboard.rank(update.message.from_user['id'], cur_lang.glang_shorty)
+    if rank is not None:
+        text_board += f'\nВаше место: #{rank[0]} ({rank[1]})\n'
     await update.message.reply_text(f'Таблица рекордов для языка {cur_lang.full_name}:\n' + text_board)
 
 
 async def quiz_exit(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.message.from_user
-    cur_lang = context.chat_data['lang'].lang.glang_shorty
+    cur_lang = chat_translator(context).lang.glang_shorty
     score = context.chat_data['quiz_score']
-    update_scoreboard(user, cur_lang, score)
+    quiz_engine.stop(update.effective_chat.id)
+    await update_scoreboard(user, cur_lang, score)
     await update.message.reply_text(f'Ваш результат ({score}) был сохранен.\n')
 
 
@@ -177,8 +170,14 @@ async def quiz_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     await query.answer()
 
-    cur_lang = context.chat_data['lang'].lang.glang_shorty
-    if variant == context.chat_data['quiz_correct_ans']:
+    cur_lang = chat_translator(context).lang.glang_shorty
+    correct = variant == context.chat_data['quiz_correct_ans']
+    # a question is rescheduled once, whichever button is pressed first
+    phrase = context.chat_data.pop('quiz_phrase', None)
+    if phrase is not None:
+        await quiz_engine.answer(update.effective_chat.id, query.from_user['id'], chat_translator(context),
+                                 phrase, correct)
+    if correct:
         context.chat_data['quiz_score'] += 1
         score = context.chat_data['quiz_score']
         await query.edit_message_text(text=f"Ваш ответ правильный! Всего очков набрано: {score}(+1)")
@@ -186,43 +185,84 @@ async def quiz_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
     else:
         context.chat_data['quiz_score'] += 1
         score = context.chat_data['quiz_score']
-        update_scoreboard(query.from_user, cur_lang, score)
+        quiz_engine.stop(update.effective_chat.id)
+        await update_scoreboard(query.from_user, cur_lang, score)
         await query.edit_message_text(text=f"Ваш ответ неверный! Квиз окончен.\nВсего очков набрано: {score}")
         await query.message.reply_text("Выходим...\n", reply_markup=main_state.reply_keyboard)
-        context.chat_data['state'] = main_state
+        context.chat_data['state'] = main_state.id
         return MAIN_STATE
 
 
 async def text_for_translate(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Translate given phrase."""
-    word_book.add(
+    # phrase is stored once per user and language, repeats only bump the counter
+    await word_book.upsert(
         UserTableEntry(
             update.message.from_user['id'],
-            context.chat_data['lang'].lang.glang_shorty,
-            update.message.text))
-    await update.message.reply_text(context.chat_data['lang'].do_translate(update.message.text))
+            chat_translator(context).lang.glang_shorty,
+            update.message.text,
+            last_seen=int(time.time())),
+        {'hits': 'sum'})
+    await quiz_scheduler.enroll(
+        update.message.from_user['id'], chat_translator(context).lang.glang_shorty, update.message.text)
+    await update.message.reply_text(await translation_service.translate(
+        chat_translator(context), update.message.text, update.effective_chat.id))
 
 
 async def show_status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """ Show current options. """
-    cur_lang = context.chat_data['lang'].lang.full_name
+    cur_lang = chat_translator(context).lang.full_name
     await update.message.reply_text(f'Текущие настройки:\n Язык - *' + cur_lang + '*\nРежим: *' +
-                                    context.chat_data['state'].help_name + '*', parse_mode=constants.ParseMode.MARKDOWN_V2)
+                                    states_by_id[context.chat_data['state']].help_name + '*', parse_mode=constants.ParseMode.MARKDOWN_V2)
 
 
-async def show_words(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Show words being prompted before."""
-    cur_lang = context.chat_data['lang'].lang.glang_shorty
-    user_id = update.message.from_user['id']
-    words = word_book.get_all({'user_id': user_id, 'target_lang': cur_lang})
+# Phrases per show_words page and max length of a phrase in the listing,
+# together they keep a page below telegram message size limit
+WORDS_PAGE_SIZE = 20
+WORDS_LINE_LIMIT = 90
+
+
+def clip(text: str, limit: int = WORDS_LINE_LIMIT) -> str:
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+
+async def render_words_page(user_id: int, translator: Translator, chat_id: int,
+                            after: int | None = None, before: int | None = None):
+    """Text and navigation keyboard for one page of user phrases."""
+    where = {'user_id': user_id, 'target_lang': translator.lang.glang_shorty}
+    # phrases translated moments ago may still be buffered
+    await word_book.flush()
+    words = await word_book.get_page(where, after=after, before=before, limit=WORDS_PAGE_SIZE + 1)
+    if before is not None:
+        has_prev, has_next = len(words) > WORDS_PAGE_SIZE, True
+        words = words[-WORDS_PAGE_SIZE:]
+    else:
+        has_prev, has_next = after is not None, len(words) > WORDS_PAGE_SIZE
+        words = words[:WORDS_PAGE_SIZE]
+    if not words:
+        return 'Вы еще не перевели ни одной фразы.', None
+
+    phrases = [word.phrase for word in words]
+    translations = await translation_service.translate_batch(translator, phrases, chat_id)
     words_list_str = ''
-    for word in words:
-        words_list_str += word.phrase + ' : ' + \
-            context.chat_data['lang'].do_translate(word.phrase) + '\n'
-    display_message = 'Вами было изучено ' + \
-        str(len(words)) + ' слов и выражений:\n' + words_list_str
+    for phrase, translation in zip(phrases, translations):
+        words_list_str += clip(phrase) + ' : ' + clip(translation) + '\n'
+
+    navigation = []
+    if has_prev:
+        navigation.append(InlineKeyboardButton('◀', callback_data=f'words: <{words[0].id}'))
+    if has_next:
+        navigation.append(InlineKeyboardButton('▶', callback_data=f'words: >{words[-1].id}'))
+    markup = InlineKeyboardMarkup([navigation]) if navigation else None
+    total = await word_book.count(where)
+    return f'Изученные слова и выражения ({total}):\n' + words_list_str, markup
 
-    await update.message.reply_text(display_message)
+
+async def show_words(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show words being prompted before."""
+    text, markup = await render_words_page(
+        update.message.from_user['id'], chat_translator(context), update.effective_chat.id)
+    await update.message.reply_text(text, reply_markup=markup)
 
 
 async def null_action(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -230,15 +270,73 @@ async def null_action(update: Update, context: ContextTypes.DEFAULT_TYPE):
     pass
 
 
-async def common_command_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Command dispatcher for BotState."""
-    state = context.chat_data['state']
-    command_name = update.message.text[1:]
+async def common_command_handler(update: Update, context: ContextTypes.DEFAULT_TYPE, command_name: str):
+    """Command dispatcher for BotState, called by the CommandRouter of the state."""
+    state = states_by_id[context.chat_data['state']]
     next_state = await state.execute_command(command_name, update, context)
-    context.chat_data['state'] = next_state
+    context.chat_data['state'] = next_state.id
     return next_state.id
 
 
+def abandon_translations(chat_id: int, update: Update) -> None:
+    """A command waiting behind running updates of its chat abandons their translations."""
+    if update.message is not None and parse_command(update.message.text) is not None:
+        translation_service.cancel(chat_id)
+
+
+async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
+    """Report translation timeouts and unavailable backends, ignore abandoned translations."""
+    if isinstance(context.error, TranslationCancelled):
+        return
+    if isinstance(context.error, (TimeoutError, ProviderUnavailable)) and isinstance(update, Update) and update.effective_message:
+        await update.effective_message.reply_text('Переводчик не отвечает, попробуйте позже.')
+        return
+    logging.getLogger(__name__).error('Exception while handling an update:', exc_info=context.error)
+
+
+async def startup(application: Application):
+    """Warm models, backends and connections before the first update instead of on it."""
+    startup_profile.mark('application initialize')
+    await startup_profile.run_parallel('warm-up', {
+        'language model': language_detector.warm,
+        'translation backends': translation_provider.warm,
+        'word_book connections': word_book.sync.warm,
+        'quiz_schedule connections': quiz_schedule.sync.warm,
+        'quiz_score connections': quiz_scoreboard.sync.warm,
+        'translation store connections': translation_cache.store.warm,
+    })
+    await leaderboard.load()
+    startup_profile.mark('leaderboard')
+    loop_lag.start()
+    for exporter in exporters:
+        exporter.start()
+    startup_profile.mark('metrics')
+    print(startup_profile.report())
+
+
+async def shutdown(application: Application):
+    for exporter in exporters:
+        exporter.stop()
+    loop_lag.stop()
+    translation_service.shutdown()
+    fetch_executor.shutdown(wait=False, cancel_futures=True)
+    word_book.close()
+    quiz_schedule.close()
+    quiz_scoreboard.close()
+
+
+def timed_handler(callback, state_id: int):
+    """Wrap handler callback to record its latency and failures."""
+    histogram = REGISTRY.histogram('handler_seconds', handler=callback.__name__, state=state_id)
+    errors = REGISTRY.counter('handler_errors_total', handler=callback.__name__, state=state_id)
+
+    @functools.wraps(callback)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        with Timer(histogram, errors):
+            return await callback(update, context)
+    return wrapper
+
+
 class BotState:
     """
     Represents a state in ConversationHandler.
@@ -255,6 +353,8 @@ class BotState:
         self.custom_handlers = []
         self.command_list = {}
         self.reply_keyboard = None
+        self.help_text = ''
+        self.routes = {}
 
     def add_command(
             self,
@@ -271,39 +371,36 @@ class BotState:
 
     async def execute_command(self, name: str, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Execute command and switch to next state. Called by common_command_handler()."""
-        if name == 'help':
-            await self.__show_help(update, context)
-            return self
-
-        if name in self.command_list:
-            command = self.command_list[name]
-            if command[1] is not self:
-                await update.message.reply_text(command[2], reply_markup=command[1].reply_keyboard)
-            await command[0].action(update, context)
-            return command[1]
-        else:
+        route = self.routes.get(name)
+        if route is None:
             return self
+        command, next_state, state_switch_message = route
+        with REGISTRY.timer('handler_seconds', 'handler_errors_total', handler=command.name, state=self.id):
+            if next_state is not self:
+                await update.message.reply_text(state_switch_message, reply_markup=next_state.reply_keyboard)
+            await command.action(update, context)
+        return next_state
 
     async def __show_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show help for current state commands."""
-        help_text = ''
-        for command in self.command_list.values():
-            help_text += '/' + command[0].name + " - " + command[0].desc + '\n'
-        await update.message.reply_text(help_text)
+        await update.message.reply_text(self.help_text)
 
     def build(self):
-        """Builds a list of handlers used to create ConversationHandler. Also creates a reply keyboard."""
-        just_command_list = []
-        for com in self.command_list.values():
-            just_command_list.append(com[0])
+        """
+        Builds a list of handlers used to create ConversationHandler.
+        Help text, reply keyboard and command routes are prepared once here,
+        all commands of the state are matched by a single CommandRouter.
+        """
+        just_command_list = [com[0] for com in self.command_list.values()]
         self.reply_keyboard = init_command_reply_board(just_command_list)
-        handlers = []
-        for com in just_command_list:
-            handlers.append(CommandHandler(com.name, common_command_handler))
+        self.help_text = ''.join('/' + com.name + ' - ' + com.desc + '\n' for com in just_command_list)
+        self.routes = {name: tuple(com) for name, com in self.command_list.items()}
+        self.routes['help'] = (Command('help', self.__show_help, 'показать список команд'), self, '')
+
+        handlers = [CommandRouter(self.routes, common_command_handler)]
         for custom_handler in self.custom_handlers:
+            custom_handler.callback = timed_handler(custom_handler.callback, self.id)
             handlers.append(custom_handler)
-
-        handlers.append(CommandHandler('help', common_command_handler))
         return handlers
 
 
@@ -357,7 +454,7 @@ def init_states():
             show_status,
             'показать текущие настройки'),
         main_state)
-    main_state.add_custom_handler(CallbackQueryHandler(button))
+    main_state.add_custom_handler(CallbackQueryHandler(button, pattern=r'^(lang|words): '))
 
     # fill translating state commands
     translating_state.add_command(
@@ -398,55 +495,204 @@ def init_states():
             quiz_next_quest,
             'попросить еще один вопрос'),
         quiz_state)
-    quiz_state.add_custom_handler(CallbackQueryHandler(quiz_answer))
+    # only answer buttons, ◀/▶ of a words page sent before the quiz are not answers
+    quiz_state.add_custom_handler(CallbackQueryHandler(quiz_answer, pattern=r'^\d+$'))
 
     states_list = [main_state, translating_state, quiz_state]
 
     return states_list
 
 
-if __name__ == '__main__':
-    # Init repository to store per-user prompted phrases
-    word_book = SQLiteRepository('user_phrase_base.db',
-                                 'word_book',
-                                 {'user_id': 'INTEGER',
-                                  'target_lang': 'TEXT',
-                                  'phrase': 'TEXT'},
-                                 UserTableEntry,
-                                 'user_id')
-
-    quiz_scoreboard = SQLiteRepository(
-        'quiz_scoreboard.db',
-        'quiz_score',
-        {
-            'user_id': 'INTEGER',
-            'user_name': 'TEXT',
-            'lang': 'TEXT',
-            'score': 'INTEGER'},
-        QuizScoreTableEntry,
-        'user_id')
+def read_token(path: str = 'token.txt') -> str:
+    with open(path, 'r') as file:
+        return file.read().replace('\n', '')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='PolyGlotBot')
+    parser.add_argument('--webhook-url', help='public base url, run webhook server instead of polling')
+    parser.add_argument('--listen', default='0.0.0.0', help='webhook server address')
+    parser.add_argument('--port', type=int, default=8443, help='webhook server port')
+    parser.add_argument('--url-path', default='telegram', help='webhook path')
+    parser.add_argument('--secret-token', help='secret expected in webhook requests')
+    parser.add_argument('--poll-interval', type=float, default=0.0, help='delay between polls')
+    parser.add_argument('--max-concurrent-updates', type=int, default=64,
+                        help='number of chats processed at once, updates of one chat keep their order')
+    parser.add_argument('--shards', type=int, default=1,
+                        help='worker processes, chats are partitioned between them by chat_id')
+    parser.add_argument('--metrics-port', type=int,
+                        help='serve prometheus metrics on this port (port + shard with --shards)')
+    parser.add_argument('--metrics-log-interval', type=float, default=0.0,
+                        help='log metrics every N seconds')
+    args = parser.parse_args(argv)
+    if args.shards > 1 and args.webhook_url:
+        parser.error('--shards works with polling only')
+    return args
+
+
+def build_application(args, token: str, request: BaseRequest | None = None) -> Application:
+    """
+    Open storage, create services and the application, they are module globals used by handlers.
+    request replaces the HTTP client of the bot, e.g. with runtime.fake_updates.LocalBotRequest.
+    """
+    global word_book, quiz_schedule, quiz_scoreboard, translation_cache, main_state, states_by_id, reply_markup, \
+        language_detector, translation_provider, fetch_executor, translators, translation_service, \
+        quiz_scheduler, quiz_engine, leaderboard, loop_lag, exporters
+
+    # Init repositories to store per-user prompted phrases, their quiz schedule and quiz scores
+    word_book = AsyncSQLiteRepository(open_word_book())
+    quiz_schedule = AsyncSQLiteRepository(open_quiz_schedule())
+    quiz_scoreboard = AsyncSQLiteRepository(open_quiz_scoreboard())
+
+    # Init two-tier cache for translated phrases
+    translation_cache = TranslationCache(open_translation_store())
+    startup_profile.mark('open storage')
 
     # Init states for conversation
     states = init_states()
     main_state = states[0]
+    states_by_id = {}
     states_dict = {}
     for state in states:
+        states_by_id[state.id] = state
         states_dict[state.id] = state.build()
 
-    # Init language table and translator
+    # Init language table and one translator per language
     init_languages()
     reply_markup = InlineKeyboardMarkup(language_buttons)
-    translator = Translator(languages[0])
-
-    application = Application.builder().token(tn).build()
-
-    # Main conversation handler
+    language_detector = LanguageDetector(['ru'] + [lang.glang_shorty for lang in languages.values()])
+    # Backends of translators in order of preference, throttled, retried and coalesced.
+    # A translation gives up before the service stops waiting for it, a hanging
+    # backend only takes its share of that time and the fallbacks are still tried
+    translation_provider = ResilientProvider(
+        [(name, TranslatorsBackend(name, timeout=5.0)) for name in ('bing', 'google', 'yandex')],
+        rate=5.0, burst=10, retries=2, failure_threshold=5, reset_timeout=30.0,
+        deadline=TRANSLATION_TIMEOUT - 1.0)
+    # Requests of word list batches share one pool, with the service workers it
+    # bounds the provider calls made at once, however many batches are running
+    fetch_executor = ThreadPoolExecutor(8, thread_name_prefix='fetch')
+    translators = {lang.id: Translator(lang, translation_cache, provider=translation_provider,
+                                       detector=language_detector.classify, executor=fetch_executor)
+                   for lang in languages.values()}
+
+    # Blocking translation calls run on a thread pool
+    translation_service = AsyncTranslationService(
+        max_workers=8, max_in_flight=64, timeout=TRANSLATION_TIMEOUT, batch_timeout=60.0)
+
+    # Quiz asks due phrases first, questions are prepared in background
+    quiz_scheduler = QuizScheduler(quiz_schedule, word_book)
+    quiz_engine = QuizEngine(quiz_scheduler, translation_service)
+
+    # Top scores are cached per language
+    leaderboard = Leaderboard(quiz_scoreboard, [lang.glang_shorty for lang in languages.values()])
+    startup_profile.mark('create services')
+
+    # Metrics are recorded all the time, exporters are optional
+    REGISTRY.describe('handler_seconds', 'Handler latency by state and handler')
+    REGISTRY.describe('translator_seconds', 'Translation provider call latency')
+    REGISTRY.describe('repository_query_seconds', 'SQLite repository call latency by method and table')
+    REGISTRY.describe('event_loop_lag_seconds', 'Delay of event loop wake-ups')
+    REGISTRY.gauge('translation_cache_hit_ratio', lambda: translation_cache.stats()['hit_ratio'])
+    REGISTRY.gauge('language_detector_hit_ratio', lambda: language_detector.stats()['hit_ratio'])
+    REGISTRY.gauge('translations_in_flight', translation_service.in_flight)
+    REGISTRY.gauge('provider_coalesced', lambda: translation_provider.coalesced)
+    loop_lag = LoopLagMonitor(REGISTRY.histogram('event_loop_lag_seconds').observe)
+    exporters = []
+    if args.metrics_port:
+        exporters.append(PrometheusExporter(REGISTRY, args.metrics_port))
+    if args.metrics_log_interval:
+        exporters.append(LogExporter(REGISTRY, args.metrics_log_interval))
+
+    # Chat sessions and conversation states survive restarts
+    persistence = RepositoryPersistence(
+        AsyncSQLiteRepository(SQLiteRepository(
+            'chat_session.db',
+            'chat_session',
+            CHAT_SESSION_COLUMNS,
+            ChatSession,
+            'chat_id',
+            # quiz_word_ids was replaced by quiz_phrase
+            migrations=[rebuild_table()],
+            write_behind=100,
+            flush_interval=1.0)),
+        AsyncSQLiteRepository(SQLiteRepository(
+            'chat_session.db',
+            'conversation',
+            CONVERSATION_COLUMNS,
+            ConversationEntry,
+            'name',
+            primary_key=('name', 'conv_key'))),
+        update_interval=5.0)
+
+    builder = Application.builder().token(token).persistence(persistence) \
+        .concurrent_updates(ChatOrderedUpdateProcessor(args.max_concurrent_updates, abandon_translations)) \
+        .post_init(startup).post_shutdown(shutdown)
+    if request is not None:
+        builder = builder.request(request)
+    application = builder.build()
+
+    # Main conversation handler. It blocks: a non-blocking conversation drops
+    # updates of a chat while the previous one is handled. Chats are served
+    # concurrently by the update processor instead.
     application.add_handler(ConversationHandler(
         entry_points=[CommandHandler("start", start_command)],
         states=states_dict,
         fallbacks=[MessageHandler(filters.Regex("^Done$"), null_action)],
+        name='main',
+        persistent=True,
     ))
+    application.add_error_handler(error_handler)
+    startup_profile.mark('build application')
+
+    return application
+
+
+def configure_logging(args) -> None:
+    """Log to stderr. Metrics snapshots of --metrics-log-interval are INFO records."""
+    logging.basicConfig(format='%(asctime)s %(name)s %(levelname)s %(message)s',
+                        level=logging.INFO if args.metrics_log_interval else logging.WARNING)
+    # a line per polling request otherwise
+    logging.getLogger('httpx').setLevel(logging.WARNING)
 
-    # Run bot
-    print('running....')
-    application.run_polling(1.0)
+
+def run_worker(shard: int, updates, args, token: str, request: BaseRequest | None = None):
+    """Process of the multi-process mode, serves chats of one shard. request is passed to build_application."""
+    configure_logging(args)
+    if args.metrics_port:
+        args.metrics_port += shard
+    # imports were done by the parent, the profile starts with the worker
+    startup_profile.reset()
+    application = build_application(args, token, request)
+    asyncio.run(serve_updates(application, updates))
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    configure_logging(args)
+    token = read_token()
+
+    if args.shards > 1:
+        # storage is opened by workers, the dispatcher only routes updates
+        print(f'running {args.shards} shards....')
+        dispatcher = ShardedDispatcher(args.shards, run_worker, args, token)
+        dispatcher.start()
+        try:
+            asyncio.run(poll_updates(Bot(token), dispatcher))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            dispatcher.stop()
+    else:
+        application = build_application(args, token)
+
+        # Run bot
+        print('running....')
+        if args.webhook_url:
+            application.run_webhook(
+                listen=args.listen,
+                port=args.port,
+                url_path=args.url_path,
+                webhook_url=args.webhook_url.rstrip('/') + '/' + args.url_path,
+                secret_token=args.secret_token)
+        else:
+            application.run_polling(args.poll_interval)
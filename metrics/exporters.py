@@ -0,0 +1,117 @@
+"""
+Exporters publish a MetricsRegistry: a Prometheus text endpoint or a
+periodic log dump. Both run on a daemon thread and have start()/stop().
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+from metrics.registry import Counter, Histogram, Labels, MetricsRegistry
+
+
+def _format_labels(labels: Labels, extra: str = '') -> str:
+    parts = [f'{label}="{value}"' for label, value in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def render_prometheus(registry: MetricsRegistry) -> str:
+    """Registry in the Prometheus text exposition format."""
+    lines: List[str] = []
+    described = set()
+    for name, kind, help_text, labels, metric in registry.collect():
+        if name not in described:
+            described.add(name)
+            if help_text:
+                lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+        if isinstance(metric, Histogram):
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float('inf'),), metric.counts):
+                cumulative += count
+                le = 'le="' + ('+Inf' if bound == float('inf') else repr(bound)) + '"'
+                lines.append(f'{name}_bucket{_format_labels(labels, le)} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {metric.sum}')
+            lines.append(f'{name}_count{_format_labels(labels)} {metric.count}')
+        elif isinstance(metric, Counter):
+            lines.append(f'{name}{_format_labels(labels)} {metric.value}')
+        else:
+            lines.append(f'{name}{_format_labels(labels)} {metric}')
+    return '\n'.join(lines) + '\n'
+
+
+class PrometheusExporter:
+    """Serves GET /metrics on host:port."""
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = '0.0.0.0'):
+        self.registry = registry
+        self.address = (host, port)
+        self._server: ThreadingHTTPServer | None = None
+
+    def start(self) -> None:
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = render_prometheus(registry).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(self.address, Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class LogExporter:
+    """Logs a summary of all metrics every interval seconds."""
+
+    def __init__(self, registry: MetricsRegistry, interval: float = 60.0,
+                 logger: logging.Logger | None = None):
+        self.registry = registry
+        self.interval = interval
+        self.logger = logger or logging.getLogger('metrics')
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        self._stop.clear()
+        threading.Thread(target=self._run, name='metrics-log', daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.dump()
+
+    def dump(self) -> None:
+        for name, kind, help_text, labels, metric in self.registry.collect():
+            title = name + _format_labels(labels)
+            if isinstance(metric, Histogram):
+                if metric.count:
+                    self.logger.info('%s n=%d mean=%.2fms p50<=%.2fms p99<=%.2fms', title, metric.count,
+                                     metric.sum / metric.count * 1000, metric.quantile(0.5) * 1000,
+                                     metric.quantile(0.99) * 1000)
+            elif isinstance(metric, Counter):
+                self.logger.info('%s %d', title, metric.value)
+            else:
+                self.logger.info('%s %.4g', title, metric)
@@ -0,0 +1,33 @@
+"""Event loop lag: how late a periodic task wakes up."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Callable
+
+
+class LoopLagMonitor:
+    """
+    Passes wake-up delay of a task sleeping interval seconds to observe, e.g.
+    Histogram.observe, or list.append to keep the samples.
+    """
+
+    def __init__(self, observe: Callable[[float], None], interval: float = 0.5):
+        self.observe = observe
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.observe(max(0.0, time.perf_counter() - expected))
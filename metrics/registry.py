@@ -0,0 +1,138 @@
+"""
+In-process metrics: counters, latency histograms and callback gauges.
+
+Recording is a bisect and a few additions under a lock, cheap enough to stay
+on in production. Metrics are identified by name and labels, the registry is
+read by exporters (see metrics.exporters).
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Sequence, Tuple
+
+# Upper bounds in seconds, from a fast SQLite lookup to a slow translation
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """Counts of observations per bucket, the last bucket is +Inf."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile, q in [0, 1]."""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if not total:
+            return 0.0
+        seen = 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            if seen >= q * total:
+                return bound
+        return float('inf')
+
+
+class Timer:
+    """Context manager observing elapsed seconds, exceptions are counted in errors."""
+
+    __slots__ = ('histogram', 'errors', 'started')
+
+    def __init__(self, histogram: Histogram, errors: Counter | None):
+        self.histogram = histogram
+        self.errors = errors
+
+    def __enter__(self) -> Timer:
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.histogram.observe(time.perf_counter() - self.started)
+        if exc_type is not None and self.errors is not None:
+            self.errors.inc()
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[Tuple[str, Labels], Any] = {}
+        self._kinds: Dict[str, str] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind: str, name: str, labels: Dict[str, Any], factory: Callable[[], Any]) -> Any:
+        key = (name, tuple((label, str(value)) for label, value in labels.items()))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    if self._kinds.setdefault(name, kind) != kind:
+                        raise ValueError(f'{name} is already registered as {self._kinds[name]}')
+                    metric = self._metrics[key] = factory()
+        return metric
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def counter(self, name: str, **labels: Any) -> Counter:
+        return self._get('counter', name, labels, Counter)
+
+    def histogram(self, name: str, buckets: Sequence[float] = LATENCY_BUCKETS, **labels: Any) -> Histogram:
+        return self._get('histogram', name, labels, lambda: Histogram(buckets))
+
+    def gauge(self, name: str, fn: Callable[[], float], **labels: Any) -> None:
+        """Register fn, it is called when the metrics are collected."""
+        key = (name, tuple((label, str(value)) for label, value in labels.items()))
+        with self._lock:
+            self._kinds.setdefault(name, 'gauge')
+            self._metrics[key] = fn
+
+    def timer(self, name: str, errors: str | None = None, **labels: Any) -> Timer:
+        """Time a block into histogram name, exceptions increment counter errors."""
+        return Timer(self.histogram(name, **labels), self.counter(errors, **labels) if errors else None)
+
+    def collect(self) -> Iterator[Tuple[str, str, str, Labels, Any]]:
+        """(name, kind, help, labels, metric) sorted by name, gauges are evaluated."""
+        with self._lock:
+            items = sorted(self._metrics.items())
+        for (name, labels), metric in items:
+            kind = self._kinds[name]
+            if kind == 'gauge':
+                try:
+                    metric = float(metric())
+                except Exception:
+                    continue
+            yield name, kind, self._help.get(name, ''), labels, metric
+
+
+# Default registry instrumented code records into
+REGISTRY = MetricsRegistry()
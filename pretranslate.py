@@ -0,0 +1,107 @@
+"""
+Offline pre-translation of the vocabulary.
+
+Streams word_book in id order, translates every distinct (phrase, language)
+pair in parallel and stores the results in the persistent translation cache,
+where do_translate, show_words and the quiz find them. The last processed
+word_book id is saved to a checkpoint file after every batch, so an
+interrupted run continues where it stopped.
+
+Usage: python pretranslate.py [--batch 500] [--workers 16] [--checkpoint pretranslate.checkpoint] [--reset]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from typing import Dict, List, Set, Tuple
+
+from storage import open_word_book, open_translation_store
+from translation.cache import TranslationCache
+from translation.detector import LanguageDetector
+from translation.providers import ResilientProvider, TranslatorsBackend
+from translation.translator import BOT_LANGUAGES, Translator
+
+
+def read_checkpoint(path: str) -> int | None:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as file:
+        return int(file.read().strip())
+
+
+def write_checkpoint(path: str, last_id: int) -> None:
+    # replace atomically, a crash never leaves a torn checkpoint
+    with open(path + '.tmp', 'w') as file:
+        file.write(str(last_id))
+    os.replace(path + '.tmp', path)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Translate word_book phrases into the translation cache')
+    parser.add_argument('--batch', type=int, default=500, help='word_book rows per batch and checkpoint')
+    parser.add_argument('--workers', type=int, default=16, help='parallel translation requests')
+    parser.add_argument('--checkpoint', default='pretranslate.checkpoint', help='checkpoint file')
+    parser.add_argument('--reset', action='store_true', help='start from the first word_book row')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.reset and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    word_book = open_word_book(write_behind=0)
+    store = open_translation_store(write_behind=args.batch)
+    cache = TranslationCache(store)
+    detector = LanguageDetector(['ru'] + [lang.glang_shorty for lang in BOT_LANGUAGES])
+    provider = ResilientProvider(
+        [(name, TranslatorsBackend(name, timeout=5.0)) for name in ('bing', 'google', 'yandex')],
+        rate=5.0, burst=10, retries=2, failure_threshold=5, reset_timeout=30.0)
+    translators = {lang.glang_shorty: Translator(lang, cache, provider=provider, detector=detector.classify,
+                                                 max_workers=args.workers)
+                   for lang in BOT_LANGUAGES}
+
+    after = read_checkpoint(args.checkpoint)
+    total = word_book.count(greater_than={'id': after}) if after is not None else word_book.count()
+    print(f'{total} word_book rows to process' + (f' after id {after}' if after is not None else ''))
+
+    seen: Set[Tuple[str, str]] = set()
+    rows = 0
+    phrases = 0
+    started = time.perf_counter()
+    while True:
+        page = word_book.get_page(after=after, limit=args.batch)
+        if not page:
+            break
+
+        # distinct phrases of this batch not translated earlier in the run
+        pending: Dict[str, List[str]] = {}
+        for word in page:
+            key = (word.phrase, word.target_lang)
+            if key not in seen and word.target_lang in translators:
+                seen.add(key)
+                pending.setdefault(word.target_lang, []).append(word.phrase)
+        for lang, texts in pending.items():
+            translators[lang].do_translate_batch(texts)
+            phrases += len(texts)
+
+        store.flush()
+        after = page[-1].id
+        write_checkpoint(args.checkpoint, after)
+
+        rows += len(page)
+        elapsed = time.perf_counter() - started
+        stats = cache.stats()
+        print(f'{rows}/{total} rows ({rows / max(1, total):.0%}), {phrases} distinct phrases, '
+              f'{stats["misses"]} translated, {stats["store_hits"]} already stored, '
+              f'{rows / elapsed:.0f} rows/s, {phrases / elapsed:.1f} phrases/s')
+
+    store.close()
+    word_book.close()
+    print(f'done in {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Quiz question preparation.
+
+Questions ask the phrases that are due first in the spaced-repetition
+schedule, answer options are random phrases of the same vocabulary. The
+engine keeps a few questions with translated options ready in a background
+task, so asking the next question is a lookup.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random as rd
+from collections import deque
+from typing import Deque, Dict, Hashable, List, Set
+
+from quiz.scheduler import QuizPool, QuizScheduler
+from translation.service import AsyncTranslationService
+from translation.translator import Translator
+
+
+class QuizQuestion:
+    def __init__(self, phrase: str, options: List[str], correct: int):
+        self.phrase = phrase
+        self.options = options
+        self.correct = correct
+
+
+class QuizSession:
+    def __init__(self, user_id: int, translator: Translator):
+        self.user_id = user_id
+        self.translator = translator
+        self.pool: QuizPool | None = None
+        # phrases prepared or asked and not answered yet
+        self.pending: Set[str] = set()
+        self.prepared: Deque[QuizQuestion] = deque()
+        self.task: asyncio.Task | None = None
+
+
+class QuizEngine:
+    """
+    Keeps prefetch questions ready for every running quiz.
+
+    options - number of answer options per question (less if the pool is smaller)
+    """
+
+    def __init__(self, scheduler: QuizScheduler, translation_service: AsyncTranslationService,
+                 options: int = 4, prefetch: int = 2):
+        self.scheduler = scheduler
+        self.translation_service = translation_service
+        self.options = options
+        self.prefetch = prefetch
+        self._sessions: Dict[Hashable, QuizSession] = {}
+
+    def start(self, chat_id: Hashable, user_id: int, translator: Translator) -> None:
+        """Begin preparing questions over the phrases of user in the translator language."""
+        self.stop(chat_id)
+        session = QuizSession(user_id, translator)
+        self._sessions[chat_id] = session
+        self._refill(chat_id, session)
+
+    def stop(self, chat_id: Hashable) -> None:
+        session = self._sessions.pop(chat_id, None)
+        if session is not None and session.task is not None:
+            session.task.cancel()
+
+    async def next_question(self, chat_id: Hashable, user_id: int,
+                            translator: Translator) -> QuizQuestion | None:
+        """
+        Next prepared question, None if the pool has less than two words.
+        A session lost by the process is started again.
+        """
+        session = self._sessions.get(chat_id)
+        if session is None or session.translator is not translator:
+            self.start(chat_id, user_id, translator)
+            session = self._sessions[chat_id]
+        while not session.prepared:
+            self._refill(chat_id, session)
+            await asyncio.shield(session.task)
+            if session.pool.size < 2:
+                return None
+        question = session.prepared.popleft()
+        self._refill(chat_id, session)
+        return question
+
+    async def answer(self, chat_id: Hashable, user_id: int, translator: Translator,
+                     phrase: str, correct: bool) -> None:
+        """Reschedule phrase of an asked question."""
+        session = self._sessions.get(chat_id)
+        if session is not None:
+            session.pending.discard(phrase)
+        await self.scheduler.answer(user_id, translator.lang.glang_shorty, phrase, correct)
+
+    def _refill(self, chat_id: Hashable, session: QuizSession) -> None:
+        if session.task is None or session.task.done():
+            session.task = asyncio.ensure_future(self._prepare(chat_id, session))
+            # failures are reported to whoever waits for the question
+            session.task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    async def _prepare(self, chat_id: Hashable, session: QuizSession) -> None:
+        if session.pool is None:
+            session.pool = await self.scheduler.open_pool(session.user_id, session.translator.lang.glang_shorty)
+        while session.pool.size >= 2 and len(session.prepared) < self.prefetch:
+            question = await self._build_question(chat_id, session)
+            if question is not None:
+                session.prepared.append(question)
+
+    async def _build_question(self, chat_id: Hashable, session: QuizSession) -> QuizQuestion | None:
+        lang = session.translator.lang.glang_shorty
+        entry = await self.scheduler.next_due(session.user_id, lang, session.pending,
+                                              len(session.pending) + 1)
+        if entry is None:
+            # the schedule is empty after all, nothing to ask
+            session.pool.size = 0
+            return None
+        session.pending.add(entry.phrase)
+
+        phrases = await self.scheduler.random_phrases(session.user_id, lang, session.pool,
+                                                      self.options - 1, {entry.phrase})
+        phrases.append(entry.phrase)
+        rd.shuffle(phrases)
+        translations = await self.translation_service.translate_batch(
+            session.translator, phrases, owner=('quiz', chat_id))
+        return QuizQuestion(entry.phrase, translations, phrases.index(entry.phrase))
@@ -0,0 +1,76 @@
+"""
+Quiz leaderboard.
+
+Top entries of every language are kept in memory and updated as new best
+scores are recorded. The repository stays the source of truth: cached lists
+are reloaded when they get older than max_age, so records made by other
+processes show up as well.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Iterable, List, Tuple
+
+from repository.async_abstract_repository import AsyncAbstractRepository
+
+
+class Leaderboard:
+    """
+    Cached top-N of quiz_score per language.
+
+    Entries are expected to have user_id, user_name, lang and score attributes.
+    """
+
+    def __init__(self, scoreboard: AsyncAbstractRepository, langs: Iterable[str],
+                 size: int = 10, max_age: float = 60.0):
+        self.scoreboard = scoreboard
+        self.langs = list(langs)
+        self.size = size
+        self.max_age = max_age
+        self._top: Dict[str, List[Any]] = {}
+        self._loaded: Dict[str, float] = {}
+
+    async def load(self) -> None:
+        """Load top entries of all languages, called at startup."""
+        for lang in self.langs:
+            await self._load(lang)
+
+    async def _load(self, lang: str) -> None:
+        self._top[lang] = await self.scoreboard.get_first_ordered(
+            'score', self.size, True, {'lang': lang})
+        self._loaded[lang] = time.monotonic()
+
+    async def top(self, lang: str) -> List[Any]:
+        if lang not in self._top or time.monotonic() - self._loaded[lang] > self.max_age:
+            await self._load(lang)
+        return self._top[lang]
+
+    async def record(self, entry: Any) -> None:
+        """Save entry score if it is a new best of the user, update cached top."""
+        await self.scoreboard.upsert(entry, {'score': 'max'})
+        top = self._top.get(entry.lang)
+        if top is None:
+            return
+        for i, cached in enumerate(top):
+            if cached.user_id == entry.user_id:
+                if entry.score <= cached.score:
+                    return
+                del top[i]
+                break
+        if len(top) < self.size or entry.score > top[-1].score:
+            top.append(entry)
+            top.sort(key=lambda cached: cached.score, reverse=True)
+            del top[self.size:]
+
+    async def rank(self, user_id: int, lang: str) -> Tuple[int, int] | None:
+        """(place, best score) of user, None if the user has no score."""
+        top = await self.top(lang)
+        for cached in top:
+            if cached.user_id == user_id:
+                return sum(1 for other in top if other.score > cached.score) + 1, cached.score
+        entry = await self.scoreboard.get_all({'user_id': user_id, 'lang': lang})
+        if not entry:
+            return None
+        score = entry[0].score
+        return await self.scoreboard.count({'lang': lang}, {'score': score}) + 1, score
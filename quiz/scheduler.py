@@ -0,0 +1,157 @@
+"""
+Spaced repetition of word_book phrases.
+
+Every (user, language, phrase) has a row in quiz_schedule with the time it
+is due, when it was last reviewed and its SM-2 state: ease factor, interval
+and number of successful repetitions in a row. The quiz asks the phrases
+that are due first; the (user_id, target_lang, due) index finds them without
+reading the rest of the vocabulary, and answers move them forward or back in
+the schedule. Once nothing is due, the phrases reviewed longest ago are asked.
+"""
+
+from __future__ import annotations
+
+import random as rd
+import time
+from typing import Callable, Container, List
+
+from repository.async_abstract_repository import AsyncAbstractRepository
+
+DAY = 24 * 60 * 60
+# a forgotten phrase is asked again in the same session if it goes on long enough
+RETRY_DELAY = 10 * 60
+MIN_EASE = 1.3
+# word_book rows enrolled per statement batch
+ENROLL_BATCH = 1000
+
+
+class QuizScheduleEntry:
+    def __init__(self, user_id, target_lang, phrase, due=0, interval=0.0, ease=2.5, repetitions=0, reviewed=0):
+        self.user_id = user_id
+        self.target_lang = target_lang
+        self.phrase = phrase
+        self.due = due
+        self.interval = interval
+        self.ease = ease
+        self.repetitions = repetitions
+        self.reviewed = reviewed
+
+
+def review(entry: QuizScheduleEntry, quality: int, now: float) -> None:
+    """
+    SM-2 step: quality is 0 (no idea) to 5 (perfect), below 3 the phrase
+    starts over. interval is in days.
+    """
+    entry.reviewed = int(now)
+    if quality < 3:
+        entry.repetitions = 0
+        entry.interval = 0.0
+        entry.due = int(now) + RETRY_DELAY
+    else:
+        entry.repetitions += 1
+        if entry.repetitions == 1:
+            entry.interval = 1.0
+        elif entry.repetitions == 2:
+            entry.interval = 6.0
+        else:
+            entry.interval = round(entry.interval * entry.ease, 2)
+        entry.due = int(now + entry.interval * DAY)
+    entry.ease = max(MIN_EASE, entry.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+
+
+class QuizPool:
+    """Phrases of one user and language, size is how many there are."""
+
+    def __init__(self, size: int):
+        self.size = size
+
+
+class QuizScheduler:
+    """
+    Schedule of word_book phrases per user and language.
+
+    correct_quality, wrong_quality - SM-2 quality of a right and a wrong quiz answer
+    """
+
+    def __init__(self, schedule: AsyncAbstractRepository, word_book: AsyncAbstractRepository,
+                 correct_quality: int = 4, wrong_quality: int = 1,
+                 clock: Callable[[], float] = time.time, rng: rd.Random | None = None):
+        self.schedule = schedule
+        self.word_book = word_book
+        self.correct_quality = correct_quality
+        self.wrong_quality = wrong_quality
+        self.clock = clock
+        self.rng = rng or rd.Random()
+
+    async def enroll(self, user_id: int, lang: str, phrase: str) -> None:
+        """Schedule a new phrase for now, a scheduled one is kept as is."""
+        await self.schedule.add(QuizScheduleEntry(user_id, lang, phrase, due=int(self.clock())))
+
+    async def open_pool(self, user_id: int, lang: str) -> QuizPool:
+        """
+        Pool of a quiz. Phrases stored before the schedule existed are
+        enrolled here, once per user and language.
+        """
+        where = {'user_id': user_id, 'target_lang': lang}
+        # phrases translated and enrolled moments ago may still be buffered
+        await self.word_book.flush()
+        size = await self.word_book.count(where)
+        if size < 2:
+            return QuizPool(size)
+        await self.schedule.flush()
+        if await self.schedule.count(where) < size:
+            now = int(self.clock())
+            after = None
+            while True:
+                page = await self.word_book.get_page(where, after=after, limit=ENROLL_BATCH)
+                await self.schedule.add_all(QuizScheduleEntry(user_id, lang, word.phrase, due=now)
+                                            for word in page)
+                if len(page) < ENROLL_BATCH:
+                    break
+                after = page[-1].id
+        return QuizPool(size)
+
+    async def next_due(self, user_id: int, lang: str, skip: Container[str],
+                       limit: int) -> QuizScheduleEntry | None:
+        """
+        Earliest due phrase not in skip. When none is due, the phrase
+        reviewed longest ago, so a quiz can go on ahead of the schedule.
+        Reads at most limit rows in each order, if all of them are skipped
+        the first one is returned anyway.
+        """
+        where = {'user_id': user_id, 'target_lang': lang}
+        now = self.clock()
+        for ordered_by in ('due', 'reviewed'):
+            entries = await self.schedule.get_first_ordered(ordered_by, limit, False, where)
+            for entry in entries:
+                if entry.phrase not in skip and (ordered_by == 'reviewed' or entry.due <= now):
+                    return entry
+        return entries[0] if entries else None
+
+    async def random_phrases(self, user_id: int, lang: str, pool: QuizPool, k: int,
+                             exclude: Container[str]) -> List[str]:
+        """
+        Up to k distinct phrases of the pool not in exclude, uniformly
+        random. Each one is the phrase at a random rank of the pool, found
+        by its seq number on the (user_id, target_lang, seq) index instead of
+        loading the pool. A random id of the pool range is not uniform, other
+        users' rows leave gaps in it.
+        """
+        phrases: List[str] = []
+        for seq in self.rng.sample(range(1, pool.size + 1), min(pool.size, k * 3)):
+            if len(phrases) == k:
+                break
+            rows = await self.word_book.get_values(
+                ('phrase',), {'user_id': user_id, 'target_lang': lang, 'seq': seq}, limit=1)
+            if rows and rows[0][0] not in exclude:
+                phrases.append(rows[0][0])
+        return phrases
+
+    async def answer(self, user_id: int, lang: str, phrase: str, correct: bool) -> None:
+        """Move phrase in the schedule after a quiz answer."""
+        entries = await self.schedule.get_all({'user_id': user_id, 'target_lang': lang, 'phrase': phrase})
+        if not entries:
+            return
+        entry = entries[0]
+        review(entry, self.correct_quality if correct else self.wrong_quality, self.clock())
+        await self.schedule.update(entry)
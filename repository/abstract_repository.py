@@ -9,7 +9,7 @@
 
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar, Protocol, Any
+from typing import Generic, TypeVar, Protocol, Any, Iterable, Iterator
 
 
 class Model(Protocol):  # pylint: disable=too-few-public-methods
@@ -27,9 +27,15 @@ class AbstractRepository(ABC, Generic[T]):
     Абстрактный репозиторий.
     Абстрактные методы:
     add
+    add_all
     get
     get_all
+    get_values
+    count
+    get_page
+    iter_all
     update
+    upsert
     delete
     """
 
@@ -40,6 +46,13 @@ class AbstractRepository(ABC, Generic[T]):
         также записать id в атрибут pk.
         """
 
+    @abstractmethod
+    def add_all(self, objs: Iterable[T]) -> None:
+        """
+        Добавить несколько объектов одной операцией.
+        id новых записей не возвращаются.
+        """
+
     @abstractmethod
     def get(self, pk: int) -> T | None:
         """ Получить объект по id """
@@ -60,9 +73,58 @@ class AbstractRepository(ABC, Generic[T]):
         если descending = True
         """
     @abstractmethod
+    def get_values(self, columns: tuple[str, ...], where: dict[str, Any] | None = None,
+                   limit: int | None = None, offset: int = 0) -> list[tuple[Any, ...]]:
+        """
+        Получить значения только указанных полей записей по условию where,
+        в порядке первичного ключа, не более limit записей, если limit задан,
+        пропустив первые offset записей.
+        Записи возвращаются кортежами значений в порядке columns.
+        """
+
+    @abstractmethod
+    def count(self, where: dict[str, Any] | None = None,
+              greater_than: dict[str, Any] | None = None) -> int:
+        """
+        Посчитать записи, удовлетворяющие условию where, и, если задано
+        greater_than, со значениями полей больше указанных
+        """
+
+    @abstractmethod
+    def get_page(self, where: dict[str, Any] | None = None, after: Any = None,
+                 before: Any = None, limit: int = 50) -> list[T]:
+        """
+        Получить страницу записей, упорядоченных по первичному ключу.
+        after - вернуть не более limit записей с ключом больше after,
+        before - вернуть не более limit записей с ключом меньше before
+        (последние перед before, также в порядке возрастания).
+        """
+
+    @abstractmethod
+    def iter_all(self, where: dict[str, Any] | None = None, batch_size: int = 500) -> Iterator[T]:
+        """
+        Перебрать все записи по условию, загружая их страницами
+        по batch_size записей.
+        """
+
+    @abstractmethod
     def update(self, obj: T) -> None:
         """ Обновить данные об объекте. Объект должен содержать поле pk. """
 
+    @abstractmethod
+    def upsert(self, obj: T, merge: dict[str, str] | None = None) -> None:
+        """
+        Атомарно добавить объект или объединить его с записью с тем же ключом.
+        merge - способ объединения полей {'название_поля': 'max' | 'min' | 'sum' | 'keep'},
+        остальные поля заменяются значениями объекта.
+        """
+
     @abstractmethod
     def delete(self, pk: int) -> None:
         """ Удалить запись """
+
+    def flush(self) -> None:
+        """
+        Записать изменения, отложенные репозиторием, чтобы они стали
+        видны при чтении. По умолчанию изменения не откладываются.
+        """
@@ -0,0 +1,123 @@
+"""
+Модуль содержит описание абстрактного асинхронного репозитория
+
+Асинхронный репозиторий повторяет интерфейс AbstractRepository, но все методы
+являются корутинами и не должны блокировать цикл событий.
+"""
+
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from typing import Generic, Any, AsyncIterator, Iterable
+
+from repository.abstract_repository import T
+
+
+class AsyncAbstractRepository(ABC, Generic[T]):
+    """
+    Абстрактный асинхронный репозиторий.
+    Абстрактные методы:
+    add
+    add_all
+    get
+    get_all
+    get_first_ordered
+    get_values
+    count
+    get_page
+    iter_all
+    update
+    upsert
+    delete
+    """
+
+    @abstractmethod
+    async def add(self, obj: T) -> int:
+        """
+        Добавить объект в репозиторий, вернуть id объекта,
+        также записать id в атрибут pk.
+        """
+
+    @abstractmethod
+    async def add_all(self, objs: Iterable[T]) -> None:
+        """
+        Добавить несколько объектов одной операцией.
+        id новых записей не возвращаются.
+        """
+
+    @abstractmethod
+    async def get(self, pk: int) -> T | None:
+        """ Получить объект по id """
+
+    @abstractmethod
+    async def get_all(self, where: dict[str, Any] | None = None) -> list[T]:
+        """
+        Получить все записи по некоторому условию
+        where - условие в виде словаря {'название_поля': значение}
+        если условие не задано (по умолчанию), вернуть все записи
+        """
+
+    @abstractmethod
+    async def get_first_ordered(self, ordered_by : str, n : int, decsending : bool = False,
+                                where: dict[str, Any] | None = None) -> list[T]:
+        """
+        Получить первые n записей, отсортированных по полю ordered_by
+        в порядке возрастания, если descending = False, или в порядке убывания,
+        если descending = True
+        """
+
+    @abstractmethod
+    async def get_values(self, columns: tuple[str, ...], where: dict[str, Any] | None = None,
+                         limit: int | None = None, offset: int = 0) -> list[tuple[Any, ...]]:
+        """
+        Получить значения только указанных полей записей по условию where,
+        в порядке первичного ключа, не более limit записей, если limit задан,
+        пропустив первые offset записей.
+        Записи возвращаются кортежами значений в порядке columns.
+        """
+
+    @abstractmethod
+    async def count(self, where: dict[str, Any] | None = None,
+                    greater_than: dict[str, Any] | None = None) -> int:
+        """
+        Посчитать записи, удовлетворяющие условию where, и, если задано
+        greater_than, со значениями полей больше указанных
+        """
+
+    @abstractmethod
+    async def get_page(self, where: dict[str, Any] | None = None, after: Any = None,
+                       before: Any = None, limit: int = 50) -> list[T]:
+        """
+        Получить страницу записей, упорядоченных по первичному ключу.
+        after - вернуть не более limit записей с ключом больше after,
+        before - вернуть не более limit записей с ключом меньше before
+        (последние перед before, также в порядке возрастания).
+        """
+
+    @abstractmethod
+    def iter_all(self, where: dict[str, Any] | None = None, batch_size: int = 500) -> AsyncIterator[T]:
+        """
+        Перебрать все записи по условию, загружая их страницами
+        по batch_size записей.
+        """
+
+    @abstractmethod
+    async def update(self, obj: T) -> None:
+        """ Обновить данные об объекте. Объект должен содержать поле pk. """
+
+    @abstractmethod
+    async def upsert(self, obj: T, merge: dict[str, str] | None = None) -> None:
+        """
+        Атомарно добавить объект или объединить его с записью с тем же ключом.
+        merge - способ объединения полей {'название_поля': 'max' | 'min' | 'sum' | 'keep'},
+        остальные поля заменяются значениями объекта.
+        """
+
+    @abstractmethod
+    async def delete(self, pk: int) -> None:
+        """ Удалить запись """
+
+    async def flush(self) -> None:
+        """
+        Записать изменения, отложенные репозиторием, чтобы они стали
+        видны при чтении. По умолчанию изменения не откладываются.
+        """
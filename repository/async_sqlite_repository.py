@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Tuple
+
+from repository.abstract_repository import T
+from repository.async_abstract_repository import AsyncAbstractRepository
+from repository.sqlite_repository import SQLiteRepository
+
+
+class AsyncSQLiteRepository(AsyncAbstractRepository[T]):
+    """
+    Implements AsyncAbstractRepository
+
+    Delegates to SQLiteRepository on worker threads, one per pooled
+    connection plus one for the writer.
+    """
+    def __init__(self, repository: SQLiteRepository[T]):
+        self.sync = repository
+        self._executor = ThreadPoolExecutor(repository.readers + 1,
+                                            thread_name_prefix=f'sqlite-{repository.table_name}')
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def add(self, obj: T) -> int:
+        return await self._run(self.sync.add, obj)
+
+    async def add_all(self, objs: Iterable[T]) -> None:
+        await self._run(self.sync.add_all, list(objs))
+
+    async def get(self, pk: int) -> T | None:
+        return await self._run(self.sync.get, pk)
+
+    async def get_all(self, where: Dict[str, Any] | None = None) -> List[T]:
+        return await self._run(self.sync.get_all, where)
+
+    async def get_first_ordered(self, ordered_by : str, n : int, decsending : bool = False,
+                                where: Dict[str, Any] | None = None) -> List[T]:
+        return await self._run(self.sync.get_first_ordered, ordered_by, n, decsending, where)
+
+    async def get_values(self, columns: Tuple[str, ...], where: Dict[str, Any] | None = None,
+                         limit: int | None = None, offset: int = 0) -> List[Tuple[Any, ...]]:
+        return await self._run(self.sync.get_values, columns, where, limit, offset)
+
+    async def count(self, where: Dict[str, Any] | None = None,
+                    greater_than: Dict[str, Any] | None = None) -> int:
+        return await self._run(self.sync.count, where, greater_than)
+
+    async def get_page(self, where: Dict[str, Any] | None = None, after: Any = None,
+                       before: Any = None, limit: int = 50) -> List[T]:
+        return await self._run(self.sync.get_page, where, after, before, limit)
+
+    async def iter_all(self, where: Dict[str, Any] | None = None, batch_size: int = 500) -> AsyncIterator[T]:
+        after = None
+        while True:
+            page = await self.get_page(where, after=after, limit=batch_size)
+            for obj in page:
+                yield obj
+            if len(page) < batch_size:
+                return
+            after = getattr(page[-1], self.sync.pk_name)
+
+    async def update(self, obj: T) -> None:
+        await self._run(self.sync.update, obj)
+
+    async def upsert(self, obj: T, merge: Dict[str, str] | None = None) -> None:
+        await self._run(self.sync.upsert, obj, merge)
+
+    async def delete(self, pk: int) -> None:
+        await self._run(self.sync.delete, pk)
+
+    async def flush(self) -> None:
+        """Write statements buffered in write-behind mode."""
+        await self._run(self.sync.flush)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self.sync.close()
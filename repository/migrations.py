@@ -0,0 +1,93 @@
+"""
+Reusable migration steps for SQLiteRepository.
+
+Each function returns a Migration, i.e. a callable getting the writer
+connection (inside a transaction) and the repository being opened.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Dict, Sequence
+
+from repository.sqlite_repository import Migration, SQLiteRepository
+
+
+def rebuild_table(order_by: str = 'rowid') -> Migration:
+    """
+    Recreate the table with the current definition and copy rows over.
+    Rows are copied in order_by order, on key conflicts the last one wins.
+    """
+    def migrate(connection: sqlite3.Connection, repository: SQLiteRepository) -> None:
+        table = repository.table_name
+        old_columns = {row[1] for row in connection.execute(f'PRAGMA table_info({table})')}
+        common = ', '.join(name for name in repository.columns if name in old_columns)
+        connection.execute(f'DROP TABLE IF EXISTS {table}__new')
+        connection.execute(repository.table_definition(f'{table}__new'))
+        connection.execute(
+            f'INSERT OR REPLACE INTO {table}__new ({common}) '
+            f'SELECT {common} FROM {table} ORDER BY {order_by}')
+        connection.execute(f'DROP TABLE {table}')
+        connection.execute(f'ALTER TABLE {table}__new RENAME TO {table}')
+    return migrate
+
+
+def merge_duplicates(key: Sequence[str], merge: Dict[str, str] | None = None) -> Migration:
+    """
+    Recreate the table with the current definition, rows with the same key
+    become one. merge tells how a column of the group is combined: 'max',
+    'min', 'sum', or 'count' - the sum of the column if the old table has it,
+    the number of rows otherwise. Other columns take the max of the group,
+    columns the old table doesn't have get their defaults, except the
+    primary key column: it is merged from the rowid of the old rows.
+    """
+    merge = merge or {}
+
+    def migrate(connection: sqlite3.Connection, repository: SQLiteRepository) -> None:
+        table = repository.table_name
+        old_columns = {row[1] for row in connection.execute(f'PRAGMA table_info({table})')}
+        columns, values = [], []
+        for name in repository.columns:
+            how = merge.get(name, 'max')
+            if how == 'count' and name not in old_columns:
+                values.append('COUNT(*)')
+            elif name == repository.pk_name and name not in old_columns:
+                values.append(f'{how.upper()}(rowid)')
+            elif name not in old_columns:
+                continue
+            elif name in key:
+                values.append(name)
+            else:
+                values.append(f"{'SUM' if how == 'count' else how.upper()}({name})")
+            columns.append(name)
+        connection.execute(f'DROP TABLE IF EXISTS {table}__new')
+        connection.execute(repository.table_definition(f'{table}__new'))
+        connection.execute(
+            f"INSERT INTO {table}__new ({', '.join(columns)}) "
+            f"SELECT {', '.join(values)} FROM {table} GROUP BY {', '.join(key)}")
+        connection.execute(f'DROP TABLE {table}')
+        connection.execute(f'ALTER TABLE {table}__new RENAME TO {table}')
+    return migrate
+
+
+def add_missing_columns() -> Migration:
+    """Add columns of the current definition the table doesn't have yet."""
+    def migrate(connection: sqlite3.Connection, repository: SQLiteRepository) -> None:
+        table = repository.table_name
+        existing = {row[1] for row in connection.execute(f'PRAGMA table_info({table})')}
+        for name, datatype in repository.columns.items():
+            if name not in existing:
+                connection.execute(f'ALTER TABLE {table} ADD COLUMN {name} {datatype}')
+    return migrate
+
+
+def number_rows(column: str, group: Sequence[str], order_by: str = 'rowid') -> Migration:
+    """Set column to the position of each row in its group, from 1, in order_by order."""
+    def migrate(connection: sqlite3.Connection, repository: SQLiteRepository) -> None:
+        table = repository.table_name
+        connection.execute(
+            f'UPDATE {table} SET {column} = numbered.position FROM '
+            f'(SELECT rowid AS row_id, ROW_NUMBER() OVER '
+            f"(PARTITION BY {', '.join(group)} ORDER BY {order_by}) AS position FROM {table}) AS numbered "
+            f'WHERE {table}.rowid = numbered.row_id')
+    return migrate
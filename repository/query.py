@@ -0,0 +1,96 @@
+"""
+Statement builder for SQLiteRepository.
+
+Statements name their columns explicitly and take every value as a
+parameter, so the text depends only on the query shape: the columns and
+the clauses used. It is built once per shape and cached, and sqlite3 reuses
+the prepared statement of an identical text on each connection.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Hashable, Sequence, Tuple
+
+
+class QueryBuilder:
+    """
+    Parameterized statements of one table. Column names are checked
+    against the table columns when a shape is built for the first time.
+    """
+
+    def __init__(self, table_name: str, columns: Sequence[str]):
+        self.table_name = table_name
+        self.columns = tuple(columns)
+        self._statements: Dict[Hashable, str] = {}
+
+    def _cached(self, shape: Hashable, build: Callable[[], str]) -> str:
+        statement = self._statements.get(shape)
+        if statement is None:
+            statement = self._statements[shape] = build()
+        return statement
+
+    def _check(self, *names: Sequence[str]) -> None:
+        for group in names:
+            for name in group:
+                if name not in self.columns:
+                    raise ValueError(f'{self.table_name} has no column {name}')
+
+    def _where(self, equal: Sequence[str] = (), greater: Sequence[str] = (),
+               less: Sequence[str] = ()) -> str:
+        self._check(equal, greater, less)
+        conditions = [f'{name} = ?' for name in equal]
+        conditions += [f'{name} > ?' for name in greater]
+        conditions += [f'{name} < ?' for name in less]
+        return f" WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    def select(self, columns: Tuple[str, ...], equal: Tuple[str, ...] = (), greater: Tuple[str, ...] = (),
+               less: Tuple[str, ...] = (), order_by: str | None = None, descending: bool = False,
+               limit: bool = False, offset: bool = False) -> str:
+        """
+        SELECT of columns; parameters are values of equal, greater and less
+        columns in this order, then the limit and the offset if they are set.
+        offset needs limit.
+        """
+        def build() -> str:
+            self._check(columns)
+            query = f"SELECT {', '.join(columns)} FROM {self.table_name}" + self._where(equal, greater, less)
+            if order_by is not None:
+                self._check((order_by,))
+                query += f" ORDER BY {order_by} {'DESC' if descending else 'ASC'}"
+            if limit:
+                query += ' LIMIT ?'
+            if offset:
+                query += ' OFFSET ?'
+            return query
+        return self._cached(('select', columns, equal, greater, less, order_by, descending, limit, offset), build)
+
+    def count(self, equal: Tuple[str, ...] = (), greater: Tuple[str, ...] = ()) -> str:
+        return self._cached(('count', equal, greater),
+                            lambda: f'SELECT COUNT(*) FROM {self.table_name}' + self._where(equal, greater))
+
+    def insert(self, or_ignore: bool = False) -> str:
+        """INSERT of all columns in table column order."""
+        def build() -> str:
+            conflict = ' OR IGNORE' if or_ignore else ''
+            return f"INSERT{conflict} INTO {self.table_name} ({', '.join(self.columns)}) " \
+                   f"VALUES ({', '.join('?' for _ in self.columns)})"
+        return self._cached(('insert', or_ignore), build)
+
+    def upsert(self, conflict_columns: Tuple[str, ...], assignments: Tuple[Tuple[str, str], ...]) -> str:
+        """INSERT of all columns, on conflict sets (column, expression) assignments."""
+        def build() -> str:
+            self._check(conflict_columns, [name for name, _ in assignments])
+            action = 'DO UPDATE SET ' + ', '.join(f'{name} = {expression}' for name, expression in assignments) \
+                if assignments else 'DO NOTHING'
+            return self.insert() + f" ON CONFLICT ({', '.join(conflict_columns)}) {action}"
+        return self._cached(('upsert', conflict_columns, assignments), build)
+
+    def update(self, key_columns: Tuple[str, ...]) -> str:
+        """UPDATE of all columns, parameters are column values, then key values."""
+        def build() -> str:
+            assignments = ', '.join(f'{name} = ?' for name in self.columns)
+            return f'UPDATE {self.table_name} SET {assignments}' + self._where(key_columns)
+        return self._cached(('update', key_columns), build)
+
+    def delete(self, equal: Tuple[str, ...]) -> str:
+        return self._cached(('delete', equal), lambda: f'DELETE FROM {self.table_name}' + self._where(equal))
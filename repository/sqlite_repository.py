@@ -1,90 +1,365 @@
 from __future__ import annotations
 
+import atexit
+import functools
+import inspect
+import itertools
+import logging
+import queue
 import sqlite3
-from typing import List, Dict, Any, Type
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Type, Tuple
+from metrics.registry import REGISTRY, Counter, Histogram, Timer
 from repository.abstract_repository import AbstractRepository, T
+from repository.query import QueryBuilder
+
+# Migration step, gets writer connection inside a transaction and the repository
+Migration = Callable[[sqlite3.Connection, 'SQLiteRepository'], None]
+
+# How upsert merges a stored column value with the new one
+MERGE_EXPRESSIONS = {
+    'max': 'max({column}, excluded.{column})',
+    'min': 'min({column}, excluded.{column})',
+    'sum': '{column} + excluded.{column}',
+    'replace': 'excluded.{column}',
+}
+
+
+def timed_query(method):
+    """Record latency and failures of a repository method by method and table."""
+    # metrics are looked up once per table, calls only take the timestamps
+    metrics: Dict[str, Tuple[Histogram, Counter]] = {}
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        histogram, errors = metrics.get(self.table_name) or metrics.setdefault(self.table_name, (
+            REGISTRY.histogram('repository_query_seconds', method=method.__name__, table=self.table_name),
+            REGISTRY.counter('repository_query_errors_total', method=method.__name__, table=self.table_name)))
+        with Timer(histogram, errors):
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class SQLiteRepository(AbstractRepository[T]):
     """
     Implements AbstractRepository
+
+    The database is opened in WAL mode. Writes go through one dedicated
+    writer connection, reads take a connection from a small pool, so readers
+    don't wait for writers. Every call uses its own cursor, the repository
+    may be shared between threads.
+
+    The table may declare a composite primary key, unique keys, indexes and
+    triggers (CREATE TRIGGER IF NOT EXISTS statements).
+    add keeps the stored row if the new one violates one of them, update
+    matches rows on primary key columns. Schema changes for existing
+    databases are described by migrations, the version applied so far is
+    kept per table in schema_version.
+
+    With write_behind > 0, add and upsert are buffered in memory and written
+    with executemany in one transaction once write_behind statements are
+    pending or flush_interval seconds have passed. Buffered rows are not
+    visible to reads until then, add can't report ids of new rows; callers
+    that must read their own writes flush first. A failed flush puts the
+    statements back in front of the buffer, they are retried by the next
+    one. close() and interpreter exit flush the buffer.
+
+    Statements come from a QueryBuilder and are cached per query shape.
+    Rows are hydrated by passing the selected columns to the entity
+    constructor positionally if it starts with the table columns (in any
+    order), with keyword arguments otherwise.
     """
     def __init__(self, db_path: str, table_name: str, columns: Dict[str, str],
-            entity_type: Type[T], pk_name : str):
+            entity_type: Type[T], pk_name : str,
+            indexes: List[Tuple[str, ...]] | None = None,
+            readers: int = 4, busy_timeout: float = 5.0,
+            primary_key: Tuple[str, ...] | None = None,
+            unique: List[Tuple[str, ...]] | None = None,
+            migrations: List[Migration] | None = None,
+            triggers: List[str] | None = None,
+            write_behind: int = 0, flush_interval: float = 1.0):
         self.table_name = table_name
         self.columns = columns
         self.pk_name = pk_name
         self.entity_type = entity_type
-        self.connection = sqlite3.connect(db_path)
-        self.cursor = self.connection.cursor()
-        columns_str = ', '.join([f'{name} {datatype}'
-                                 for name, datatype in self.columns.items()])
-        self.cursor.execute(
-            f"CREATE TABLE IF NOT EXISTS {self.table_name} ({columns_str})")
-        self.connection.commit()
+        self.busy_timeout = busy_timeout
+        self.primary_key = primary_key
+        self.unique = unique or []
+        self.indexes = indexes or []
+        self.migrations = migrations or []
+        self.triggers = triggers or []
+        self.key_columns = primary_key or (pk_name,)
+        self.conflict_columns = primary_key or (self.unique[0] if self.unique else (pk_name,))
+        self.query = QueryBuilder(table_name, list(columns))
+        # rows are selected in constructor parameter order and passed positionally
+        # when the constructor starts with exactly the table columns
+        parameters = list(inspect.signature(entity_type).parameters)[:len(columns)]
+        self.positional = set(parameters) == set(columns)
+        self.entity_columns = tuple(parameters) if self.positional else tuple(columns)
+        self.connection = self.__connect(db_path)
+        self.write_lock = threading.Lock()
+        self.__init_schema()
+
+        # in-memory databases are private to a connection, read through the writer
+        if db_path == ':memory:':
+            readers = 0
+        self.read_pool: queue.Queue[sqlite3.Connection] = queue.Queue()
+        for _ in range(readers):
+            self.read_pool.put(self.__connect(db_path))
+        self.readers = readers
+
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.pending: List[Tuple[str, List[Any]]] = []
+        self.pending_lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.flusher_stop = threading.Event()
+        self.flusher: threading.Thread | None = None
+        if write_behind:
+            self.flusher = threading.Thread(target=self.__flush_periodically, daemon=True,
+                                            name=f'flush-{table_name}')
+            self.flusher.start()
+            atexit.register(self.flush)
+
+    def table_definition(self, table_name: str | None = None) -> str:
+        """CREATE TABLE statement for the current schema."""
+        definitions = [f'{name} {datatype}' for name, datatype in self.columns.items()]
+        if self.primary_key:
+            definitions.append(f"PRIMARY KEY ({', '.join(self.primary_key)})")
+        for key in self.unique:
+            definitions.append(f"UNIQUE ({', '.join(key)})")
+        return f"CREATE TABLE IF NOT EXISTS {table_name or self.table_name} ({', '.join(definitions)})"
+
+    def __init_schema(self) -> None:
+        with self.write_lock, self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS schema_version (table_name TEXT PRIMARY KEY, version INTEGER)')
+            exists = self.connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                (self.table_name,)).fetchone()
+            if exists:
+                row = self.connection.execute(
+                    'SELECT version FROM schema_version WHERE table_name = ?',
+                    (self.table_name,)).fetchone()
+                for migration in self.migrations[row[0] if row else 0:]:
+                    migration(self.connection, self)
+            else:
+                self.connection.execute(self.table_definition())
+            self.connection.execute(
+                'INSERT OR REPLACE INTO schema_version VALUES (?, ?)',
+                (self.table_name, len(self.migrations)))
+            for index in self.indexes:
+                self.connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{self.table_name}_{'_'.join(index)} "
+                    f"ON {self.table_name} ({', '.join(index)})")
+            # rebuilding migrations drop the triggers with the old table
+            for trigger in self.triggers:
+                self.connection.execute(trigger)
+
+    def __connect(self, db_path: str) -> sqlite3.Connection:
+        connection = sqlite3.connect(db_path, timeout=self.busy_timeout,
+                                     check_same_thread=False, cached_statements=256)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    @contextmanager
+    def _writer(self) -> Iterator[sqlite3.Connection]:
+        """Writer connection inside a transaction."""
+        with self.write_lock, self.connection:
+            yield self.connection
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        """Connection from the read pool, writer is used if there is no pool."""
+        if not self.readers:
+            with self.write_lock:
+                yield self.connection
+            return
+        connection = self.read_pool.get()
+        try:
+            yield connection
+        finally:
+            self.read_pool.put(connection)
 
+    def _write(self, query: str, values: List[Any]) -> sqlite3.Cursor | None:
+        """Execute write statement or buffer it in write-behind mode."""
+        if not self.write_behind:
+            with self._writer() as connection:
+                return connection.execute(query, values)
+        with self.pending_lock:
+            self.pending.append((query, values))
+            full = len(self.pending) >= self.write_behind
+        if full:
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # the statements stay buffered, the flusher writes them later
+                logging.getLogger(__name__).exception('write-behind flush of %s failed', self.table_name)
+        return None
+
+    @timed_query
+    def flush(self) -> None:
+        """Write buffered statements in one transaction."""
+        with self.flush_lock:
+            with self.pending_lock:
+                pending, self.pending = self.pending, []
+            if not pending:
+                return
+            try:
+                with self._writer() as connection:
+                    for query, group in itertools.groupby(pending, key=lambda item: item[0]):
+                        connection.executemany(query, [values for _, values in group])
+            except sqlite3.Error:
+                # the transaction is rolled back, retry the rows ahead of newer ones
+                with self.pending_lock:
+                    self.pending[:0] = pending
+                raise
+
+    def __flush_periodically(self) -> None:
+        while not self.flusher_stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # statements are kept for the next attempt
+                logging.getLogger(__name__).exception('write-behind flush of %s failed', self.table_name)
+
+    def warm(self) -> None:
+        """Load the schema and prepare the get statement on every connection now instead of on first use."""
+        statement = self.query.select(self.entity_columns, (self.pk_name,), (), (), None, False, True)
+        readers = [self.read_pool.get() for _ in range(self.readers)]
+        try:
+            with self.write_lock:
+                for connection in readers + [self.connection]:
+                    connection.execute(statement, (None, 0)).fetchall()
+        finally:
+            for connection in readers:
+                self.read_pool.put(connection)
+
+    def close(self) -> None:
+        if self.flusher is not None:
+            self.flusher_stop.set()
+            self.flusher.join()
+            self.flusher = None
+            atexit.unregister(self.flush)
+        self.flush()
+        with self.write_lock:
+            self.connection.close()
+        for _ in range(self.readers):
+            self.read_pool.get().close()
+        self.readers = 0
+
+    @timed_query
     def add(self, obj: T) -> int:
-        with self.connection:
-            values = [getattr(obj, name) for name in self.columns.keys()]
-            values_str = ', '.join(['?' for _ in range(len(values))])
-            names = ', '.join(self.columns.keys())
-            query = f"INSERT INTO {self.table_name} ({names}) VALUES ({values_str})"
-            self.cursor.execute(query, values)
-            return getattr(obj, self.pk_name)
-
-    def __get_obj(self, row: tuple[Any, ...]) -> T:
-        obj_dict = {}
-        for i, col_name in enumerate(self.columns):
-            obj_dict[col_name] = row[i]
-        return self.entity_type(**obj_dict)
+        values = [getattr(obj, name) for name in self.columns]
+        query = self.query.insert(or_ignore=bool(self.primary_key or self.unique))
+        cursor = self._write(query, values)
+        if cursor is not None and getattr(obj, self.pk_name) is None and cursor.rowcount == 1:
+            setattr(obj, self.pk_name, cursor.lastrowid)
+        return getattr(obj, self.pk_name)
+
+    @timed_query
+    def add_all(self, objs: Iterable[T]) -> None:
+        query = self.query.insert(or_ignore=bool(self.primary_key or self.unique))
+        rows = [[getattr(obj, name) for name in self.columns] for obj in objs]
+        # buffered statements go first, the batch is written right away
+        self.flush()
+        with self._writer() as connection:
+            connection.executemany(query, rows)
+
+    def __hydrate(self, rows: Iterable[tuple[Any, ...]]) -> List[T]:
+        if self.positional:
+            return list(itertools.starmap(self.entity_type, rows))
+        return [self.entity_type(**dict(zip(self.entity_columns, row))) for row in rows]
 
+    def __select(self, where: Dict[str, Any] | None = None, greater_than: Dict[str, Any] | None = None,
+                 less_than: Dict[str, Any] | None = None, order_by: str | None = None,
+                 descending: bool = False, limit: int | None = None, offset: int = 0,
+                 columns: Tuple[str, ...] | None = None) -> List[tuple[Any, ...]] | List[T]:
+        where, greater_than, less_than = where or {}, greater_than or {}, less_than or {}
+        if offset and limit is None:
+            # sqlite has OFFSET only after LIMIT, a negative one means no limit
+            limit = -1
+        query = self.query.select(columns or self.entity_columns, tuple(where), tuple(greater_than),
+                                  tuple(less_than), order_by, descending, limit is not None, bool(offset))
+        params = [*where.values(), *greater_than.values(), *less_than.values()]
+        if limit is not None:
+            params.append(limit)
+        if offset:
+            params.append(offset)
+        with self._reader() as connection:
+            cursor = connection.execute(query, params)
+            return cursor.fetchall() if columns else self.__hydrate(cursor)
+
+    @timed_query
     def get(self, pk: int) -> T | None:
-        query = f"SELECT * FROM {self.table_name} WHERE {self.pk_name} == {pk}"
-        self.cursor.execute(query)
-        row = self.cursor.fetchone()
-        if row:
-            ret = self.__get_obj(row)
-            return ret
-        return None
+        objs = self.__select({self.pk_name: pk}, limit=1)
+        return objs[0] if objs else None
 
+    @timed_query
     def get_all(self, where: Dict[str, Any] | None = None) -> List[T]:
-        query = f"SELECT * FROM {self.table_name}"
-        if where:
-            conditions = [f'{name} = ?' for name in where.keys()]
-            query += f" WHERE {' AND '.join(conditions)}"
-            self.cursor.execute(query, tuple(where.values()))
-        else:
-            self.cursor.execute(query)
-        rows = self.cursor.fetchall()
-        objs = [self.__get_obj(row) for row in rows]
-        return objs
+        return self.__select(where)
 
+    @timed_query
     def get_first_ordered(self, ordered_by : str, n : int, decsending : bool = False, where: Dict[str, Any] | None = None) -> list[T]:
-        descen = ''
-        if decsending:
-            descen = 'DESC'
-        query = f'SELECT * FROM {self.table_name}'
-        if where:
-            conditions = [f'{name} = ?' for name in where.keys()]
-            query += f" WHERE {' AND '.join(conditions)}"
-            query += f' ORDER BY {ordered_by} {descen} LIMIT {n};'
-            self.cursor.execute(query, tuple(where.values()))
-        else:
-            query += f' ORDER BY {ordered_by} {descen} LIMIT {n};'
-            self.cursor.execute(query)
-        rows = self.cursor.fetchall()
-        objs = [self.__get_obj(row) for row in rows]
-        return objs
+        return self.__select(where, order_by=ordered_by, descending=decsending, limit=n)
+
+    @timed_query
+    def get_values(self, columns: Tuple[str, ...], where: Dict[str, Any] | None = None,
+                   limit: int | None = None, offset: int = 0) -> List[tuple[Any, ...]]:
+        return self.__select(where, order_by=self.pk_name, limit=limit, offset=offset, columns=tuple(columns))
+
+    @timed_query
+    def count(self, where: Dict[str, Any] | None = None,
+              greater_than: Dict[str, Any] | None = None) -> int:
+        where, greater_than = where or {}, greater_than or {}
+        query = self.query.count(tuple(where), tuple(greater_than))
+        with self._reader() as connection:
+            return connection.execute(query, [*where.values(), *greater_than.values()]).fetchone()[0]
 
+    @timed_query
+    def get_page(self, where: Dict[str, Any] | None = None, after: Any = None,
+                 before: Any = None, limit: int = 50) -> List[T]:
+        if after is not None:
+            return self.__select(where, {self.pk_name: after}, order_by=self.pk_name, limit=limit)
+        if before is not None:
+            page = self.__select(where, less_than={self.pk_name: before}, order_by=self.pk_name,
+                                 descending=True, limit=limit)
+            page.reverse()
+            return page
+        return self.__select(where, order_by=self.pk_name, limit=limit)
+
+    def iter_all(self, where: Dict[str, Any] | None = None, batch_size: int = 500) -> Iterator[T]:
+        after = None
+        while True:
+            page = self.get_page(where, after=after, limit=batch_size)
+            yield from page
+            if len(page) < batch_size:
+                return
+            after = getattr(page[-1], self.pk_name)
+
+    @timed_query
     def update(self, obj: T) -> None:
-        with self.connection:
-            values = [getattr(obj, name) for name in self.columns.keys()]
-            assignments = ', '.join([f'{name} = ?' for name in self.columns.keys()])
-            query = f"UPDATE {self.table_name} SET {assignments} " \
-                    f"WHERE {self.pk_name} == {getattr(obj, self.pk_name)}"
-            self.cursor.execute(query, values)
+        values = [getattr(obj, name) for name in self.columns]
+        values += [getattr(obj, name) for name in self.key_columns]
+        with self._writer() as connection:
+            connection.execute(self.query.update(self.key_columns), values)
+
+    @timed_query
+    def upsert(self, obj: T, merge: Dict[str, str] | None = None) -> None:
+        merge = merge or {}
+        values = [getattr(obj, name) for name in self.columns]
+        assignments = []
+        for name in self.columns:
+            how = merge.get(name, 'replace')
+            if name in self.conflict_columns or name == self.pk_name or how == 'keep':
+                continue
+            assignments.append((name, MERGE_EXPRESSIONS[how].format(column=name)))
+        self._write(self.query.upsert(self.conflict_columns, tuple(assignments)), values)
 
+    @timed_query
     def delete(self, pk: int) -> None:
-        with self.connection:
-            query = f"DELETE FROM {self.table_name} WHERE  {self.pk_name} == {pk}"
-            self.cursor.execute(query)
+        with self._writer() as connection:
+            connection.execute(self.query.delete((self.pk_name,)), (pk,))
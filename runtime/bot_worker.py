@@ -0,0 +1,55 @@
+"""Telegram side of the multi-process mode, see runtime.sharding."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing as mp
+
+from telegram import Bot, Update
+from telegram.error import TelegramError
+from telegram.ext import Application
+
+from runtime.sharding import ShardedDispatcher
+
+
+async def serve_updates(application: Application, updates: mp.Queue) -> None:
+    """Run application on updates from the dispatcher until None is received."""
+    loop = asyncio.get_running_loop()
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    try:
+        while True:
+            data = await loop.run_in_executor(None, updates.get)
+            if data is None:
+                break
+            await application.update_queue.put(Update.de_json(data, application.bot))
+    finally:
+        await application.stop()
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+
+async def poll_updates(bot: Bot, dispatcher: ShardedDispatcher, timeout: int = 30) -> None:
+    """
+    Long-poll Telegram and route every update to its shard. dispatch blocks
+    while the queue of a lagging worker is full, so it runs on a thread: the
+    event loop stays free and fetching just waits for the worker.
+    """
+    loop = asyncio.get_running_loop()
+    offset = None
+    async with bot:
+        await bot.delete_webhook()
+        while True:
+            try:
+                updates = await bot.get_updates(offset, timeout=timeout, read_timeout=timeout + 5)
+            except TelegramError as error:
+                logging.warning('get_updates failed: %s', error)
+                await asyncio.sleep(1.0)
+                continue
+            for update in updates:
+                await loop.run_in_executor(None, dispatcher.dispatch, update.to_dict())
+                offset = update.update_id + 1
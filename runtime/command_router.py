@@ -0,0 +1,54 @@
+"""
+One handler for all commands of a conversation state.
+
+PTB tries handlers of a state one after another, so a CommandHandler per
+command makes matching linear in the number of commands. CommandRouter
+parses the command once and looks it up in a dict.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Container, List, Tuple
+
+from telegram import Update
+from telegram.ext import Application, BaseHandler, CallbackContext
+
+
+def parse_command(text: str | None) -> Tuple[str, str, List[str]] | None:
+    """'/Cmd@bot_name arg1 arg2' -> ('cmd', 'bot_name', ['arg1', 'arg2']), None if text is not a command."""
+    if not text or len(text) < 2 or text[0] != '/' or text[1].isspace():
+        return None
+    parts = text[1:].split()
+    name, _, bot_name = parts[0].partition('@')
+    return name.lower(), bot_name, parts[1:]
+
+
+class CommandRouter(BaseHandler):
+    """
+    Matches commands from names and passes the command name to
+    callback(update, context, name); arguments are set to context.args.
+    Commands addressed to other bots (/cmd@other_bot) are not matched.
+    """
+
+    def __init__(self, names: Container[str],
+                 callback: Callable[[Update, CallbackContext, str], Awaitable[Any]]):
+        super().__init__(callback)
+        self.names = names
+
+    def check_update(self, update: object) -> Tuple[str, List[str]] | None:
+        if not isinstance(update, Update) or update.message is None:
+            return None
+        command = parse_command(update.message.text)
+        if command is None:
+            return None
+        name, bot_name, args = command
+        if name not in self.names:
+            return None
+        if bot_name and bot_name.lower() != (update.message.get_bot().username or '').lower():
+            return None
+        return name, args
+
+    async def handle_update(self, update: Update, application: Application,
+                            check_result: Tuple[str, List[str]], context: CallbackContext) -> Any:
+        name, context.args = check_result
+        return await self.callback(update, context, name)
@@ -0,0 +1,72 @@
+"""Synthetic Telegram updates and a local Bot API for running the bot pipeline offline."""
+
+from __future__ import annotations
+
+import itertools
+import json
+import time
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+from telegram.request import BaseRequest, RequestData
+
+LOCAL_BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'Local', 'username': 'local_bot'}
+
+
+def synthetic_update(update_id: int, chat_id: int, text: str) -> Dict[str, Any]:
+    """Bot API JSON of a private text message."""
+    user = {'id': chat_id, 'is_bot': False, 'first_name': f'user{chat_id}'}
+    message = {
+        'message_id': update_id,
+        'date': int(time.time()),
+        'chat': {'id': chat_id, 'type': 'private', 'first_name': user['first_name']},
+        'from': user,
+        'text': text,
+    }
+    if text.startswith('/'):
+        # Telegram marks commands with an entity, CommandHandler looks for it
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+    return {'update_id': update_id, 'message': message}
+
+
+def fake_updates(n: int, chats: int, first_id: int = 1) -> Iterator[Dict[str, Any]]:
+    """n text messages spread round-robin over chats 1..chats."""
+    for update_id in itertools.islice(itertools.count(first_id), n):
+        yield synthetic_update(update_id, update_id % chats + 1, f'phrase {update_id}')
+
+
+class LocalBotRequest(BaseRequest):
+    """
+    Answers Bot API calls locally instead of sending them to Telegram, so an
+    Application can be initialized and run without a token or network.
+    Sent and edited messages are passed to on_message as
+    (time.monotonic(), chat_id, text) when it is set.
+    """
+
+    def __init__(self, on_message: Callable[[Tuple[float, int, str]], None] | None = None):
+        self.on_message = on_message
+        self._message_ids = itertools.count(1)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(self, url: str, method: str, request_data: RequestData | None = None,
+                         *args: Any, **kwargs: Any) -> Tuple[int, bytes]:
+        endpoint = url.rsplit('/', 1)[-1]
+        parameters = request_data.parameters if request_data is not None else {}
+        result: Any = True
+        if endpoint == 'getMe':
+            result = LOCAL_BOT_USER
+        elif endpoint == 'getUpdates':
+            result = []
+        elif endpoint in ('sendMessage', 'editMessageText'):
+            chat_id = int(parameters.get('chat_id') or 0)
+            text = parameters.get('text', '')
+            if self.on_message is not None:
+                self.on_message((time.monotonic(), chat_id, text))
+            result = {'message_id': parameters.get('message_id') or next(self._message_ids),
+                      'date': int(time.time()), 'chat': {'id': chat_id, 'type': 'private'},
+                      'from': LOCAL_BOT_USER, 'text': text}
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
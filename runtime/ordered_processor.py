@@ -0,0 +1,63 @@
+"""
+Concurrent update processing that keeps updates of one chat in order.
+
+The next update of a chat is processed only when the handling of the
+previous one has returned, while different chats are served concurrently.
+This keeps ConversationHandler states consistent only if the handlers
+block (block=True, the default): a non-blocking handler returns as soon as
+its task is scheduled, and PTB drops updates arriving for a conversation
+whose non-blocking handler is still running instead of queueing them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    max_concurrent_updates - number of chats processed at once
+    on_queued - called with the chat id and the update when an update has to
+    wait for earlier updates of its chat, e.g. to abandon their work
+    """
+
+    def __init__(self, max_concurrent_updates: int,
+                 on_queued: Callable[[int, Update], None] | None = None):
+        super().__init__(max_concurrent_updates)
+        self.on_queued = on_queued
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+        self._queued: Dict[int, int] = {}
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            await super().process_update(update, coroutine)
+            return
+
+        # wait for the chat before taking a worker slot, so a busy chat
+        # doesn't occupy slots other chats could use
+        if chat.id in self._queued and self.on_queued is not None:
+            self.on_queued(chat.id, update)
+        lock = self._chat_locks.setdefault(chat.id, asyncio.Lock())
+        self._queued[chat.id] = self._queued.get(chat.id, 0) + 1
+        try:
+            async with lock:
+                await super().process_update(update, coroutine)
+        finally:
+            self._queued[chat.id] -= 1
+            if not self._queued[chat.id]:
+                del self._queued[chat.id]
+                del self._chat_locks[chat.id]
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
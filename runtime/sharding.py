@@ -0,0 +1,64 @@
+"""
+Multi-process mode: chats are partitioned by chat_id across worker processes.
+
+The dispatcher only looks at raw update JSON to find the chat and hands the
+update over to the owning worker, so all updates of a chat are processed by
+one process in order, and per-process state (quiz sessions, caches, the
+conversation of the chat) never has to be shared. Storage is shared through
+the SQLite files, which are opened in WAL mode by every worker.
+"""
+
+from __future__ import annotations
+
+import multiprocessing as mp
+from typing import Any, Callable, Dict, List
+
+
+def update_chat_id(update: Dict[str, Any]) -> int | None:
+    """Chat of raw update JSON, the sender for updates without a chat (inline queries)."""
+    for key, payload in update.items():
+        if key == 'update_id' or not isinstance(payload, dict):
+            continue
+        chat = payload.get('chat') or (payload.get('message') or {}).get('chat')
+        if chat is not None:
+            return chat['id']
+        sender = payload.get('from') or payload.get('user')
+        if sender is not None:
+            return sender['id']
+    return None
+
+
+def shard_of(chat_id: int | None, shards: int) -> int:
+    return chat_id % shards if chat_id is not None else 0
+
+
+class ShardedDispatcher:
+    """
+    Starts shards processes running worker(shard, updates, *args) and routes
+    updates to them. updates is a queue of raw update JSON, None means stop.
+
+    queue_size - updates a worker may lag behind before dispatch blocks
+    """
+
+    def __init__(self, shards: int, worker: Callable[..., None], *args: Any, queue_size: int = 1000):
+        self.shards = shards
+        self.queues: List[mp.Queue] = [mp.Queue(queue_size) for _ in range(shards)]
+        self.processes = [mp.Process(target=worker, args=(shard, queue) + args, name=f'shard-{shard}')
+                          for shard, queue in enumerate(self.queues)]
+
+    def start(self) -> None:
+        for process in self.processes:
+            process.start()
+
+    def dispatch(self, update: Dict[str, Any]) -> int:
+        """Pass update to its worker, return the shard number."""
+        shard = shard_of(update_chat_id(update), self.shards)
+        self.queues[shard].put(update)
+        return shard
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Let workers finish queued updates and wait for them to exit."""
+        for queue in self.queues:
+            queue.put(None)
+        for process in self.processes:
+            process.join(timeout)
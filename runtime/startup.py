@@ -0,0 +1,47 @@
+"""Startup-time breakdown: how long imports, storage, services and warm-up took."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+
+class StartupProfile:
+    """
+    Durations of startup phases. A phase ends with mark(name) and started
+    at the previous mark, or at started for the first one.
+    """
+
+    def __init__(self, started: float | None = None):
+        self.started = time.perf_counter() if started is None else started
+        self._last = self.started
+        self.phases: List[Tuple[str, float]] = []
+
+    def reset(self) -> None:
+        """Start over, e.g. in a forked worker process."""
+        self.started = self._last = time.perf_counter()
+        self.phases.clear()
+
+    def mark(self, name: str) -> None:
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    async def run_parallel(self, name: str, steps: Dict[str, Callable[[], Any]]) -> None:
+        """Run blocking warm-up steps on threads at once, record each of them and the phase name."""
+        def timed(step: Callable[[], Any]) -> float:
+            started = time.perf_counter()
+            step()
+            return time.perf_counter() - started
+
+        loop = asyncio.get_running_loop()
+        durations = await asyncio.gather(*(loop.run_in_executor(None, timed, step) for step in steps.values()))
+        self.mark(name)
+        self.phases.extend((f'  {step_name}', seconds) for step_name, seconds in zip(steps, durations))
+
+    def report(self) -> str:
+        total = self._last - self.started
+        lines = [f'startup took {total:.2f}s']
+        lines += [f'  {name:<32} {seconds * 1000:8.1f}ms' for name, seconds in self.phases]
+        return '\n'.join(lines)
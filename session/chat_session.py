@@ -0,0 +1,68 @@
+"""
+Compact per-chat session record.
+
+chat_data of every chat holds only plain values: ids of the language and of
+the conversation state, quiz score and the phrase of the asked quiz question. ChatSession converts
+it to a repository row and back.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict
+
+# chat_data keys kept in the session record
+SESSION_KEYS = ('lang', 'state', 'quiz_score', 'quiz_phrase', 'quiz_correct_ans')
+
+CHAT_SESSION_COLUMNS = {
+    'chat_id': 'INTEGER PRIMARY KEY',
+    'lang_id': 'INTEGER',
+    'state_id': 'INTEGER',
+    'quiz_score': 'INTEGER',
+    'quiz_phrase': 'TEXT',
+    'quiz_correct_ans': 'TEXT'}
+
+
+class ChatSession:
+    def __init__(self, chat_id: int, lang_id: int | None = None, state_id: int | None = None,
+                 quiz_score: int | None = None, quiz_phrase: str | None = None,
+                 quiz_correct_ans: str | None = None):
+        self.chat_id = chat_id
+        self.lang_id = lang_id
+        self.state_id = state_id
+        self.quiz_score = quiz_score
+        self.quiz_phrase = quiz_phrase
+        self.quiz_correct_ans = quiz_correct_ans
+
+    @classmethod
+    def from_chat_data(cls, chat_id: int, chat_data: Dict[str, Any]) -> ChatSession:
+        return cls(chat_id,
+                   chat_data.get('lang'),
+                   chat_data.get('state'),
+                   chat_data.get('quiz_score'),
+                   chat_data.get('quiz_phrase'),
+                   chat_data.get('quiz_correct_ans'))
+
+    def to_chat_data(self) -> Dict[str, Any]:
+        values = {
+            'lang': self.lang_id,
+            'state': self.state_id,
+            'quiz_score': self.quiz_score,
+            'quiz_phrase': self.quiz_phrase,
+            'quiz_correct_ans': self.quiz_correct_ans}
+        return {key: value for key, value in values.items() if value is not None}
+
+    def key(self) -> tuple:
+        return (self.lang_id, self.state_id, self.quiz_score, self.quiz_phrase, self.quiz_correct_ans)
+
+
+class ConversationEntry:
+    def __init__(self, name: str, conv_key: str, state: int):
+        self.name = name
+        self.conv_key = conv_key
+        self.state = state
+
+
+CONVERSATION_COLUMNS = {
+    'name': 'TEXT NOT NULL',
+    'conv_key': 'TEXT NOT NULL',
+    'state': 'INTEGER'}
@@ -0,0 +1,102 @@
+"""
+python-telegram-bot persistence on top of the repository package.
+
+Only chat_data (as ChatSession records) and conversation states are stored.
+The application keeps chat_data in memory and hands it over every
+update_interval seconds; unchanged sessions are skipped and changed ones go
+through a write-behind repository, so a flush is a single transaction.
+
+Several processes may share the database as long as each chat is served by
+one of them at a time (see sharding); a restarted process picks up where
+the previous one stopped.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from repository.async_sqlite_repository import AsyncSQLiteRepository
+from session.chat_session import ChatSession, ConversationEntry
+
+
+class RepositoryPersistence(BasePersistence[Dict[str, Any], Dict[str, Any], Dict[str, Any]]):
+    """
+    sessions - repository of ChatSession keyed by chat_id
+    conversations - repository of ConversationEntry keyed by (name, conv_key)
+    """
+
+    def __init__(self, sessions: AsyncSQLiteRepository[ChatSession],
+                 conversations: AsyncSQLiteRepository[ConversationEntry],
+                 update_interval: float = 5.0):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=True, user_data=False, callback_data=False),
+            update_interval=update_interval)
+        self.sessions = sessions
+        self.conversations = conversations
+        self._stored: Dict[int, Tuple] = {}
+
+    async def get_chat_data(self) -> Dict[int, Dict[str, Any]]:
+        chat_data = {}
+        async for session in self.sessions.iter_all():
+            chat_data[session.chat_id] = session.to_chat_data()
+            self._stored[session.chat_id] = session.key()
+        return chat_data
+
+    async def update_chat_data(self, chat_id: int, data: Dict[str, Any]) -> None:
+        session = ChatSession.from_chat_data(chat_id, data)
+        if self._stored.get(chat_id) == session.key():
+            return
+        self._stored[chat_id] = session.key()
+        await self.sessions.upsert(session)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[str, Any]) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._stored.pop(chat_id, None)
+        await self.sessions.delete(chat_id)
+
+    async def get_conversations(self, name: str) -> Dict[Tuple, object]:
+        entries = await self.conversations.get_all({'name': name})
+        return {tuple(json.loads(entry.conv_key)): entry.state for entry in entries
+                if entry.state is not None}
+
+    async def update_conversation(self, name: str, key: Tuple, new_state: Optional[object]) -> None:
+        entry = ConversationEntry(name, json.dumps(list(key)), new_state)
+        await self.conversations.upsert(entry)
+
+    async def flush(self) -> None:
+        await self.sessions.flush()
+        await self.conversations.flush()
+
+    # user, bot and callback data are not persisted
+
+    async def get_user_data(self) -> Dict[int, Dict[str, Any]]:
+        return {}
+
+    async def get_bot_data(self) -> Dict[str, Any]:
+        return {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def update_user_data(self, user_id: int, data: Dict[str, Any]) -> None:
+        pass
+
+    async def update_bot_data(self, data: Dict[str, Any]) -> None:
+        pass
+
+    async def update_callback_data(self, data: Any) -> None:
+        pass
+
+    async def drop_user_data(self, user_id: int) -> None:
+        pass
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[str, Any]) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Dict[str, Any]) -> None:
+        pass
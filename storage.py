@@ -0,0 +1,130 @@
+"""
+Databases of the bot, shared by main.py and the offline jobs next to it.
+"""
+
+from repository.sqlite_repository import SQLiteRepository
+from repository.migrations import rebuild_table, merge_duplicates, add_missing_columns, number_rows
+from translation.cache import TranslationEntry, TRANSLATION_COLUMNS, TRANSLATION_KEY
+from quiz.scheduler import QuizScheduleEntry
+
+
+class UserTableEntry:
+    def __init__(self, user_id, target_lang, phrase, id=None, hits=1, last_seen=0, seq=None):
+        self.id = id
+        self.user_id = user_id
+        self.target_lang = target_lang
+        self.phrase = phrase
+        self.hits = hits
+        self.last_seen = last_seen
+        self.seq = seq
+
+
+class QuizScoreTableEntry:
+    def __init__(self, user_id, user_name: str, lang: str, score: int):
+        self.user_id = user_id
+        self.user_name = user_name
+        self.lang = lang
+        self.score = score
+
+
+# seq numbers phrases of a user and language 1, 2, 3... in insertion order. The
+# database assigns it, entities carry None until read back and an upsert or
+# update with None keeps the stored number. Phrases are never deleted, so the
+# numbers stay dense.
+WORD_BOOK_TRIGGERS = [
+    'CREATE TRIGGER IF NOT EXISTS word_book_seq AFTER INSERT ON word_book WHEN NEW.seq IS NULL BEGIN '
+    'UPDATE word_book SET seq = (SELECT COALESCE(MAX(seq), 0) + 1 FROM word_book '
+    'WHERE user_id = NEW.user_id AND target_lang = NEW.target_lang) WHERE id = NEW.id; END',
+    'CREATE TRIGGER IF NOT EXISTS word_book_keep_seq AFTER UPDATE OF seq ON word_book '
+    'WHEN NEW.seq IS NULL AND OLD.seq IS NOT NULL BEGIN '
+    'UPDATE word_book SET seq = OLD.seq WHERE id = NEW.id; END',
+]
+
+
+def open_word_book(write_behind: int = 100) -> SQLiteRepository:
+    """Per-user prompted phrases."""
+    return SQLiteRepository('user_phrase_base.db',
+                            'word_book',
+                            {'id': 'INTEGER PRIMARY KEY',
+                             'user_id': 'INTEGER NOT NULL',
+                             'target_lang': 'TEXT NOT NULL',
+                             'phrase': 'TEXT NOT NULL',
+                             'hits': 'INTEGER NOT NULL DEFAULT 1',
+                             'last_seen': 'INTEGER NOT NULL DEFAULT 0',
+                             'seq': 'INTEGER'},
+                            UserTableEntry,
+                            'id',
+                            # rowid is implied, the index also serves keyset pages;
+                            # seq finds the phrase at a given rank of a user and language
+                            indexes=[('user_id', 'target_lang'), ('user_id', 'target_lang', 'seq')],
+                            unique=[('user_id', 'target_lang', 'phrase')],
+                            # repeated phrases become one row counting them, it keeps the id
+                            # of the latest one (its rowid in the first tables, which had no
+                            # id column) and with it the recency order
+                            migrations=[merge_duplicates(('user_id', 'target_lang', 'phrase'),
+                                                         {'id': 'max', 'hits': 'count', 'last_seen': 'max'}),
+                                        add_missing_columns(),
+                                        # seq, numbered for the phrases stored so far
+                                        add_missing_columns(),
+                                        number_rows('seq', ('user_id', 'target_lang'), order_by='id')],
+                            triggers=WORD_BOOK_TRIGGERS,
+                            # every translated message upserts a phrase,
+                            # batch them instead of a commit per message
+                            write_behind=write_behind,
+                            flush_interval=1.0)
+
+
+def open_quiz_schedule(write_behind: int = 100) -> SQLiteRepository:
+    """Spaced-repetition state of word_book phrases, next to them."""
+    return SQLiteRepository('user_phrase_base.db',
+                            'quiz_schedule',
+                            {'user_id': 'INTEGER NOT NULL',
+                             'target_lang': 'TEXT NOT NULL',
+                             'phrase': 'TEXT NOT NULL',
+                             'due': 'INTEGER NOT NULL DEFAULT 0',
+                             'interval': 'REAL NOT NULL DEFAULT 0',
+                             'ease': 'REAL NOT NULL DEFAULT 2.5',
+                             'repetitions': 'INTEGER NOT NULL DEFAULT 0',
+                             'reviewed': 'INTEGER NOT NULL DEFAULT 0'},
+                            QuizScheduleEntry,
+                            'user_id',
+                            # the quiz asks the earliest due phrases of a user and language,
+                            # when none is due the ones reviewed longest ago
+                            indexes=[('user_id', 'target_lang', 'due'), ('user_id', 'target_lang', 'reviewed')],
+                            primary_key=('user_id', 'target_lang', 'phrase'),
+                            migrations=[add_missing_columns()],
+                            # every translated message enrolls its phrase
+                            write_behind=write_behind,
+                            flush_interval=1.0)
+
+
+def open_quiz_scoreboard() -> SQLiteRepository:
+    """Best quiz score per user and language."""
+    return SQLiteRepository(
+        'quiz_scoreboard.db',
+        'quiz_score',
+        {
+            'user_id': 'INTEGER',
+            'user_name': 'TEXT',
+            'lang': 'TEXT',
+            'score': 'INTEGER'},
+        QuizScoreTableEntry,
+        'user_id',
+        indexes=[('lang', 'score')],
+        primary_key=('user_id', 'lang'),
+        # keep the best score of duplicated entries
+        migrations=[rebuild_table(order_by='score')])
+
+
+def open_translation_store(write_behind: int = 0) -> SQLiteRepository:
+    """Persistent tier of the translation cache."""
+    return SQLiteRepository(
+        'translation_cache.db',
+        'translation',
+        TRANSLATION_COLUMNS,
+        TranslationEntry,
+        'source_text',
+        unique=[TRANSLATION_KEY],
+        migrations=[rebuild_table()],
+        write_behind=write_behind,
+        flush_interval=1.0)
@@ -0,0 +1,49 @@
+import asyncio
+import threading
+import time
+
+from metrics.loop_lag import LoopLagMonitor
+from repository.async_sqlite_repository import AsyncSQLiteRepository
+from storage import UserTableEntry, open_word_book
+
+HOLD = 0.3
+# longest acceptable event loop stall
+MAX_LAG = 0.05
+
+
+def test_waiting_for_the_writer_does_not_stall_the_loop(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    word_book = AsyncSQLiteRepository(open_word_book(write_behind=0))
+    word_book.sync.add(UserTableEntry(1, 'en', 'cat'))
+    writing = threading.Event()
+
+    def long_write():
+        # e.g. a write-behind flush of a large batch
+        with word_book.sync._writer():
+            writing.set()
+            time.sleep(HOLD)
+
+    async def chats():
+        lags = []
+        monitor = LoopLagMonitor(lags.append, interval=0.005)
+        monitor.start()
+        writer = threading.Thread(target=long_write)
+        writer.start()
+        await asyncio.get_running_loop().run_in_executor(None, writing.wait)
+        started = time.perf_counter()
+        # writes wait for the writer on the pool, reads don't wait at all
+        await asyncio.gather(*(word_book.add(UserTableEntry(2, 'en', f'phrase {i}')) for i in range(4)),
+                             *(word_book.get_all({'user_id': 1}) for _ in range(20)))
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0.01)
+        monitor.stop()
+        writer.join()
+        return elapsed, lags
+
+    elapsed, lags = asyncio.run(chats())
+    rows = word_book.sync.get_all({'user_id': 2})
+    word_book.close()
+
+    assert elapsed >= HOLD / 2
+    assert lags and max(lags) < MAX_LAG
+    assert len(rows) == 4
@@ -0,0 +1,75 @@
+import sqlite3
+
+import pytest
+
+from storage import UserTableEntry, open_word_book
+
+
+def old_word_book(rows):
+    """word_book as it was before phrases were deduplicated: a row per message."""
+    connection = sqlite3.connect('user_phrase_base.db')
+    with connection:
+        connection.execute('CREATE TABLE word_book (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, '
+                           'target_lang TEXT NOT NULL, phrase TEXT NOT NULL)')
+        connection.executemany('INSERT INTO word_book (user_id, target_lang, phrase) VALUES (?, ?, ?)', rows)
+    connection.close()
+
+
+def baseline_word_book(rows):
+    """word_book as the bot first created it, without an id column."""
+    connection = sqlite3.connect('user_phrase_base.db')
+    with connection:
+        connection.execute('CREATE TABLE word_book (user_id, target_lang, phrase)')
+        connection.executemany('INSERT INTO word_book VALUES (?, ?, ?)', rows)
+    connection.close()
+
+
+def test_word_book_migration_counts_repeated_phrases(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    old_word_book([(1, 'en', 'cat')] * 3 + [(1, 'en', 'dog'), (2, 'en', 'cat'), (1, 'de', 'cat')]
+                  + [(1, 'en', 'cat')] * 2)
+
+    word_book = open_word_book(write_behind=0)
+    rows = {(word.user_id, word.target_lang, word.phrase): word for word in word_book.get_all({})}
+    word_book.close()
+
+    assert {key: word.hits for key, word in rows.items()} == {
+        (1, 'en', 'cat'): 5, (1, 'en', 'dog'): 1, (2, 'en', 'cat'): 1, (1, 'de', 'cat'): 1}
+    # the latest occurrence keeps its place
+    assert rows[(1, 'en', 'cat')].id == 8
+    assert rows[(1, 'en', 'dog')].id == 4
+
+
+def test_word_book_migration_adds_unique_key(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    old_word_book([(1, 'en', 'cat')] * 2)
+    open_word_book(write_behind=0).close()
+
+    connection = sqlite3.connect('user_phrase_base.db')
+    with pytest.raises(sqlite3.IntegrityError):
+        connection.execute("INSERT INTO word_book (user_id, target_lang, phrase) VALUES (1, 'en', 'cat')")
+    connection.close()
+
+
+def test_word_book_migration_numbers_phrases_per_user_and_language(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    old_word_book([(1, 'en', 'cat'), (2, 'en', 'cat'), (1, 'en', 'dog'), (1, 'de', 'cat'), (1, 'en', 'cat')])
+
+    word_book = open_word_book(write_behind=0)
+    word_book.add(UserTableEntry(1, 'en', 'bird'))
+    rows = {(word.user_id, word.target_lang, word.phrase): word.seq for word in word_book.get_all({})}
+    word_book.close()
+
+    assert rows == {(1, 'en', 'dog'): 1, (1, 'en', 'cat'): 2, (1, 'en', 'bird'): 3,
+                    (2, 'en', 'cat'): 1, (1, 'de', 'cat'): 1}
+
+
+def test_baseline_word_book_migration_keeps_recency_order(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    baseline_word_book([(1, 'en', 'zebra'), (1, 'en', 'apple'), (1, 'en', 'zebra'), (1, 'en', 'mango')])
+
+    word_book = open_word_book(write_behind=0)
+    rows = [(word.id, word.phrase, word.hits, word.seq) for word in word_book.get_page({'user_id': 1})]
+    word_book.close()
+
+    assert rows == [(2, 'apple', 1, 1), (3, 'zebra', 2, 2), (4, 'mango', 1, 3)]
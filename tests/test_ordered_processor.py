@@ -0,0 +1,71 @@
+import asyncio
+from typing import List
+
+from telegram import Update
+from telegram.ext import Application, ConversationHandler, MessageHandler, filters
+
+from runtime.fake_updates import LocalBotRequest, synthetic_update
+from runtime.ordered_processor import ChatOrderedUpdateProcessor
+
+# the first message of a test is handled slowly, the others at once
+SLOW = 0.1
+
+
+def conversation_application(handled: List[str], processor: ChatOrderedUpdateProcessor) -> Application:
+    """Application with a blocking two-state conversation, as main.py builds it."""
+    application = Application.builder().token('1:local').request(LocalBotRequest()) \
+        .concurrent_updates(processor).build()
+
+    async def handle(update: Update, context) -> int:
+        if update.message.text.startswith('slow'):
+            await asyncio.sleep(SLOW)
+        handled.append(update.message.text)
+        return 1
+
+    application.add_handler(ConversationHandler(
+        entry_points=[MessageHandler(filters.TEXT, handle)],
+        states={1: [MessageHandler(filters.TEXT, handle)]},
+        fallbacks=[]))
+    return application
+
+
+def run(application: Application, messages, handled: List[str]) -> None:
+    async def wait_handled():
+        while len(handled) < len(messages):
+            await asyncio.sleep(0.01)
+
+    async def feed():
+        async with application:
+            await application.start()
+            for update_id, (chat_id, text) in enumerate(messages, 1):
+                await application.update_queue.put(
+                    Update.de_json(synthetic_update(update_id, chat_id, text), application.bot))
+            try:
+                # a dropped update never shows up
+                await asyncio.wait_for(wait_handled(), 5 * SLOW * len(messages))
+            except asyncio.TimeoutError:
+                pass
+            await application.stop()
+    asyncio.run(feed())
+
+
+def test_updates_of_a_chat_are_all_handled_in_order():
+    handled = []
+    run(conversation_application(handled, ChatOrderedUpdateProcessor(8)),
+        [(1, 'slow hello'), (1, 'second'), (1, 'third')], handled)
+    assert handled == ['slow hello', 'second', 'third']
+
+
+def test_other_chats_do_not_wait_for_a_slow_chat():
+    handled = []
+    run(conversation_application(handled, ChatOrderedUpdateProcessor(8)),
+        [(1, 'slow hello'), (2, 'hello'), (1, 'second')], handled)
+    assert handled == ['hello', 'slow hello', 'second']
+
+
+def test_on_queued_is_called_for_updates_waiting_for_their_chat():
+    handled = []
+    queued = []
+    processor = ChatOrderedUpdateProcessor(8, lambda chat_id, update: queued.append((chat_id, update.message.text)))
+    run(conversation_application(handled, processor), [(1, 'slow hello'), (2, 'hello'), (1, 'second')], handled)
+    assert queued == [(1, 'second')]
@@ -0,0 +1,178 @@
+import threading
+
+import pytest
+
+from translation.providers import CircuitBreaker, ProviderUnavailable, ResilientProvider, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class HangingBackend:
+    """Hangs until the timeout of the call, as a backend that never answers."""
+
+    def __init__(self, clock: FakeClock):
+        self.clock = clock
+        self.timeouts = []
+
+    def __call__(self, text, from_language='auto', to_language='en', timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        self.clock.now += 30.0 if timeout is None else timeout
+        raise TimeoutError('read timed out')
+
+
+def working(text, from_language='auto', to_language='en', **kwargs):
+    return f'[{to_language}] {text}'
+
+
+def provider(clock, backends, **kwargs):
+    return ResilientProvider(backends, rate=100.0, burst=10, retries=2, backoff=0.2,
+                             clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_hanging_primary_leaves_time_for_fallback():
+    clock = FakeClock()
+    primary = HangingBackend(clock)
+    translate = provider(clock, [('primary', primary), ('fallback', working)], deadline=9.0)
+
+    assert translate('cat') == '[en] cat'
+    assert clock.now <= 4.5
+    assert all(0 < timeout <= 4.5 for timeout in primary.timeouts)
+
+
+def test_deadline_bounds_all_backends():
+    clock = FakeClock()
+    backends = [(f'hanging{i}', HangingBackend(clock)) for i in range(3)]
+    translate = provider(clock, backends, deadline=9.0)
+
+    with pytest.raises(ProviderUnavailable):
+        translate('cat')
+    assert clock.now <= 9.0
+    assert all(backend.timeouts for _, backend in backends)
+
+
+def test_no_deadline_keeps_backend_timeout():
+    clock = FakeClock()
+    primary = HangingBackend(clock)
+    translate = provider(clock, [('primary', primary), ('fallback', working)])
+
+    assert translate('cat') == '[en] cat'
+    assert primary.timeouts == [None] * 3
+
+
+class FlakyBackend:
+    """Fails while failing is set, counts calls."""
+
+    def __init__(self, failing=True):
+        self.failing = failing
+        self.calls = 0
+
+    def __call__(self, text, from_language='auto', to_language='en', **kwargs):
+        self.calls += 1
+        if self.failing:
+            raise ConnectionError('upstream down')
+        return f'[{to_language}] {text}'
+
+
+def test_breaker_opens_half_opens_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    clock.now = 10.0
+    # one trial call, the others wait for its outcome
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    clock.now = 20.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.allow() and breaker.allow()
+    assert not breaker.is_open()
+
+
+def test_rate_limited_trial_does_not_keep_the_breaker_open():
+    clock = FakeClock()
+    backend = FlakyBackend()
+    # a token every 20s, the breaker tries again after 10s
+    translate = ResilientProvider([('flaky', backend)], rate=0.05, burst=1, max_wait=1.0, retries=0,
+                                  failure_threshold=1, reset_timeout=10.0, clock=clock, sleep=clock.sleep)
+    with pytest.raises(ProviderUnavailable):
+        translate('cat')
+    backend.failing = False
+
+    clock.now = 10.0
+    # the trial is let through by the breaker but there is no token for it
+    with pytest.raises(ProviderUnavailable):
+        translate('cat')
+    assert backend.calls == 1
+
+    clock.now = 1000.0
+    assert translate('cat') == '[en] cat'
+    assert not translate.backends[0].breaker.is_open()
+
+
+def test_failing_backend_is_skipped_while_open():
+    clock = FakeClock()
+    primary = FlakyBackend()
+    translate = provider(clock, [('primary', primary), ('fallback', working)],
+                         failure_threshold=3, reset_timeout=30.0)
+    assert translate('cat') == '[en] cat'
+    assert primary.calls == 3
+    assert translate('dog') == '[en] dog'
+    assert primary.calls == 3
+
+    primary.failing = False
+    clock.now += 30.0
+    assert translate('bird') == '[en] bird'
+    assert primary.calls == 4
+
+
+def test_token_bucket_waits():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, burst=2, clock=clock)
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 0.5, 1.0]
+    bucket.cancel()
+    assert bucket.reserve() == 1.0
+    clock.now = 10.0
+    # refills up to burst only
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.5]
+
+
+def test_identical_requests_in_flight_are_coalesced():
+    release = threading.Event()
+    calls = []
+
+    def slow(text, from_language='auto', to_language='en', **kwargs):
+        calls.append(text)
+        release.wait(5.0)
+        return f'[{to_language}] {text}'
+
+    translate = ResilientProvider([('slow', slow)])
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(translate('cat'))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while translate.coalesced < 3:
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ['cat']
+    assert results == ['[en] cat'] * 4
+    assert translate('dog') == '[en] dog'
+    assert calls == ['cat', 'dog']
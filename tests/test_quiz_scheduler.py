@@ -0,0 +1,66 @@
+import asyncio
+import random
+from collections import Counter
+
+from quiz.scheduler import DAY, QuizScheduler
+from repository.async_sqlite_repository import AsyncSQLiteRepository
+from storage import UserTableEntry, open_quiz_schedule, open_word_book
+
+
+def scheduler_with(phrases_by_user):
+    """Scheduler over word_book rows added user by user, in the order given."""
+    word_book = AsyncSQLiteRepository(open_word_book(write_behind=0))
+    for user_id, phrases in phrases_by_user:
+        word_book.sync.add_all(UserTableEntry(user_id, 'en', phrase) for phrase in phrases)
+    schedule = AsyncSQLiteRepository(open_quiz_schedule(write_behind=0))
+    return QuizScheduler(schedule, word_book, rng=random.Random(0))
+
+
+def test_random_phrases_are_uniform_with_other_users_in_between(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    mine = [f'phrase {i}' for i in range(8)]
+    scheduler = scheduler_with([(1, mine[:4]), (2, [f'other {i}' for i in range(5000)]), (1, mine[4:])])
+
+    async def sample():
+        pool = await scheduler.open_pool(1, 'en')
+        return [await scheduler.random_phrases(1, 'en', pool, 3, {'phrase 0'}) for _ in range(1000)]
+
+    samples = asyncio.run(sample())
+    scheduler.word_book.close()
+    scheduler.schedule.close()
+
+    assert all(len(phrases) == 3 and len(set(phrases)) == 3 for phrases in samples)
+    counts = Counter(phrase for phrases in samples for phrase in phrases)
+    assert set(counts) == set(mine[1:])
+    # 3000 picks over 7 phrases, about 429 each
+    assert all(350 < count < 510 for count in counts.values())
+
+
+def test_next_due_waits_for_due_phrases(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    scheduler = scheduler_with([])
+    clock = [0.0]
+    scheduler.clock = lambda: clock[0]
+
+    async def quiz():
+        for phrase in ('cat', 'dog'):
+            await scheduler.enroll(1, 'en', phrase)
+        # cat is due in 6 days, dog reviewed later is due in 1 day
+        await scheduler.answer(1, 'en', 'cat', True)
+        await scheduler.answer(1, 'en', 'cat', True)
+        clock[0] = 60.0
+        await scheduler.answer(1, 'en', 'dog', True)
+        clock[0] = 120.0
+        await scheduler.schedule.flush()
+        ahead = await scheduler.next_due(1, 'en', (), 1)
+        await scheduler.enroll(1, 'en', 'bird')
+        await scheduler.schedule.flush()
+        new = await scheduler.next_due(1, 'en', (), 1)
+        clock[0] = 2 * DAY
+        due = await scheduler.next_due(1, 'en', {'bird'}, 2)
+        return ahead.phrase, new.phrase, due.phrase
+
+    # nothing is due: the phrase reviewed longest ago, not the earliest due one
+    assert asyncio.run(quiz()) == ('cat', 'bird', 'dog')
+    scheduler.word_book.close()
+    scheduler.schedule.close()
@@ -0,0 +1,69 @@
+import asyncio
+import random
+import threading
+from collections import defaultdict
+
+from quiz.leaderboard import Leaderboard
+from repository.async_sqlite_repository import AsyncSQLiteRepository
+from storage import QuizScoreTableEntry, open_quiz_scoreboard
+
+USERS = 20
+
+
+def test_concurrent_max_upserts_keep_best_score(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    scoreboard = open_quiz_scoreboard()
+    for user_id in range(USERS):
+        scoreboard.add(QuizScoreTableEntry(user_id, f'user{user_id}', 'de', 1000 + user_id))
+    submitted = [defaultdict(list) for _ in range(8)]
+
+    def play(i):
+        rng = random.Random(i)
+        for _ in range(300):
+            user_id, score = rng.randrange(USERS), rng.randrange(100)
+            submitted[i][user_id].append(score)
+            scoreboard.upsert(QuizScoreTableEntry(user_id, f'user{user_id}', 'en', score), {'score': 'max'})
+
+    threads = [threading.Thread(target=play, args=(i,)) for i in range(len(submitted))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    rows = {(entry.user_id, entry.lang): entry.score for entry in scoreboard.get_all({})}
+    scoreboard.close()
+
+    best = {user_id: max(score for scores in submitted for score in scores.get(user_id, []))
+            for user_id in range(USERS)}
+    assert {user_id: rows[(user_id, 'en')] for user_id in range(USERS)} == best
+    # other languages of the same users are left alone
+    assert {user_id: rows[(user_id, 'de')] for user_id in range(USERS)} == \
+        {user_id: 1000 + user_id for user_id in range(USERS)}
+    assert len(rows) == 2 * USERS
+
+
+def test_leaderboard_records_concurrent_results(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    scoreboard = AsyncSQLiteRepository(open_quiz_scoreboard())
+    leaderboard = Leaderboard(scoreboard, ['en'], size=5)
+    rng = random.Random(0)
+    results = [QuizScoreTableEntry(user_id, f'user{user_id}', 'en', rng.randrange(100))
+               for user_id in rng.choices(range(USERS), k=500)]
+
+    async def play():
+        await leaderboard.load()
+        await asyncio.gather(*(leaderboard.record(entry) for entry in results))
+        cached = [(entry.user_id, entry.score) for entry in await leaderboard.top('en')]
+        leaderboard.max_age = 0
+        stored = [(entry.user_id, entry.score) for entry in await leaderboard.top('en')]
+        return cached, stored
+
+    cached, stored = asyncio.run(play())
+    scoreboard.close()
+
+    best = defaultdict(int)
+    for entry in results:
+        best[entry.user_id] = max(best[entry.user_id], entry.score)
+    top_scores = sorted(best.values(), reverse=True)[:5]
+    assert [score for _, score in stored] == top_scores
+    assert sorted(score for _, score in cached) == sorted(top_scores)
+    assert all(best[user_id] == score for user_id, score in cached + stored)
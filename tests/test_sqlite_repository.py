@@ -0,0 +1,110 @@
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from storage import UserTableEntry, open_word_book
+
+WRITERS = 8
+WRITES = 200
+
+
+def start_threads(target, count, errors):
+    def run(i):
+        try:
+            target(i)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+@pytest.mark.parametrize('write_behind', [0, 50])
+def test_concurrent_writes_and_reads_lose_nothing(tmp_path, monkeypatch, write_behind):
+    monkeypatch.chdir(tmp_path)
+    word_book = open_word_book(write_behind=write_behind)
+    writing = threading.Event()
+    writing.set()
+    errors = []
+
+    def read(i):
+        while writing.is_set():
+            for word in word_book.get_page({'user_id': i, 'target_lang': 'en'}, limit=20):
+                assert word.phrase.startswith('phrase ')
+
+    def write(i):
+        for n in range(WRITES):
+            word_book.add(UserTableEntry(i, 'en', f'phrase {n}'))
+            # the phrase is sent again
+            word_book.upsert(UserTableEntry(i, 'en', f'phrase {n}', last_seen=n), {'hits': 'sum'})
+
+    readers = start_threads(read, 4, errors)
+    for thread in start_threads(write, WRITERS, errors):
+        thread.join()
+    writing.clear()
+    for thread in readers:
+        thread.join()
+    word_book.flush()
+    rows = word_book.get_all({})
+    word_book.close()
+
+    assert errors == []
+    assert Counter(word.user_id for word in rows) == {i: WRITES for i in range(WRITERS)}
+    assert {word.hits for word in rows} == {2}
+    assert all(word.last_seen == int(word.phrase.split()[1]) for word in rows)
+
+
+def test_reads_do_not_wait_for_a_write_transaction(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    word_book = open_word_book(write_behind=0)
+    word_book.add(UserTableEntry(1, 'en', 'cat'))
+    writing = threading.Event()
+
+    def long_write():
+        with word_book._writer() as connection:
+            connection.execute("INSERT INTO word_book (user_id, target_lang, phrase) VALUES (1, 'en', 'dog')")
+            writing.set()
+            time.sleep(0.5)
+
+    writer = threading.Thread(target=long_write)
+    writer.start()
+    writing.wait()
+    started = time.perf_counter()
+    phrases = [word.phrase for word in word_book.get_all({'user_id': 1})]
+    elapsed = time.perf_counter() - started
+    writer.join()
+    word_book.close()
+
+    # the pool reads the last committed state right away
+    assert phrases == ['cat']
+    assert elapsed < 0.25
+
+
+def test_failed_flush_keeps_rows_for_the_next_one(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    word_book = open_word_book(write_behind=3)
+    word_book.flusher_stop.set()
+    word_book.connection.execute('PRAGMA busy_timeout = 10')
+    word_book.add(UserTableEntry(1, 'en', 'cat'))
+    word_book.add(UserTableEntry(1, 'en', 'dog'))
+
+    # another process holds the database
+    other = sqlite3.connect('user_phrase_base.db')
+    other.execute('BEGIN IMMEDIATE')
+    with pytest.raises(sqlite3.OperationalError):
+        word_book.flush()
+    # a full buffer doesn't fail the write that filled it
+    word_book.add(UserTableEntry(1, 'en', 'bird'))
+    other.rollback()
+    other.close()
+
+    word_book.flush()
+    phrases = [word.phrase for word in word_book.get_all({'user_id': 1})]
+    word_book.close()
+
+    assert phrases == ['cat', 'dog', 'bird']
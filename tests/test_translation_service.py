@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from metrics.loop_lag import LoopLagMonitor
+from translation.service import AsyncTranslationService, TranslationCancelled
+from translation.translator import Language, Translator
+
+CHATS = 64
+LATENCY = 0.05
+# longest acceptable event loop stall
+MAX_LAG = 0.05
+
+
+class SlowProvider:
+    """Upstream answering after LATENCY seconds, the thread waits meanwhile."""
+
+    def __call__(self, text, from_language='auto', to_language='en', **kwargs):
+        time.sleep(LATENCY)
+        return f'[{to_language}] {text}'
+
+
+def translator(provider) -> Translator:
+    return Translator(Language('Английский', 0, 'en'), None, provider, lambda text: ('ru', 1.0))
+
+
+def test_many_chats_translate_concurrently_without_stalling_the_loop():
+    service = AsyncTranslationService(max_workers=16, max_in_flight=CHATS)
+    english = translator(SlowProvider())
+
+    async def chats():
+        lags = []
+        monitor = LoopLagMonitor(lags.append, interval=0.005)
+        monitor.start()
+        started = time.perf_counter()
+        translations = await asyncio.gather(*(service.translate(english, f'фраза {i}', owner=i)
+                                              for i in range(CHATS)))
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0.01)
+        monitor.stop()
+        return translations, elapsed, lags
+
+    translations, elapsed, lags = asyncio.run(chats())
+    service.shutdown()
+
+    assert translations == [f'[en] фраза {i}' for i in range(CHATS)]
+    # 3.2s one after another, 16 at a time takes 0.2s
+    assert elapsed < CHATS * LATENCY / 4
+    assert lags and max(lags) < MAX_LAG
+
+
+def test_cancel_abandons_only_the_chat_it_names():
+    service = AsyncTranslationService(max_workers=4)
+    english = translator(SlowProvider())
+
+    async def chats():
+        tasks = [asyncio.ensure_future(service.translate(english, f'фраза {i}', owner=i)) for i in range(4)]
+        await asyncio.sleep(0)
+        assert service.cancel(1) == 1
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(chats())
+    service.shutdown()
+
+    assert isinstance(results[1], TranslationCancelled)
+    assert [results[i] for i in (0, 2, 3)] == ['[en] фраза 0', '[en] фраза 2', '[en] фраза 3']
+
+
+def test_timeout_frees_the_chat():
+    service = AsyncTranslationService(max_workers=1, timeout=LATENCY / 5)
+    english = translator(SlowProvider())
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(service.translate(english, 'фраза', owner=1))
+    assert service.in_flight() == 0
+    service.shutdown()
+
+
+class CountingProvider(SlowProvider):
+    """SlowProvider remembering the most calls it had at once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most = 0
+
+    def __call__(self, text, from_language='auto', to_language='en', **kwargs):
+        with self.lock:
+            self.running += 1
+            self.most = max(self.most, self.running)
+        try:
+            return super().__call__(text, from_language, to_language, **kwargs)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+def test_batches_share_the_fetch_pool():
+    service = AsyncTranslationService(max_workers=8)
+    provider = CountingProvider()
+    fetch_executor = ThreadPoolExecutor(4)
+    english = Translator(Language('Английский', 0, 'en'), None, provider, lambda text: ('ru', 1.0),
+                         joinable=False, executor=fetch_executor)
+
+    async def chats():
+        return await asyncio.gather(*(service.translate_batch(english, [f'фраза {i} {j}' for j in range(8)])
+                                      for i in range(8)))
+
+    batches = asyncio.run(chats())
+    service.shutdown()
+    fetch_executor.shutdown()
+
+    assert batches[3] == [f'[en] фраза 3 {j}' for j in range(8)]
+    # 8 batches of 8 requests, each batch used to start a pool of its own
+    assert provider.most == 4
@@ -0,0 +1,109 @@
+"""
+Two-tier cache for translated phrases.
+
+The first tier is an in-process LRU with a size limit and TTL, the second one
+is an optional persistent repository keyed by (source text, source language,
+target language).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+from repository.abstract_repository import AbstractRepository
+
+
+class TranslationEntry:
+    def __init__(self, source_text: str, from_lang: str, to_lang: str, translation: str):
+        self.source_text = source_text
+        self.from_lang = from_lang
+        self.to_lang = to_lang
+        self.translation = translation
+
+
+TRANSLATION_COLUMNS = {
+    'source_text': 'TEXT',
+    'from_lang': 'TEXT',
+    'to_lang': 'TEXT',
+    'translation': 'TEXT'}
+
+TRANSLATION_KEY = ('source_text', 'from_lang', 'to_lang')
+
+
+class TranslationCache:
+    """
+    LRU + TTL cache in front of a persistent translation store.
+
+    Memory entries expire after ttl seconds, persistent entries never do.
+    Hit/miss counters are kept for both tiers.
+    """
+
+    def __init__(self, store: AbstractRepository[TranslationEntry] | None = None,
+                 max_size: int = 10000, ttl: float = 24 * 3600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.store = store
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[Tuple[str, str, str], Tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def get(self, text: str, from_lang: str, to_lang: str) -> str | None:
+        """Return cached translation or None."""
+        key = (text, from_lang, to_lang)
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                if item[1] > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return item[0]
+                del self._entries[key]
+
+        if self.store is not None:
+            rows = self.store.get_all(dict(zip(TRANSLATION_KEY, key)))
+            if rows:
+                translation = rows[0].translation
+                with self._lock:
+                    self.store_hits += 1
+                    self._remember(key, translation)
+                return translation
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, text: str, from_lang: str, to_lang: str, translation: str) -> None:
+        """Store translation in both tiers."""
+        with self._lock:
+            self._remember((text, from_lang, to_lang), translation)
+        if self.store is not None:
+            self.store.add(TranslationEntry(text, from_lang, to_lang, translation))
+
+    def _remember(self, key: Tuple[str, str, str], translation: str) -> None:
+        self._entries[key] = (translation, self._clock() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop in-memory tier, persistent store is kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for both tiers."""
+        with self._lock:
+            lookups = self.hits + self.store_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'store_hits': self.store_hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits + self.store_hits) / lookups if lookups else 0.0}
@@ -0,0 +1,53 @@
+"""
+Language detection for incoming phrases.
+
+langid is restricted to the languages the bot works with, results for
+repeated phrases are memoized. langid is imported and its model loaded on
+the first classify call or by warm().
+"""
+
+from __future__ import annotations
+
+import functools
+import threading
+from typing import TYPE_CHECKING, Iterable, Tuple
+
+if TYPE_CHECKING:
+    from langid.langid import LanguageIdentifier
+
+
+class LanguageDetector:
+    """
+    Drop-in replacement for langid.classify.
+
+    langs - candidate language codes, e.g. ['ru', 'en', 'es', 'de']
+    cache_size - number of memoized phrases
+    """
+
+    def __init__(self, langs: Iterable[str], cache_size: int = 10000):
+        self.langs = sorted(set(langs))
+        self._identifier: LanguageIdentifier | None = None
+        self._lock = threading.Lock()
+        self.classify = functools.lru_cache(maxsize=cache_size)(self._classify)
+
+    def warm(self) -> None:
+        """Load the model now instead of on the first message."""
+        self._get_identifier().classify('warm up')
+
+    def _get_identifier(self) -> LanguageIdentifier:
+        with self._lock:
+            if self._identifier is None:
+                from langid.langid import LanguageIdentifier, model
+                identifier = LanguageIdentifier.from_modelstring(model, norm_probs=False)
+                identifier.set_languages(self.langs)
+                self._identifier = identifier
+            return self._identifier
+
+    def _classify(self, text: str) -> Tuple[str, float]:
+        return self._get_identifier().classify(text)
+
+    def stats(self):
+        info = self.classify.cache_info()
+        lookups = info.hits + info.misses
+        return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize,
+                'hit_ratio': info.hits / lookups if lookups else 0.0}
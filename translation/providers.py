@@ -0,0 +1,240 @@
+"""
+Resilient translation providers.
+
+A provider is a callable with the signature of translators.translate_text:
+provider(text, from_language='auto', to_language='en') -> str. ResilientProvider
+wraps several of them (e.g. different translators backends) and is itself a
+provider, so Translator doesn't know about any of this.
+
+Calls are synchronous: they run on the translation thread pool, waiting for
+the rate limiter or a retry backoff blocks that thread only.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Sequence, Tuple
+
+from metrics.registry import REGISTRY
+
+Provider = Callable[..., str]
+
+
+class ProviderUnavailable(Exception):
+    """No backend could translate the text."""
+
+
+class TokenBucket:
+    """
+    Allows rate calls per second on average and bursts of up to burst calls.
+    """
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token, return how long to wait before using it."""
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def cancel(self) -> None:
+        """Return a token taken by reserve() that won't be used."""
+        with self._lock:
+            self._tokens += 1
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for
+    reset_timeout seconds, then lets one trial call through (half-open).
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or self.clock() - self._opened_at < self.reset_timeout:
+                return False
+            self._trial = True
+            return True
+
+    def release_trial(self) -> None:
+        """Give back the trial call let through by allow() that won't be made."""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+            self._trial = False
+
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+
+class TranslatorsBackend:
+    """One backend of the translators package, e.g. 'bing' or 'google'."""
+
+    def __init__(self, name: str, timeout: float = 5.0):
+        self.name = name
+        self.timeout = timeout
+
+    def warm(self) -> None:
+        """Import translators now, it sets up its sessions on import."""
+        import translators  # noqa: F401
+
+    def __call__(self, text: str, from_language: str = 'auto', to_language: str = 'en',
+                 timeout: float | None = None, **kwargs) -> str:
+        """timeout - shorter timeout of this call, e.g. what is left of a deadline"""
+        import translators as ts
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        return ts.translate_text(text, translator=self.name, from_language=from_language,
+                                 to_language=to_language, timeout=timeout, **kwargs)
+
+
+class Backend:
+    def __init__(self, name: str, provider: Provider, bucket: TokenBucket, breaker: CircuitBreaker):
+        self.name = name
+        self.provider = provider
+        self.bucket = bucket
+        self.breaker = breaker
+        self.failures = REGISTRY.counter('provider_failures_total', backend=name)
+        self.rejected = REGISTRY.counter('provider_rejected_total', backend=name)
+
+
+class ResilientProvider:
+    """
+    Tries backends in order. Every backend has its own token bucket and
+    circuit breaker; a failed call is retried with jittered exponential
+    backoff before falling back to the next backend. Identical requests made
+    while one is in flight wait for its result instead of calling again.
+
+    backends - (name, provider) pairs in order of preference
+    rate, burst - token bucket of every backend
+    max_wait - longest wait for a token, the backend is skipped otherwise
+    retries - additional attempts per backend
+    backoff, max_backoff - retry delay is uniform in [0, min(max_backoff, backoff * 2 ** attempt)]
+    deadline - seconds a translation may take in total, None for no limit. What
+        is left of it is shared equally by the backends not tried yet, and calls
+        get the rest of their backend's share as the timeout keyword, so a
+        hanging backend leaves time for the fallbacks
+    """
+
+    def __init__(self, backends: Sequence[Tuple[str, Provider]], rate: float = 5.0, burst: int = 10,
+                 max_wait: float = 1.0, retries: int = 2, backoff: float = 0.2, max_backoff: float = 2.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0, deadline: float | None = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep,
+                 rng: random.Random | None = None):
+        self.backends = [Backend(name, provider, TokenBucket(rate, burst, clock),
+                                 CircuitBreaker(failure_threshold, reset_timeout, clock))
+                         for name, provider in backends]
+        self.max_wait = max_wait
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.coalesced = 0
+        self._in_flight: Dict[Tuple[str, str, str], Future] = {}
+        self._lock = threading.Lock()
+
+    def warm(self) -> None:
+        """Prepare backends that support it, e.g. import their packages."""
+        for backend in self.backends:
+            warm = getattr(backend.provider, 'warm', None)
+            if warm is not None:
+                warm()
+
+    def __call__(self, text: str, from_language: str = 'auto', to_language: str = 'en', **kwargs) -> str:
+        key = (text, from_language, to_language)
+        with self._lock:
+            pending = self._in_flight.get(key)
+            if pending is None:
+                pending = self._in_flight[key] = Future()
+                owner = True
+            else:
+                self.coalesced += 1
+                owner = False
+        if not owner:
+            return pending.result()
+
+        try:
+            pending.set_result(self._translate(text, from_language, to_language, **kwargs))
+        except BaseException as error:
+            pending.set_exception(error)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        return pending.result()
+
+    def _translate(self, text: str, from_language: str, to_language: str, **kwargs) -> str:
+        last_error: Exception | None = None
+        deadline = None if self.deadline is None else self.clock() + self.deadline
+        for index, backend in enumerate(self.backends):
+            if not backend.breaker.allow():
+                backend.rejected.inc()
+                continue
+            # share of the time left, backends failing fast leave theirs to the next ones
+            share_end = None if deadline is None else \
+                self.clock() + (deadline - self.clock()) / (len(self.backends) - index)
+            for attempt in range(self.retries + 1):
+                wait = backend.bucket.reserve()
+                if wait > self.max_wait or share_end is not None and self.clock() + wait >= share_end:
+                    backend.bucket.cancel()
+                    backend.breaker.release_trial()
+                    backend.rejected.inc()
+                    break
+                if wait:
+                    self.sleep(wait)
+                if share_end is not None:
+                    kwargs['timeout'] = share_end - self.clock()
+                try:
+                    translation = backend.provider(text, from_language=from_language,
+                                                   to_language=to_language, **kwargs)
+                except Exception as error:
+                    last_error = error
+                    backend.failures.inc()
+                    backend.breaker.record_failure()
+                    if attempt == self.retries or not backend.breaker.allow():
+                        break
+                    delay = self.rng.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+                    if share_end is not None and self.clock() + delay >= share_end:
+                        backend.breaker.release_trial()
+                        break
+                    self.sleep(delay)
+                else:
+                    backend.breaker.record_success()
+                    return translation
+        raise ProviderUnavailable(f'no backend could translate to {to_language}') from last_error
@@ -0,0 +1,92 @@
+"""
+Asynchronous front end for blocking translation calls.
+
+langid and translators are synchronous, so every call is executed on a
+bounded thread pool and the event loop stays free for other chats.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Set
+
+from metrics.registry import REGISTRY
+from translation.translator import Translator
+
+
+class TranslationCancelled(Exception):
+    """Request was abandoned by its owner before the translation was ready."""
+
+
+class AsyncTranslationService:
+    """
+    Runs translator calls on a thread pool.
+
+    max_workers - size of the thread pool
+    max_in_flight - number of requests allowed to wait for the pool at once
+    timeout - default per-request timeout in seconds
+    batch_timeout - timeout for translate_batch
+    """
+
+    def __init__(self, max_workers: int = 8, max_in_flight: int = 64, timeout: float = 10.0,
+                 batch_timeout: float = 60.0):
+        self.timeout = timeout
+        self.batch_timeout = batch_timeout
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='translate')
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._owned: Dict[Hashable, Set[asyncio.Future]] = {}
+        self._abandoned: Set[asyncio.Future] = set()
+
+    async def run(self, fn: Callable[..., Any], *args: Any,
+                  owner: Hashable | None = None, timeout: float | None = None) -> Any:
+        """
+        Execute fn(*args) on the pool.
+        Raises asyncio.TimeoutError if it takes longer than timeout and
+        TranslationCancelled if cancel(owner) was called meanwhile.
+        """
+        async with self._in_flight:
+            loop = asyncio.get_running_loop()
+            call = asyncio.ensure_future(asyncio.wait_for(
+                loop.run_in_executor(self._executor, fn, *args),
+                timeout if timeout is not None else self.timeout))
+            self._owned.setdefault(owner, set()).add(call)
+            try:
+                return await call
+            except asyncio.TimeoutError:
+                REGISTRY.counter('translation_timeouts_total').inc()
+                raise
+            except asyncio.CancelledError:
+                if call in self._abandoned:
+                    raise TranslationCancelled() from None
+                raise
+            finally:
+                self._abandoned.discard(call)
+                calls = self._owned.get(owner)
+                if calls is not None:
+                    calls.discard(call)
+                    if not calls:
+                        del self._owned[owner]
+
+    async def translate(self, translator: Translator, text: str, owner: Hashable | None = None) -> str:
+        return await self.run(translator.do_translate, text, owner=owner)
+
+    async def translate_batch(self, translator: Translator, texts: List[str],
+                              owner: Hashable | None = None) -> List[str]:
+        return await self.run(translator.do_translate_batch, texts,
+                              owner=owner, timeout=self.batch_timeout)
+
+    def cancel(self, owner: Hashable) -> int:
+        """Abandon all pending requests of owner, return their number."""
+        calls = self._owned.get(owner, set())
+        for call in calls:
+            if not call.done():
+                self._abandoned.add(call)
+                call.cancel()
+        return len(calls)
+
+    def in_flight(self) -> int:
+        return sum(len(calls) for calls in self._owned.values())
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
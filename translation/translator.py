@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from metrics.registry import REGISTRY
+from translation.cache import TranslationCache
+
+
+class Language:
+    def __init__(self, full_name: str, lang_id: int, glang_shorty: str):
+        self.full_name = full_name
+        self.id = lang_id
+        self.glang_shorty = glang_shorty
+
+
+# Languages users can learn, russian is the other side of every translation
+BOT_LANGUAGES = (
+    Language("Английский", 0, 'en'),
+    Language("Испанский", 1, 'es'),
+    Language("Немецкий", 2, 'de'),
+)
+
+
+def default_provider(text: str, **kwargs) -> str:
+    """translators.translate_text, the package sets up sessions on import, so it is imported on first use."""
+    import translators as ts
+    return ts.translate_text(text, **kwargs)
+
+
+def default_detector(text: str) -> Tuple[str, float]:
+    """langid.classify, imported on first use."""
+    import langid
+    return langid.classify(text)
+
+
+# Upper bound for the text of one joined multi-line request
+JOINED_REQUEST_LIMIT = 2000
+
+
+class Translator:
+    """
+    Translates phrases between russian and the current language.
+
+    Provider and detector are injectable, by default translators and langid
+    are used. If joinable is set, the provider is expected to keep line breaks,
+    so do_translate_batch may send several phrases in one request.
+
+    Requests of a batch run on executor, translators of one provider share
+    it so that batches together never make more than its workers' calls at
+    once. Without one, every batch starts a pool of up to max_workers.
+    """
+
+    def __init__(self, current_lang: Language, cache: TranslationCache | None = None,
+                 provider: Callable[..., str] = default_provider,
+                 detector: Callable[[str], Tuple[str, float]] = default_detector,
+                 joinable: bool = True, max_workers: int = 8, executor: Executor | None = None):
+        self.lang = current_lang
+        self.cache = cache
+        self.provider = provider
+        self.detector = detector
+        self.joinable = joinable
+        self.max_workers = max_workers
+        self.executor = executor
+
+    def switch_language(self, language: Language):
+        self.lang = language
+
+    def direction(self, text: str) -> Tuple[str, str]:
+        """Detect (source, target) language pair for text."""
+        text_lang = self.detector(text)[0]
+        if text_lang == self.lang.glang_shorty:
+            return text_lang, 'ru'
+        return text_lang, self.lang.glang_shorty
+
+    def do_translate(self, text: str):
+        from_lang, to_lang = self.direction(text)
+        if self.cache is not None:
+            cached = self.cache.get(text, from_lang, to_lang)
+            if cached is not None:
+                return cached
+
+        translation = self.fetch(text, from_lang, to_lang)
+        if self.cache is not None:
+            self.cache.put(text, from_lang, to_lang, translation)
+        return translation
+
+    def fetch(self, text: str, from_lang: str, to_lang: str) -> str:
+        """Ask provider for translation, bypassing the cache."""
+        with REGISTRY.timer('translator_seconds', 'translator_errors_total', to_lang=to_lang):
+            if to_lang == 'ru':
+                return self.provider(
+                    text,
+                    from_language=from_lang,
+                    to_language='ru')
+            return self.provider(text, to_language=to_lang)
+
+    def do_translate_batch(self, texts: Sequence[str]) -> List[str]:
+        """
+        Translate several phrases at once, results are returned in input order.
+        Duplicates are translated once, cache misses are grouped by direction
+        and sent as joined requests or concurrently.
+        """
+        unique = list(dict.fromkeys(texts))
+        results: Dict[str, str] = {}
+        missing: Dict[Tuple[str, str], List[str]] = {}
+        for text in unique:
+            from_lang, to_lang = self.direction(text)
+            cached = self.cache.get(text, from_lang, to_lang) if self.cache is not None else None
+            if cached is not None:
+                results[text] = cached
+            else:
+                missing.setdefault((from_lang, to_lang), []).append(text)
+
+        jobs = []
+        for (from_lang, to_lang), group in missing.items():
+            for chunk in self.__split_for_requests(group):
+                jobs.append((chunk, from_lang, to_lang))
+
+        if jobs:
+            pool = self.executor or ThreadPoolExecutor(min(self.max_workers, len(jobs)))
+            try:
+                for (chunk, from_lang, to_lang), translations in zip(
+                        jobs, pool.map(lambda job: self.__fetch_chunk(*job), jobs)):
+                    for text, translation in zip(chunk, translations):
+                        results[text] = translation
+                        if self.cache is not None:
+                            self.cache.put(text, from_lang, to_lang, translation)
+            finally:
+                if pool is not self.executor:
+                    pool.shutdown()
+
+        return [results[text] for text in texts]
+
+    def __split_for_requests(self, group: List[str]) -> List[List[str]]:
+        if not self.joinable:
+            return [[text] for text in group]
+        chunks: List[List[str]] = []
+        size = JOINED_REQUEST_LIMIT
+        for text in group:
+            if '\n' in text:
+                chunks.append([text])
+                size = JOINED_REQUEST_LIMIT
+                continue
+            if size + len(text) + 1 > JOINED_REQUEST_LIMIT:
+                chunks.append([])
+                size = 0
+            chunks[-1].append(text)
+            size += len(text) + 1
+        return chunks
+
+    def __fetch_chunk(self, chunk: List[str], from_lang: str, to_lang: str) -> List[str]:
+        if len(chunk) == 1:
+            return [self.fetch(chunk[0], from_lang, to_lang)]
+        lines = self.fetch('\n'.join(chunk), from_lang, to_lang).split('\n')
+        if len(lines) == len(chunk):
+            return [line.strip() for line in lines]
+        # provider merged or split lines, translate one by one
+        return [self.fetch(text, from_lang, to_lang) for text in chunk]